@@ -0,0 +1,328 @@
+"""
+편집 거리(Levenshtein) 계산 엔진
+
+Myers/Hyyrö 비트 병렬 알고리즘으로 두 시퀀스의 편집 거리를 계산합니다.
+파이썬 정수를 비트 벡터로 사용하므로 길이 제한이 없고, 패턴 길이 m, 텍스트 길이 n에 대해
+O(n) 번의 정수 연산만으로 거리를 구합니다 (행렬을 채우지 않음).
+
+요소를 해시할 수 없는 시퀀스는 두 행만 사용하는 순수 파이썬 DP로 처리합니다.
+두 경로 모두 WordMetrics.edit_distance_python과 동일한 정수 거리를 반환합니다.
+
+여러 단어 쌍의 거리 행렬은 edit_distance_matrix로 한 번에 계산합니다. 단어를 패딩된
+정수 배열로 인코딩하고 모든 쌍의 DP 행을 NumPy로 동시에 갱신하며, 반복되는 단어 쌍은
+한 번만 계산합니다. (참조 단어, 전사 단어)처럼 짝지어진 쌍의 거리 벡터는
+edit_distance_pairs로 계산합니다.
+"""
+import time
+import numpy as np
+from typing import Sequence, Tuple
+
+# edit_distance_pairs가 NumPy 배치 경로를 사용할 최소 쌍 수 (그보다 적으면 쌍마다 계산)
+PAIRS_BATCH_MIN_SIZE = 48
+
+# 참고: Hyyrö, H. (2003). A bit-vector algorithm for computing Levenshtein and
+#       Damerau edit distances. Nordic Journal of Computing 10(1), 29-39.
+
+
+def edit_distance(seq1: Sequence, seq2: Sequence) -> int:
+    """두 시퀀스(문자열, 리스트 등)의 편집 거리를 정수로 반환합니다."""
+    if seq1 == seq2:
+        return 0
+    # 짧은 쪽을 패턴(비트 벡터)으로 사용합니다
+    if len(seq1) > len(seq2):
+        seq1, seq2 = seq2, seq1
+    if len(seq1) == 0:
+        return len(seq2)
+
+    try:
+        return _edit_distance_bit_parallel(seq1, seq2)
+    except TypeError:
+        # 해시할 수 없는 요소(예: 리스트)가 포함된 경우
+        return edit_distance_dp(seq1, seq2)
+
+
+def _edit_distance_bit_parallel(pattern: Sequence, text: Sequence) -> int:
+    """Myers/Hyyrö 비트 병렬 Levenshtein 거리. len(pattern) >= 1 이어야 합니다."""
+    # 패턴의 각 심볼이 나타나는 위치의 비트 마스크
+    peq = {}
+    bit = 1
+    for token in pattern:
+        peq[token] = peq.get(token, 0) | bit
+        bit <<= 1
+
+    m = len(pattern)
+    mask = (1 << m) - 1
+    last_bit = 1 << (m - 1)
+
+    vp = mask  # 수직 +1 델타
+    vn = 0     # 수직 -1 델타
+    score = m
+    for token in text:
+        eq = peq.get(token, 0)
+        xv = eq | vn
+        xh = (((eq & vp) + vp) ^ vp) | eq
+        hp = vn | ~(xh | vp)
+        hn = vp & xh
+        if hp & last_bit:
+            score += 1
+        elif hn & last_bit:
+            score -= 1
+        hp = (hp << 1) | 1
+        hn <<= 1
+        vp = (hn | ~(xv | hp)) & mask
+        vn = hp & xv & mask
+    return score
+
+
+def edit_distance_dp(seq1: Sequence, seq2: Sequence) -> int:
+    """두 행만 사용하는 순수 파이썬 DP 편집 거리 (대체 경로)."""
+    previous_row = list(range(len(seq2) + 1))
+    for x, token1 in enumerate(seq1, start=1):
+        current_row = [x]
+        for y, token2 in enumerate(seq2, start=1):
+            current_row.append(min(previous_row[y] + 1,
+                                   current_row[y - 1] + 1,
+                                   previous_row[y - 1] + (token1 != token2)))
+        previous_row = current_row
+    return previous_row[-1]
+
+
+def edit_distance_matrix(seqs1: Sequence, seqs2: Sequence) -> np.ndarray:
+    """
+    seqs1 × seqs2 모든 쌍의 편집 거리 행렬을 한 번의 호출로 계산합니다.
+
+    Args:
+        seqs1: 시퀀스 리스트 (행)
+        seqs2: 시퀀스 리스트 (열)
+
+    Returns:
+        (len(seqs1), len(seqs2)) 크기의 정수 행렬
+    """
+    if len(seqs1) == 0 or len(seqs2) == 0:
+        return np.zeros((len(seqs1), len(seqs2)), dtype=np.int32)
+
+    try:
+        # 같은 단어는 한 번만 인코딩하고 고유 쌍에 대해서만 계산합니다
+        unique1, inverse1 = _unique_sequences(seqs1)
+        unique2, inverse2 = _unique_sequences(seqs2)
+        vocabulary = {}
+        codes1, lengths1 = _encode_sequences(unique1, vocabulary)
+        codes2, lengths2 = _encode_sequences(unique2, vocabulary)
+    except TypeError:
+        # 해시할 수 없는 요소가 포함된 경우 스칼라 경로로 계산합니다
+        return np.array([[edit_distance(seq1, seq2) for seq2 in seqs2] for seq1 in seqs1],
+                        dtype=np.int32).reshape(len(seqs1), len(seqs2))
+
+    unique_distances = _edit_distance_matrix_encoded(codes1, lengths1, codes2, lengths2)
+    return unique_distances[np.ix_(inverse1, inverse2)]
+
+
+def edit_distance_pairs(seqs1: Sequence, seqs2: Sequence, encoded1: tuple = None) -> np.ndarray:
+    """
+    짝지어진 쌍 (seqs1[k], seqs2[k])의 편집 거리를 한 번의 호출로 계산합니다.
+
+    같은 시퀀스 쌍은 거리 0이므로 계산하지 않습니다. 나머지 쌍이 PAIRS_BATCH_MIN_SIZE개
+    이상이면 모든 쌍의 DP 행을 NumPy로 동시에 갱신하고, 그보다 적으면 NumPy 호출 비용이
+    더 크므로 쌍마다 비트 병렬 알고리즘을 사용합니다.
+
+    Args:
+        seqs1: 시퀀스 리스트
+        seqs2: seqs1과 길이가 같은 시퀀스 리스트
+        encoded1: 문자열 seqs1을 미리 인코딩한 (코드 배열, 길이) (_encode_strings와 같은 형식,
+                  예: SentenceIndex의 참조 단어 코드). 배치 경로에서 seqs1을 다시 인코딩하지 않습니다.
+
+    Returns:
+        (len(seqs1),) 크기의 정수 벡터
+    """
+    if len(seqs1) != len(seqs2):
+        raise ValueError(f'쌍의 개수가 다릅니다: {len(seqs1)} != {len(seqs2)}')
+    distances = np.zeros(len(seqs1), dtype=np.int32)
+    pair_indices = [idx for idx, (seq1, seq2) in enumerate(zip(seqs1, seqs2)) if seq1 != seq2]
+    if len(pair_indices) < PAIRS_BATCH_MIN_SIZE:
+        for idx in pair_indices:
+            distances[idx] = edit_distance(seqs1[idx], seqs2[idx])
+        return distances
+
+    different1 = [seqs1[idx] for idx in pair_indices]
+    different2 = [seqs2[idx] for idx in pair_indices]
+    if encoded1 is not None and all(isinstance(seq, str) for seq in different2):
+        codes1, lengths1 = encoded1[0][pair_indices], encoded1[1][pair_indices]
+        codes2, lengths2 = _encode_strings(different2)
+    elif all(isinstance(seq, str) for seq in different1 + different2):
+        codes1, lengths1 = _encode_strings(different1)
+        codes2, lengths2 = _encode_strings(different2)
+    else:
+        try:
+            vocabulary = {}
+            codes1, lengths1 = _encode_sequences(different1, vocabulary)
+            codes2, lengths2 = _encode_sequences(different2, vocabulary)
+        except TypeError:
+            # 해시할 수 없는 요소가 포함된 경우 스칼라 경로로 계산합니다
+            for idx in pair_indices:
+                distances[idx] = edit_distance(seqs1[idx], seqs2[idx])
+            return distances
+
+    distances[pair_indices] = _edit_distance_pairs_encoded(codes1, lengths1, codes2, lengths2)
+    return distances
+
+
+def _encode_strings(words: list) -> Tuple[np.ndarray, np.ndarray]:
+    """문자열을 유니코드 코드 포인트 배열 (개수, 최대 길이)로 인코딩합니다 (문자별 파이썬 반복 없음)."""
+    lengths = np.fromiter(map(len, words), dtype=np.intp, count=len(words))
+    max_length = max(int(lengths.max()), 1)
+    padded = ''.join(word.ljust(max_length, '\0') for word in words)
+    codes = np.frombuffer(padded.encode('utf-32-le'), dtype=np.uint32).reshape(len(words), max_length)
+    return codes, lengths
+
+
+def _unique_sequences(seqs: Sequence) -> Tuple[list, np.ndarray]:
+    """시퀀스 리스트를 고유 시퀀스와 역인덱스로 분리합니다."""
+    index_of = {}
+    unique = []
+    inverse = np.empty(len(seqs), dtype=np.intp)
+    for idx, seq in enumerate(seqs):
+        key = seq if isinstance(seq, str) else tuple(seq)
+        position = index_of.get(key)
+        if position is None:
+            position = index_of[key] = len(unique)
+            unique.append(key)
+        inverse[idx] = position
+    return unique, inverse
+
+
+def _encode_sequences(seqs: list, vocabulary: dict) -> Tuple[np.ndarray, np.ndarray]:
+    """시퀀스를 -1로 패딩된 정수 배열 (개수, 최대 길이)로 인코딩합니다."""
+    lengths = np.array([len(seq) for seq in seqs], dtype=np.intp)
+    codes = np.full((len(seqs), max(int(lengths.max()), 1)), -1, dtype=np.int32)
+    for idx, seq in enumerate(seqs):
+        codes[idx, :len(seq)] = [vocabulary.setdefault(token, len(vocabulary)) for token in seq]
+    return codes, lengths
+
+
+def _edit_distance_matrix_encoded(codes1: np.ndarray, lengths1: np.ndarray,
+                                  codes2: np.ndarray, lengths2: np.ndarray) -> np.ndarray:
+    """인코딩된 모든 쌍에 대해 DP 행을 동시에 갱신하는 벡터화 편집 거리."""
+    number_of_rows = codes1.shape[0]
+    number_of_columns, max_length2 = codes2.shape
+    columns = np.arange(max_length2 + 1, dtype=np.int32)
+    column_selector = np.arange(number_of_columns)
+
+    distances = np.empty((number_of_rows, number_of_columns), dtype=np.int32)
+    # 빈 시퀀스와의 거리는 상대 시퀀스의 길이입니다
+    distances[lengths1 == 0] = lengths2
+
+    # previous_row[r, c, j]: seqs1[r]의 i번째 접두사와 seqs2[c]의 j번째 접두사 사이 거리
+    previous_row = np.broadcast_to(
+        columns, (number_of_rows, number_of_columns, max_length2 + 1)).copy()
+    current_row = np.empty_like(previous_row)
+    for i in range(1, int(lengths1.max()) + 1):
+        mismatch = codes1[:, None, i - 1, None] != codes2[None, :, :]
+        current_row[..., 0] = i
+        np.minimum(previous_row[..., :-1] + mismatch, previous_row[..., 1:] + 1,
+                   out=current_row[..., 1:])
+        # 삽입 비용 전파: D[j] = min_k<=j (T[k] + j - k)
+        current_row -= columns
+        np.minimum.accumulate(current_row, axis=-1, out=current_row)
+        current_row += columns
+
+        finished_rows = np.flatnonzero(lengths1 == i)
+        if len(finished_rows):
+            distances[finished_rows] = current_row[finished_rows[:, None],
+                                                   column_selector, lengths2]
+        previous_row, current_row = current_row, previous_row
+    return distances
+
+
+def _edit_distance_pairs_encoded(codes1: np.ndarray, lengths1: np.ndarray,
+                                 codes2: np.ndarray, lengths2: np.ndarray) -> np.ndarray:
+    """인코딩된 쌍마다 하나의 DP 행을 두고 모든 쌍을 동시에 갱신하는 벡터화 편집 거리."""
+    number_of_pairs, max_length2 = codes2.shape
+    columns = np.arange(max_length2 + 1, dtype=np.int32)
+
+    # 빈 시퀀스와의 거리는 상대 시퀀스의 길이입니다
+    distances = lengths2.astype(np.int32)
+
+    # previous_row[k, j]: seqs1[k]의 i번째 접두사와 seqs2[k]의 j번째 접두사 사이 거리
+    previous_row = np.broadcast_to(columns, (number_of_pairs, max_length2 + 1)).copy()
+    current_row = np.empty_like(previous_row)
+    for i in range(1, int(lengths1.max()) + 1):
+        mismatch = codes1[:, i - 1, None] != codes2
+        current_row[:, 0] = i
+        np.minimum(previous_row[:, :-1] + mismatch, previous_row[:, 1:] + 1,
+                   out=current_row[:, 1:])
+        # 삽입 비용 전파: D[j] = min_k<=j (T[k] + j - k)
+        current_row -= columns
+        np.minimum.accumulate(current_row, axis=-1, out=current_row)
+        current_row += columns
+
+        finished_pairs = np.flatnonzero(lengths1 == i)
+        if len(finished_pairs):
+            distances[finished_pairs] = current_row[finished_pairs, lengths2[finished_pairs]]
+        previous_row, current_row = current_row, previous_row
+    return distances
+
+
+def _benchmark(number_of_pairs: int = 20000):
+    """한국어 단어와 IPA 길이에서 쌍당 비용을 측정합니다."""
+    import random
+    import WordMetrics
+
+    korean_syllables = '가나다라마바사아자차카타파하읽기쉬운마음이야당신도스윽훑고셔요'
+    ipa_symbols = ['a', 'ʌ', 'o', 'u', 'ɯ', 'i', 'ɛ', 'e', 'k', 'k͈', 'kʰ', 't', 't͈',
+                   'tʰ', 'p', 'p͈', 'pʰ', 's', 's͈', 'h', 't͡ɕ', 'l', 'm', 'n', 'ŋ', 'j', 'w']
+    random.seed(0)
+
+    def random_korean_word():
+        return ''.join(random.choice(korean_syllables) for _ in range(random.randint(1, 5)))
+
+    def random_ipa_word():
+        return ''.join(random.choice(ipa_symbols) for _ in range(random.randint(2, 14)))
+
+    for label, generator in (('한국어 단어', random_korean_word), ('IPA', random_ipa_word)):
+        pairs = [(generator(), generator()) for _ in range(number_of_pairs)]
+        for name, function in (('edit_distance_python', WordMetrics.edit_distance_python),
+                               ('edit_distance_dp', edit_distance_dp),
+                               ('edit_distance', edit_distance)):
+            start = time.perf_counter()
+            for a, b in pairs:
+                function(a, b)
+            per_pair = (time.perf_counter() - start) / number_of_pairs
+            print(f'{label:8s} {name:22s} {per_pair * 1e6:8.2f} µs/쌍')
+
+        mismatches = sum(int(WordMetrics.edit_distance_python(a, b)) != edit_distance(a, b)
+                         for a, b in pairs)
+        print(f'{label:8s} 불일치 쌍: {mismatches}')
+
+    # 문단 모드: 단어 목록 전체의 거리 행렬
+    words_real = [random_korean_word() for _ in range(60)]
+    words_estimated = [random.choice(words_real) if random.random() < 0.7 else random_korean_word()
+                       for _ in range(60)]
+    start = time.perf_counter()
+    scalar_matrix = [[edit_distance(a, b) for b in words_real] for a in words_estimated]
+    scalar_time = time.perf_counter() - start
+    start = time.perf_counter()
+    batched_matrix = edit_distance_matrix(words_estimated, words_real)
+    batched_time = time.perf_counter() - start
+    print(f'60x60 행렬  스칼라 {scalar_time * 1e3:.2f} ms, 배치 {batched_time * 1e3:.2f} ms, '
+          f'일치: {np.array_equal(batched_matrix, scalar_matrix)}')
+
+    # 문장 채점: 참조 단어와 매칭된 전사 단어 쌍의 거리 벡터
+    for number_of_words in (60, 400, 2000):
+        words_real = [random_korean_word() for _ in range(number_of_words)]
+        words_transcribed = [word if random.random() < 0.7 else random_korean_word() for word in words_real]
+        number_of_runs = 20
+        start = time.perf_counter()
+        for _ in range(number_of_runs):
+            scalar_distances = [edit_distance(a, b) for a, b in zip(words_real, words_transcribed)]
+        scalar_time = (time.perf_counter() - start) / number_of_runs
+        start = time.perf_counter()
+        for _ in range(number_of_runs):
+            batched_distances = edit_distance_pairs(words_real, words_transcribed)
+        batched_time = (time.perf_counter() - start) / number_of_runs
+        print(f'{number_of_words}쌍 벡터  스칼라 {scalar_time * 1e3:.2f} ms, '
+              f'edit_distance_pairs {batched_time * 1e3:.2f} ms, '
+              f'일치: {np.array_equal(batched_distances, scalar_distances)}')
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -1,6 +1,18 @@
 
 import abc
+import threading
 import numpy as np
+from typing import NamedTuple
+
+
+class ASRResult(NamedTuple):
+    """Transcript and word locations of one processed audio"""
+    transcript: str
+    word_locations: list  # [{"word", "start_ts", "end_ts", "tag"}, ...] in samples
+
+
+# Serializes the default transcribeAudio of models that only keep per-instance results
+_legacy_asr_lock = threading.Lock()
 
 
 class IASRModel(metaclass=abc.ABCMeta):
@@ -28,6 +40,16 @@ class IASRModel(metaclass=abc.ABCMeta):
         """Process the audio"""
         raise NotImplementedError
 
+    def transcribeAudio(self, audio) -> ASRResult:
+        """Process the audio and return its result without storing it on the model
+
+        Models that only implement the stateful processAudio/getTranscript/getWordLocations
+        calls are serialized with a lock so concurrent callers do not read each other's results.
+        """
+        with _legacy_asr_lock:
+            self.processAudio(audio)
+            return ASRResult(self.getTranscript(), self.getWordLocations())
+
 
 class ITranslationModel(metaclass=abc.ABCMeta):
     @classmethod
@@ -2,24 +2,403 @@ import ModelInterfaces
 import torch
 import numpy as np
 import epitran
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from importlib import metadata
+
+# 미리 계산된 한글 음절 → IPA 표 (python RuleBasedModels.py build 로 생성)
+HANGUL_TABLE_PATH = './databases/hangul_ipa_ko.npz'
+# 변환 결과가 달라지도록 변환 코드를 고치면 올립니다 (참조 문장 인덱스가 다시 만들어집니다)
+PHONEM_CONVERTER_VERSION = 1
+
+# 유니코드 한글 음절 블록 (U+AC00-U+D7A3): 음절 = 0xAC00 + (초성*21 + 중성)*28 + 종성
+HANGUL_SYLLABLE_BASE = 0xAC00
+NUMBER_OF_ONSETS = 19
+NUMBER_OF_VOWELS = 21
+NUMBER_OF_CODAS = 28
+NUMBER_OF_SYLLABLES = NUMBER_OF_ONSETS * NUMBER_OF_VOWELS * NUMBER_OF_CODAS
+
+# 언어별로 프로세스 전체에서 공유하는 변환기 (같은 단어를 두 번 변환하지 않도록)
+_phonem_converters = {}
+_phonem_converters_lock = threading.Lock()
 
 
 def get_phonem_converter(language: str):
-    if language == 'ko':
-        phonem_converter = KoreanPhonemConverter()
-    else:
-        raise ValueError('한국어만 지원됩니다')
+    with _phonem_converters_lock:
+        if language in _phonem_converters:
+            return _phonem_converters[language]
+
+        if language == 'ko':
+            try:
+                import config
+                cfg = config.get_config()
+                phonem_converter = KoreanPhonemConverter(
+                    cache_size=cfg.get('phonem_cache_size', 4096),
+                    warm_file=cfg.get('phonem_cache_warm_file', None))
+            except ImportError:
+                phonem_converter = KoreanPhonemConverter()
+        else:
+            raise ValueError('한국어만 지원됩니다')
+
+        _phonem_converters[language] = phonem_converter
+        return phonem_converter
+
+
+class PhonemCache:
+    """
+    음소 변환 결과를 위한 스레드 안전한 LRU 캐시
+
+    적중/미스/제거 횟수를 기록하며, 변환 결과를 JSON 파일로 저장하거나
+    시작 시 불러와 캐시를 미리 채울 수 있습니다.
+    """
+
+    def __init__(self, max_size: int = 4096) -> None:
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, text: str):
+        with self._lock:
+            phonem_representation = self._entries.get(text)
+            if phonem_representation is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(text)
+            self.hits += 1
+            return phonem_representation
+
+    def put(self, text: str, phonem_representation: str) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[text] = phonem_representation
+            self._entries.move_to_end(text)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def getStats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0
+            }
+
+    def loadWarmFile(self, path: str) -> int:
+        """JSON 파일의 변환 결과로 캐시를 채우고 불러온 항목 수를 반환합니다."""
+        with open(path, encoding='utf-8') as warm_file:
+            entries = json.load(warm_file)
+        for text, phonem_representation in entries.items():
+            self.put(text, phonem_representation)
+        return len(entries)
+
+    def saveWarmFile(self, path: str) -> None:
+        """현재 캐시 내용을 JSON 파일로 저장합니다 (다음 시작 시 loadWarmFile로 사용)."""
+        with self._lock:
+            entries = dict(self._entries)
+        with open(path, 'w', encoding='utf-8') as warm_file:
+            json.dump(entries, warm_file, ensure_ascii=False)
+
+
+class HangulSyllableTable:
+    """
+    11,172개 한글 음절의 IPA 표와 음절 경계(접합부) 규칙 표
+
+    epitran의 kor-Hang 후처리 규칙(연음, 비음화, 경음화 등)은 IPA 문자열 전체에 적용되지만
+    규칙의 문맥은 "모음 + 받침 + 다음 초성 + 다음 모음"을 넘지 않습니다. 그래서 두 음절 사이의
+    접합부에서 일어나는 변화는 (앞 음절, 뒤 초성, 뒤 중성)만으로 결정되며, 표에는 접합부마다
+    "앞 음절 IPA 끝에서 지울 글자 수, 뒤 음절 IPA 앞에서 지울 글자 수, 그 자리에 넣을 문자열"
+    규칙이 저장됩니다. 규칙 0은 변화가 없는 접합부입니다.
+
+    epitran은 정규식을 겹치지 않게 한 번씩 적용하므로, 변화가 일어나는 접합부가 연달아 있으면
+    (예: 비하해) 가운데 음절의 모음을 두 규칙이 공유해 두 번째 규칙이 적용되지 않을 수 있습니다.
+    그래서 규칙은 양옆 접합부에 변화가 없을 때만 적용하고, 변화가 연속되는 음절 덩어리는
+    epitran으로 처리합니다.
+
+    epitran은 문자열 끝(#)에서만 받침 단순화 규칙을 적용하므로, 음절마다 문자열 끝에 올 때(end)와
+    공백/변화 없는 접합부가 뒤따를 때(open)의 두 가지 IPA를 저장합니다.
+    """
+
+    def __init__(self, ipa_end: list, ipa_open: list, junction_rules: np.ndarray,
+                 rule_cut_left: np.ndarray, rule_cut_right: np.ndarray, rule_replacements: list) -> None:
+        self.ipa_end = ipa_end
+        self.ipa_open = ipa_open
+        # 접합부 키마다 규칙 번호 (0 = 변화 없음)
+        self.junction_rules = junction_rules
+        self.rule_cut_left = rule_cut_left.tolist()
+        self.rule_cut_right = rule_cut_right.tolist()
+        self.rule_replacements = rule_replacements
+
+    @staticmethod
+    def junctionKeys(first_syllables: np.ndarray, second_syllables: np.ndarray) -> np.ndarray:
+        """(앞 음절, 뒤 음절) 인덱스 쌍을 접합부 키 (초성1, 중성1, 종성1, 초성2, 중성2)로 변환합니다."""
+        second_onsets = second_syllables // (NUMBER_OF_VOWELS * NUMBER_OF_CODAS)
+        second_vowels = (second_syllables // NUMBER_OF_CODAS) % NUMBER_OF_VOWELS
+        return (first_syllables * NUMBER_OF_ONSETS + second_onsets) * NUMBER_OF_VOWELS + second_vowels
+
+    def transliterate(self, sentence: str, fallback) -> str:
+        """
+        문장을 IPA로 변환합니다. 표로 처리할 수 없는 부분은 fallback(text)로 epitran에 맡깁니다.
+        """
+        # 조합형 자모는 epitran이 문장 단위로 변환하므로 문장 전체를 맡깁니다
+        if any('\u1100' <= char <= '\u11ff' for char in sentence):
+            return fallback(sentence)
+
+        # 문장의 모든 음절 코드와 접합부 규칙을 한 번에 찾습니다
+        syllables = np.frombuffer(sentence.encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+        syllables -= HANGUL_SYLLABLE_BASE
+        is_syllable = (syllables >= 0) & (syllables < NUMBER_OF_SYLLABLES)
+        both_syllables = is_syllable[:-1] & is_syllable[1:]
+        keys = self.junctionKeys(np.where(both_syllables, syllables[:-1], 0),
+                                 np.where(both_syllables, syllables[1:], 0))
+        rules = np.where(both_syllables, self.junction_rules[keys], 0).tolist()
+        is_syllable = is_syllable.tolist()
+        syllables = syllables.tolist()
+
+        def transliterate_piece(text: str, at_end: bool) -> str:
+            if at_end:
+                return fallback(text)
+            # 뒤에 공백이 오는 것과 같은 문맥으로 변환합니다
+            return fallback(text + ' ')[:-1]
+
+        tokens = sentence.split(' ')
+        phonem_tokens = []
+        position = 0
+        for token_idx, token in enumerate(tokens):
+            start, end = position, position + len(token)
+            position = end + 1
+            token_at_end = token_idx == len(tokens) - 1
+
+            if not all(is_syllable[start:end]):
+                phonem_tokens.append(transliterate_piece(token, token_at_end) if token else '')
+                continue
+
+            pieces = []
+            chunk_start = start
+            for idx in range(start, end):
+                if idx < end - 1 and rules[idx] != 0:
+                    continue
+                at_end = token_at_end and idx == end - 1
+                table = self.ipa_end if at_end else self.ipa_open
+                if idx == chunk_start:
+                    pieces.append(table[syllables[idx]])
+                elif idx == chunk_start + 1:
+                    # 한 접합부에만 변화가 있는 두 음절: 규칙대로 이어 붙입니다
+                    rule = rules[chunk_start]
+                    left = self.ipa_open[syllables[chunk_start]]
+                    pieces.append(left[:len(left) - self.rule_cut_left[rule]])
+                    pieces.append(self.rule_replacements[rule])
+                    pieces.append(table[syllables[idx]][self.rule_cut_right[rule]:])
+                else:
+                    # 변화가 연속되는 음절 덩어리
+                    pieces.append(transliterate_piece(sentence[chunk_start:idx + 1], at_end))
+                chunk_start = idx + 1
+            phonem_tokens.append(''.join(pieces))
+
+        return ' '.join(phonem_tokens)
+
+    def save(self, path: str) -> None:
+        ipa_end_blob, ipa_end_offsets = _encode_strings(self.ipa_end)
+        ipa_open_blob, ipa_open_offsets = _encode_strings(self.ipa_open)
+        replacement_blob, replacement_offsets = _encode_strings(self.rule_replacements)
+        np.savez_compressed(path, ipa_end_blob=ipa_end_blob, ipa_end_offsets=ipa_end_offsets,
+                            ipa_open_blob=ipa_open_blob, ipa_open_offsets=ipa_open_offsets,
+                            junction_rules=self.junction_rules,
+                            rule_cut_left=np.array(self.rule_cut_left, dtype=np.int8),
+                            rule_cut_right=np.array(self.rule_cut_right, dtype=np.int8),
+                            replacement_blob=replacement_blob, replacement_offsets=replacement_offsets)
+
+    @classmethod
+    def load(cls, path: str) -> 'HangulSyllableTable':
+        with np.load(path) as artifact:
+            return cls(_decode_strings(artifact['ipa_end_blob'], artifact['ipa_end_offsets']),
+                       _decode_strings(artifact['ipa_open_blob'], artifact['ipa_open_offsets']),
+                       artifact['junction_rules'], artifact['rule_cut_left'], artifact['rule_cut_right'],
+                       _decode_strings(artifact['replacement_blob'], artifact['replacement_offsets']))
+
+    @staticmethod
+    def _junctionRule(left: str, right: str, joined: str) -> tuple:
+        """따로 변환한 두 음절(left, right)과 붙여서 변환한 결과(joined)의 차이를 규칙으로 만듭니다."""
+        separate = left + right
+        prefix = 0
+        while prefix < min(len(joined), len(left)) and joined[prefix] == left[prefix]:
+            prefix += 1
+        suffix = 0
+        while (suffix < min(len(joined) - prefix, len(right))
+               and joined[-1 - suffix] == separate[-1 - suffix]):
+            suffix += 1
+        return len(left) - prefix, len(right) - suffix, joined[prefix:len(joined) - suffix]
+
+    @classmethod
+    def build(cls, epitran_model) -> 'HangulSyllableTable':
+        """epitran으로 모든 음절과 접합부를 변환해 표를 만듭니다 (수 분 소요)."""
+        syllables = [chr(HANGUL_SYLLABLE_BASE + idx) for idx in range(NUMBER_OF_SYLLABLES)]
+        ipa_end = [epitran_model.transliterate(syllable) for syllable in syllables]
+        ipa_open = [epitran_model.transliterate(syllable + ' ')[:-1] for syllable in syllables]
+
+        # 접합부는 뒤 음절의 종성과 무관하므로 받침 없는 음절을 대표로 사용합니다.
+        # 받침 있는 음절의 IPA는 항상 대표 음절의 IPA로 시작하므로 같은 규칙을 적용할 수 있습니다.
+        open_syllables = [(onset * NUMBER_OF_VOWELS + vowel) * NUMBER_OF_CODAS
+                          for onset in range(NUMBER_OF_ONSETS) for vowel in range(NUMBER_OF_VOWELS)]
+        junction_rules = np.zeros(NUMBER_OF_SYLLABLES * len(open_syllables), dtype=np.uint16)
+        rule_ids = {(0, 0, ''): 0}
+        start = time.time()
+        for first in range(NUMBER_OF_SYLLABLES):
+            keys = cls.junctionKeys(np.full(len(open_syllables), first), np.array(open_syllables))
+            for key, second in zip(keys.tolist(), open_syllables):
+                rule = cls._junctionRule(ipa_open[first], ipa_end[second], epitran_model.transliterate(
+                    syllables[first] + syllables[second]))
+                junction_rules[key] = rule_ids.setdefault(rule, len(rule_ids))
+            if first % 1000 == 0:
+                print(f'  {first}/{NUMBER_OF_SYLLABLES} 음절 ({time.time() - start:.0f}초)')
+
+        rules = sorted(rule_ids, key=rule_ids.get)
+        return cls(ipa_end, ipa_open, junction_rules,
+                   np.array([rule[0] for rule in rules], dtype=np.int8),
+                   np.array([rule[1] for rule in rules], dtype=np.int8),
+                   [rule[2] for rule in rules])
+
+
+def _encode_strings(strings: list):
+    """문자열 리스트를 UTF-8 바이트 배열과 오프셋 배열로 변환합니다."""
+    encoded = [string.encode('utf-8') for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int32)
+    np.cumsum([len(item) for item in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def _decode_strings(blob: np.ndarray, offsets: np.ndarray) -> list:
+    data = blob.tobytes()
+    offsets = offsets.tolist()
+    return [data[offsets[idx]:offsets[idx + 1]].decode('utf-8') for idx in range(len(offsets) - 1)]
 
-    return phonem_converter
 
 class KoreanPhonemConverter(ModelInterfaces.ITextToPhonemModel):
 
-    def __init__(self,) -> None:
+    def __init__(self, cache_size: int = 4096, warm_file: str = None,
+                 table_path: str = HANGUL_TABLE_PATH) -> None:
         super().__init__()
         # 한국어 IPA 변환에 epitran 사용 (kor-Hang = 한국어 한글)
         self.epitran_model = epitran.Epitran('kor-Hang')
+        # 음절 표가 있으면 epitran은 음운 규칙이 접합부를 넘는 음절 덩어리에만 사용합니다
+        self.syllable_table = None
+        self._table_stat = None
+        if table_path is not None and os.path.exists(table_path):
+            self._table_stat = os.stat(table_path)
+            self.syllable_table = HangulSyllableTable.load(table_path)
+        # epitran 규칙 엔진은 느리고 참조 어휘는 작고 반복되므로 결과를 기억합니다
+        self.cache = PhonemCache(cache_size)
+        if warm_file is not None and os.path.exists(warm_file):
+            number_of_entries = self.cache.loadWarmFile(warm_file)
+            print(f"음소 변환 캐시 로드: {warm_file} ({number_of_entries}개 항목)")
 
     def convertToPhonem(self, sentence: str) -> str:
-        # 한국어 한글을 IPA 음성 표현으로 변환
-        phonem_representation = self.epitran_model.transliterate(sentence)
+        phonem_representation = self.cache.get(sentence)
+        if phonem_representation is None:
+            # 한국어 한글을 IPA 음성 표현으로 변환
+            if self.syllable_table is not None:
+                phonem_representation = self.syllable_table.transliterate(
+                    sentence, self._transliterateWithEpitran)
+            else:
+                phonem_representation = self.epitran_model.transliterate(sentence)
+            self.cache.put(sentence, phonem_representation)
         return phonem_representation
+
+    def _transliterateWithEpitran(self, text: str) -> str:
+        phonem_representation = self.cache.get(text)
+        if phonem_representation is None:
+            phonem_representation = self.epitran_model.transliterate(text)
+            self.cache.put(text, phonem_representation)
+        return phonem_representation
+
+    def getCacheStats(self) -> dict:
+        return self.cache.getStats()
+
+    def getVersion(self) -> dict:
+        """변환 결과를 결정하는 요소 (변환 코드 버전, epitran 버전, 음절 표 파일의 수정 시각과 크기)"""
+        try:
+            epitran_version = metadata.version('epitran')
+        except metadata.PackageNotFoundError:
+            epitran_version = None
+        syllable_table = None
+        if self._table_stat is not None:
+            syllable_table = [self._table_stat.st_mtime, self._table_stat.st_size]
+        return {'converter': PHONEM_CONVERTER_VERSION, 'epitran': epitran_version,
+                'syllable_table': syllable_table}
+
+
+def _parity_check_and_benchmark(converter: KoreanPhonemConverter, number_of_random_words: int = 20000):
+    """샘플 데이터베이스와 무작위 음절열에서 epitran과의 일치 여부와 처리량을 확인합니다."""
+    import glob
+    import random
+
+    sentences = []
+    for csv_path in sorted(glob.glob('./databases/data_*.csv')):
+        with open(csv_path, encoding='utf-8') as csv_file:
+            sentences += [line.strip() for line in csv_file.read().split('\n')[1:] if line.strip()]
+
+    random.seed(0)
+    common_syllables = [chr(HANGUL_SYLLABLE_BASE + random.randrange(NUMBER_OF_SYLLABLES))
+                        for _ in range(300)] + list(''.join(sentences).replace(' ', ''))
+    random_words = [''.join(random.choice(common_syllables) for _ in range(random.randint(1, 5)))
+                    for _ in range(number_of_random_words)]
+    random_sentences = [' '.join(random.sample(random_words, random.randint(1, 6)))
+                        + random.choice(['', '', '.', '?'])
+                        for _ in range(number_of_random_words // 10)]
+
+    def epitran_only(text):
+        return converter.epitran_model.transliterate(text)
+
+    mismatches = 0
+    for text in sentences + random_words + random_sentences:
+        expected = epitran_only(text)
+        result = converter.syllable_table.transliterate(text, epitran_only)
+        if expected != result:
+            mismatches += 1
+            print('불일치:', text, expected, result)
+    print(f'{len(sentences)}개 문장, {len(random_words)}개 단어, {len(random_sentences)}개 무작위 문장: '
+          f'불일치 {mismatches}건')
+
+    words = [word for sentence in sentences for word in sentence.split()] + random_words
+    start = time.perf_counter()
+    for word in words:
+        epitran_only(word)
+    epitran_rate = len(words) / (time.perf_counter() - start)
+    calls_to_epitran = []
+
+    def counting_epitran(text):
+        calls_to_epitran.append(text)
+        return epitran_only(text)
+
+    start = time.perf_counter()
+    for word in words:
+        converter.syllable_table.transliterate(word, counting_epitran)
+    table_rate = len(words) / (time.perf_counter() - start)
+    print(f'epitran: {epitran_rate:,.0f} 단어/초, 음절 표 (캐시 없음): {table_rate:,.0f} 단어/초, '
+          f'epitran 대체 비율 {len(calls_to_epitran) / len(words):.1%}')
+    return mismatches
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'build':
+        print('한글 음절 IPA 표 생성 중...')
+        HangulSyllableTable.build(epitran.Epitran('kor-Hang')).save(HANGUL_TABLE_PATH)
+        print(f'저장 완료: {HANGUL_TABLE_PATH}')
+
+    _parity_check_and_benchmark(KoreanPhonemConverter(cache_size=0))
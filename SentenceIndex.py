@@ -0,0 +1,302 @@
+"""
+참조 문장 인덱스
+
+databases/data_<언어>.csv의 문장마다 단어 분할, 단어별 IPA, 문장 전체 IPA와 채점용 정수 코드
+배열(문장부호를 지우고 소문자로 바꾼 단어의 유니코드 코드 포인트)을 미리 계산해
+databases/index_<언어>/ 아래에 저장합니다. 채점은 이 코드를 EditDistance.edit_distance_pairs에
+그대로 넘기므로 참조 단어를 요청마다 다시 인코딩하지 않습니다. 모든 배열은 .npy 파일로 저장되어 메모리
+매핑으로 읽히므로, 코퍼스가 커져도 시작 시간과 워커별 메모리가 늘어나지 않습니다.
+
+문장은 blake2b 8바이트 해시로 찾습니다. 해시 배열을 정렬해 두고 이진 탐색하며,
+충돌에 대비해 저장된 문장 원문과 한 번 더 비교합니다.
+
+인덱스가 없거나, CSV가 인덱스보다 새롭거나, IPA 변환기 버전(변환 코드, epitran, 음절 표)이
+바뀌었으면 get_sentence_index가 시작 시 다시 만듭니다.
+직접 만들려면 다음을 실행합니다:
+
+    python SentenceIndex.py [언어]
+"""
+import json
+import os
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from hashlib import blake2b
+from string import punctuation
+from typing import NamedTuple, Optional
+import utilsFileIO
+import SentenceStore
+
+INDEX_FOLDER_TEMPLATE = './databases/index_{language}'
+INDEX_FORMAT_VERSION = 3
+# 인덱스마다 기억할 최근 조회 문장 수
+REFERENCE_CACHE_SIZE = 1024
+# 채점 전에 단어에서 지우는 문자 (PronunciationTrainer.getPronunciationAccuracy도 이 표를 사용합니다)
+PUNCTUATION_TABLE = str.maketrans('', '', punctuation)
+
+
+class ReferenceSentence(NamedTuple):
+    """인덱스에 저장된 참조 문장 하나의 전처리 결과"""
+    sentence: str
+    words: tuple
+    words_ipa: tuple
+    ipa: str
+    word_codes: np.ndarray    # (단어 수, 최대 길이) 채점용 코드 포인트 (uint32, 0으로 패딩, 읽기 전용)
+    word_lengths: np.ndarray  # 단어별 코드 길이
+
+
+def scoring_word(word: str) -> str:
+    """채점에서 비교하는 단어 형태 (문장부호 제거, 소문자)"""
+    return word.translate(PUNCTUATION_TABLE).lower()
+
+
+def text_hash(text: str) -> int:
+    """앞뒤 공백을 제거한 문장의 blake2b 8바이트 해시를 부호 없는 정수로 반환합니다."""
+    digest = blake2b(text.strip().encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+class SentenceIndex:
+    """메모리 매핑된 참조 문장 인덱스"""
+
+    def __init__(self, index_folder: str) -> None:
+        self.index_folder = index_folder
+        with open(os.path.join(index_folder, 'meta.json'), encoding='utf-8') as meta_file:
+            self.meta = json.load(meta_file)
+
+        def load(name):
+            return np.load(os.path.join(index_folder, name + '.npy'), mmap_mode='r')
+
+        self.records = utilsFileIO.MappedStringArray(os.path.join(index_folder, 'records'))
+        self.sorted_hashes = load('sorted_hashes')
+        self.sorted_positions = load('sorted_positions')
+        self.word_offsets = load('word_offsets')
+        self.code_offsets = load('code_offsets')
+        self.codes = load('codes')
+        # 최근 조회한 문장 (여러 요청이 공유하므로 ReferenceSentence는 튜플로만 구성합니다)
+        self._references = OrderedDict()
+        self._references_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def lookup(self, text: str) -> Optional[ReferenceSentence]:
+        """
+        문장 원문으로 참조 문장을 찾습니다.
+
+        Args:
+            text: 참조 문장 (앞뒤 공백은 무시)
+
+        Returns:
+            ReferenceSentence, 인덱스에 없으면 None
+        """
+        if text is None:
+            return None
+        key = np.uint64(text_hash(text))
+        position = int(np.searchsorted(self.sorted_hashes, key))
+        text = text.strip()
+        while position < len(self.sorted_hashes) and self.sorted_hashes[position] == key:
+            reference = self.getByPosition(int(self.sorted_positions[position]))
+            if reference.sentence.strip() == text:
+                return reference
+            position += 1
+        return None
+
+    def getByPosition(self, idx: int) -> ReferenceSentence:
+        """CSV에서의 순서로 참조 문장을 반환합니다."""
+        with self._references_lock:
+            reference = self._references.get(idx)
+            if reference is not None:
+                self._references.move_to_end(idx)
+                return reference
+
+        record = json.loads(self.records[idx])
+        first_word, last_word = int(self.word_offsets[idx]), int(self.word_offsets[idx + 1])
+        word_codes, word_lengths = self._wordCodes(first_word, last_word)
+        reference = ReferenceSentence(record['sentence'], tuple(record['words']),
+                                      tuple(record['words_ipa']), record['ipa'],
+                                      word_codes, word_lengths)
+        with self._references_lock:
+            self._references[idx] = reference
+            if len(self._references) > REFERENCE_CACHE_SIZE:
+                self._references.popitem(last=False)
+        return reference
+
+    def _wordCodes(self, first_word: int, last_word: int) -> tuple:
+        """단어 범위의 코드를 EditDistance._encode_strings와 같은 (단어 수, 최대 길이) 배열로 펼칩니다."""
+        code_offsets = np.asarray(self.code_offsets[first_word:last_word + 1])
+        word_lengths = np.diff(code_offsets).astype(np.intp)
+        word_codes = np.zeros((len(word_lengths), max(int(word_lengths.max(initial=0)), 1)), dtype=np.uint32)
+        flat_codes = self.codes[int(code_offsets[0]):int(code_offsets[-1])]
+        rows = np.repeat(np.arange(len(word_lengths)), word_lengths)
+        columns = np.arange(len(flat_codes)) - np.repeat(code_offsets[:-1] - code_offsets[0], word_lengths)
+        word_codes[rows, columns] = flat_codes
+        word_codes.flags.writeable = False
+        word_lengths.flags.writeable = False
+        return word_codes, word_lengths
+
+    def isStale(self, csv_path: str, converter_version: dict = None) -> bool:
+        """
+        CSV나 IPA 변환기가 인덱스를 만든 뒤 바뀌었는지 확인합니다.
+
+        Args:
+            csv_path: 원본 CSV 경로
+            converter_version: 현재 변환기의 getVersion() 결과 (None이면 비교하지 않음)
+        """
+        if self.meta.get('version') != INDEX_FORMAT_VERSION:
+            return True
+        if converter_version is not None and self.meta.get('converter_version') != converter_version:
+            return True
+        try:
+            source_stat = os.stat(csv_path)
+        except OSError:
+            return False
+        return (source_stat.st_mtime > self.meta.get('source_mtime', 0)
+                or source_stat.st_size != self.meta.get('source_size'))
+
+    @staticmethod
+    def build(sentences: list, phonem_converter, index_folder: str, csv_path: str = None,
+              converter_version: dict = None) -> None:
+        """
+        문장 목록을 전처리해 인덱스 폴더에 저장합니다.
+
+        다른 프로세스가 같은 인덱스를 읽고 있을 수 있으므로 임시 폴더에 모두 쓴 뒤
+        폴더를 교체합니다.
+
+        Args:
+            sentences: 참조 문장 목록
+            phonem_converter: convertToPhonem을 제공하는 IPA 변환기
+            index_folder: 저장할 폴더
+            csv_path: 원본 CSV 경로 (갱신 여부 확인용)
+            converter_version: 변환기의 getVersion() 결과 (갱신 여부 확인용)
+        """
+        records = []
+        word_counts = []
+        scoring_words = []
+        for sentence in sentences:
+            words = sentence.split()
+            words_ipa = [phonem_converter.convertToPhonem(word) for word in words]
+            records.append(json.dumps({'sentence': sentence, 'words': words,
+                                       'words_ipa': words_ipa,
+                                       'ipa': phonem_converter.convertToPhonem(sentence)},
+                                      ensure_ascii=False))
+            word_counts.append(len(words))
+            scoring_words += [scoring_word(word) for word in words]
+
+        hashes = np.array([text_hash(sentence) for sentence in sentences], dtype=np.uint64)
+        sorted_positions = np.argsort(hashes, kind='stable')
+        word_offsets = np.zeros(len(sentences) + 1, dtype=np.int64)
+        np.cumsum(word_counts, out=word_offsets[1:])
+        code_offsets = np.zeros(len(scoring_words) + 1, dtype=np.int64)
+        np.cumsum([len(word) for word in scoring_words], out=code_offsets[1:])
+        codes = np.frombuffer(''.join(scoring_words).encode('utf-32-le'), dtype=np.uint32)
+
+        meta = {'version': INDEX_FORMAT_VERSION, 'number_of_sentences': len(sentences),
+                'source': csv_path, 'built_at': time.time(), 'converter_version': converter_version}
+        if csv_path is not None and os.path.exists(csv_path):
+            source_stat = os.stat(csv_path)
+            meta.update(source_mtime=source_stat.st_mtime, source_size=source_stat.st_size)
+
+        temporary_folder = f'{index_folder}.tmp-{os.getpid()}'
+        os.makedirs(temporary_folder, exist_ok=True)
+        utilsFileIO.saveStringArray(os.path.join(temporary_folder, 'records'), records)
+        for name, array in (('sorted_hashes', hashes[sorted_positions]),
+                            ('sorted_positions', sorted_positions.astype(np.int64)),
+                            ('word_offsets', word_offsets), ('code_offsets', code_offsets),
+                            ('codes', codes)):
+            np.save(os.path.join(temporary_folder, name + '.npy'), array)
+        with open(os.path.join(temporary_folder, 'meta.json'), 'w', encoding='utf-8') as meta_file:
+            json.dump(meta, meta_file, ensure_ascii=False, indent=2)
+
+        utilsFileIO.replaceFolder(temporary_folder, index_folder)
+
+
+def get_converter_version(phonem_converter) -> Optional[dict]:
+    """변환기가 getVersion을 제공하면 그 결과를, 아니면 None을 반환합니다."""
+    get_version = getattr(phonem_converter, 'getVersion', None)
+    return get_version() if get_version is not None else None
+
+
+def load_or_build(language: str, phonem_converter=None) -> SentenceIndex:
+    """
+    언어별 인덱스를 읽고, 없거나 CSV 또는 IPA 변환기가 바뀌었으면 다시 만듭니다.
+
+    Args:
+        language: 언어 코드
+        phonem_converter: 인덱스를 만들 때 사용할 변환기 (None이면 공유 변환기 사용)
+
+    Returns:
+        SentenceIndex 인스턴스
+    """
+    csv_path = SentenceStore.CSV_PATH_TEMPLATE.format(language=language)
+    index_folder = INDEX_FOLDER_TEMPLATE.format(language=language)
+
+    if phonem_converter is None:
+        import RuleBasedModels
+        phonem_converter = RuleBasedModels.get_phonem_converter(language)
+    converter_version = get_converter_version(phonem_converter)
+
+    if os.path.exists(os.path.join(index_folder, 'meta.json')):
+        index = SentenceIndex(index_folder)
+        if not index.isStale(csv_path, converter_version):
+            return index
+
+    start = time.time()
+    sentences = list(SentenceStore.load_or_convert(language))
+    SentenceIndex.build(sentences, phonem_converter, index_folder, csv_path, converter_version)
+    print(f'참조 문장 인덱스 생성: {index_folder} ({len(sentences)}문장, '
+          f'{time.time() - start:.1f}초)')
+    return SentenceIndex(index_folder)
+
+
+# 언어별로 프로세스 전체에서 공유하는 인덱스
+_sentence_indexes = {}
+_sentence_indexes_lock = threading.Lock()
+
+
+def get_sentence_index(language: str) -> Optional[SentenceIndex]:
+    """
+    언어별 공유 인덱스를 반환합니다. 인덱스를 만들 수 없으면 None을 반환하며,
+    호출하는 쪽은 기존처럼 문장을 직접 변환합니다.
+    """
+    with _sentence_indexes_lock:
+        if language not in _sentence_indexes:
+            try:
+                _sentence_indexes[language] = load_or_build(language)
+            except (OSError, ValueError, KeyError) as error:
+                print(f'참조 문장 인덱스를 사용할 수 없습니다 ({language}): {error}')
+                _sentence_indexes[language] = None
+        return _sentence_indexes[language]
+
+
+if __name__ == "__main__":
+    import sys
+    import EditDistance
+    import RuleBasedModels
+
+    language = sys.argv[1] if len(sys.argv) > 1 else 'ko'
+    converter = RuleBasedModels.get_phonem_converter(language)
+    csv_path = SentenceStore.CSV_PATH_TEMPLATE.format(language=language)
+    index_folder = INDEX_FOLDER_TEMPLATE.format(language=language)
+    sentences = list(SentenceStore.load_or_convert(language))
+    SentenceIndex.build(sentences, converter, index_folder, csv_path,
+                        get_converter_version(converter))
+    index = SentenceIndex(index_folder)
+
+    mismatches = 0
+    start = time.perf_counter()
+    for sentence in sentences:
+        reference = index.lookup(sentence)
+        if (reference is None or reference.ipa != converter.convertToPhonem(sentence)
+                or reference.words_ipa != tuple(converter.convertToPhonem(word) for word in sentence.split())):
+            mismatches += 1
+            continue
+        expected_codes, expected_lengths = EditDistance._encode_strings(
+            [scoring_word(word) for word in sentence.split()] or [''])
+        if (not np.array_equal(reference.word_lengths, expected_lengths[:len(reference.words)])
+                or not np.array_equal(reference.word_codes[:, :expected_codes.shape[1]],
+                                      expected_codes[:len(reference.words)])):
+            mismatches += 1
+    print(f'{index_folder}: {len(index)}문장, 불일치 {mismatches}건 '
+          f'({(time.perf_counter() - start) * 1e3:.1f} ms)')
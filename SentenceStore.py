@@ -0,0 +1,88 @@
+"""
+메모리 매핑 문장 저장소
+
+문장 데이터베이스를 하나의 연속된 UTF-8 바이트 덩어리와 오프셋 배열(.npy)로 저장하고
+메모리 매핑으로 읽습니다. 항목 접근은 O(1)이고 파일 전체를 메모리에 올리지 않으므로
+수백만 문장도 워커 시작 시간과 메모리에 영향을 주지 않으며, fork된 워커 프로세스들이
+같은 페이지 캐시를 읽기 전용으로 공유합니다.
+
+';'로 구분된 CSV(databases/data_<언어>.csv)에서 변환하며, CSV가 저장소보다 새로우면
+load_or_convert가 다시 변환합니다. 직접 변환하려면 다음을 실행합니다:
+
+    python SentenceStore.py [CSV 경로 ...]
+"""
+import csv
+import os
+import time
+import utilsFileIO
+
+CSV_PATH_TEMPLATE = './databases/data_{language}.csv'
+STORE_FOLDER_TEMPLATE = './databases/sentences_{language}'
+
+
+def read_csv_sentences(csv_path: str):
+    """';'로 구분된 CSV의 sentence 열을 한 줄씩 읽습니다."""
+    with open(csv_path, encoding='utf-8', newline='') as csv_file:
+        for row in csv.DictReader(csv_file, delimiter=';'):
+            if row.get('sentence'):
+                yield row['sentence']
+
+
+def convert_csv(csv_path: str, store_folder: str) -> int:
+    """
+    CSV 문장 데이터베이스를 저장소로 변환합니다.
+
+    Args:
+        csv_path: ';'로 구분되고 sentence 열이 있는 CSV 경로
+        store_folder: 저장할 폴더
+
+    Returns:
+        저장된 문장 수
+    """
+    sentences = list(read_csv_sentences(csv_path))
+    temporary_folder = f'{store_folder}.tmp-{os.getpid()}'
+    os.makedirs(temporary_folder, exist_ok=True)
+    utilsFileIO.saveStringArray(os.path.join(temporary_folder, 'sentences'), sentences)
+    utilsFileIO.replaceFolder(temporary_folder, store_folder)
+    return len(sentences)
+
+
+def is_stale(csv_path: str, store_folder: str) -> bool:
+    """저장소가 없거나 CSV가 저장소보다 새로운지 확인합니다."""
+    offsets_path = os.path.join(store_folder, 'sentences_offsets.npy')
+    if not os.path.exists(offsets_path):
+        return True
+    return os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(offsets_path)
+
+
+def load_or_convert(language: str) -> utilsFileIO.MappedStringArray:
+    """
+    언어별 문장 저장소를 읽고, 없거나 CSV보다 오래되었으면 다시 변환합니다.
+
+    Args:
+        language: 언어 코드
+
+    Returns:
+        문장을 인덱스로 읽을 수 있는 MappedStringArray
+    """
+    csv_path = CSV_PATH_TEMPLATE.format(language=language)
+    store_folder = STORE_FOLDER_TEMPLATE.format(language=language)
+    if is_stale(csv_path, store_folder):
+        start = time.time()
+        number_of_sentences = convert_csv(csv_path, store_folder)
+        print(f'문장 저장소 생성: {store_folder} ({number_of_sentences}문장, '
+              f'{time.time() - start:.2f}초)')
+    return utilsFileIO.MappedStringArray(os.path.join(store_folder, 'sentences'))
+
+
+if __name__ == "__main__":
+    import glob
+    import sys
+
+    csv_paths = sys.argv[1:] or sorted(glob.glob(CSV_PATH_TEMPLATE.format(language='*')))
+    for csv_path in csv_paths:
+        language = os.path.basename(csv_path)[len('data_'):-len('.csv')]
+        store_folder = STORE_FOLDER_TEMPLATE.format(language=language)
+        start = time.time()
+        number_of_sentences = convert_csv(csv_path, store_folder)
+        print(f'{csv_path} -> {store_folder}: {number_of_sentences}문장 ({time.time() - start:.2f}초)')
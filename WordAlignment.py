@@ -0,0 +1,210 @@
+"""
+단어 대 단어 매핑에 특화된 단조(monotonic) DTW 정렬기
+
+dtwalign.dtw_from_distance_matrix(X).get_warping_path()와 동일한 결과를 반환합니다
+(symmetric2 스텝 패턴, 동일한 역추적 우선순위). 일반 라이브러리와 달리 누적 비용 행렬
+전체를 보관하지 않고 두 행만 유지하며, 역추적에는 셀당 1바이트의 방향 정보만 저장합니다.
+긴 문단에는 선택적으로 Sakoe-Chiba 밴드를 적용해 계산할 셀 수를 줄일 수 있습니다.
+
+거리 행렬의 값은 편집 거리처럼 음이 아닌 정수라고 가정합니다. 행 내부의 수평 전파를
+누적 합으로 계산하므로, 정수가 아닌 비용에서는 부동소수점 반올림 순서가 달라질 수 있습니다.
+"""
+import numpy as np
+
+# 역추적 방향 (dtwalign symmetric2의 패턴 순서와 동일 - 동점이면 앞의 방향을 선택)
+STEP_UP = 0         # (i-1, j)
+STEP_DIAGONAL = 1   # (i-1, j-1)
+STEP_LEFT = 2       # (i, j-1)
+
+
+def align_distance_matrix(distance_matrix: np.ndarray, band: int = None) -> np.ndarray:
+    """
+    거리 행렬을 DTW로 정렬하고 열(참조)마다 매핑된 행(쿼리) 인덱스를 반환합니다.
+
+    Args:
+        distance_matrix: (쿼리 길이, 참조 길이) 크기의 음이 아닌 거리 행렬
+        band: Sakoe-Chiba 밴드 폭 (None이면 제한 없음). 끝점에 도달할 수 있도록
+              최소 |쿼리 길이 - 참조 길이|로 넓혀집니다.
+
+    Returns:
+        참조 열마다 매핑된 쿼리 행 인덱스 (dtwalign의 get_warping_path()와 동일)
+    """
+    distance_matrix = np.asarray(distance_matrix, dtype=np.float64)
+    number_of_rows, number_of_columns = distance_matrix.shape
+    if number_of_rows == 0 or number_of_columns == 0:
+        return np.zeros(number_of_columns, dtype=np.int64)
+
+    if band is not None:
+        band = max(int(band), abs(number_of_rows - number_of_columns))
+
+    directions = _cumulative_directions(distance_matrix, band)
+    return _last_row_per_column(directions, number_of_rows - 1, number_of_columns - 1)
+
+
+def align_distance_matrices(distance_matrices: np.ndarray, row_lengths: np.ndarray,
+                            column_lengths: np.ndarray) -> list:
+    """
+    패딩된 여러 거리 행렬을 한 번의 배치 DP로 정렬합니다.
+
+    각 행렬의 유효 영역은 왼쪽 위 (row_lengths[k], column_lengths[k]) 부분입니다.
+    DTW 누적 비용은 위/왼쪽 셀에만 의존하므로 오른쪽/아래 패딩 값은 결과에 영향을 주지 않습니다.
+
+    Args:
+        distance_matrices: (배치, 최대 쿼리 길이, 최대 참조 길이) 크기의 거리 행렬
+        row_lengths: 행렬마다 유효한 쿼리 길이
+        column_lengths: 행렬마다 유효한 참조 길이
+
+    Returns:
+        행렬마다 align_distance_matrix와 같은 매핑 배열의 리스트
+    """
+    distance_matrices = np.asarray(distance_matrices, dtype=np.float64)
+    if distance_matrices.size == 0:
+        return [np.zeros(int(number_of_columns), dtype=np.int64)
+                for number_of_columns in column_lengths]
+
+    directions = _cumulative_directions(distance_matrices)
+    mapped_indices = []
+    for matrix_idx, (number_of_rows, number_of_columns) in enumerate(zip(row_lengths, column_lengths)):
+        if number_of_rows == 0 or number_of_columns == 0:
+            mapped_indices.append(np.zeros(int(number_of_columns), dtype=np.int64))
+            continue
+        mapped_indices.append(_last_row_per_column(
+            directions[matrix_idx], int(number_of_rows) - 1, int(number_of_columns) - 1))
+    return mapped_indices
+
+
+def _cumulative_directions(distance_matrix: np.ndarray, band: int = None) -> np.ndarray:
+    """
+    symmetric2 누적 비용을 행 단위로 계산하고 셀마다 역추적 방향을 기록합니다.
+    앞쪽 축은 배치 차원으로 취급되어 여러 행렬을 동시에 계산합니다.
+
+    D[i, j] = min(D[i-1, j] + x, D[i-1, j-1] + 2x, D[i, j-1] + x),  x = X[i, j]
+
+    수평 항은 행 내부에서 순차 의존이 있으므로 누적 합 S와 누적 최소값으로 풀어냅니다:
+    D[i, j] = S[j] + min_k<=j (T[k] - S[k]),  T = 수직/대각 후보의 최소값.
+    """
+    *batch_shape, number_of_rows, number_of_columns = distance_matrix.shape
+    row_shape = (*batch_shape, number_of_columns)
+    columns = np.arange(number_of_columns)
+    directions = np.empty(distance_matrix.shape, dtype=np.int8)
+
+    previous_row = np.full(row_shape, np.inf)
+    current_row = np.empty(row_shape)
+    candidates = np.empty((3, *row_shape))
+    for i in range(number_of_rows):
+        costs = distance_matrix[..., i, :]
+        if i == 0:
+            current_row.fill(np.inf)
+            current_row[..., 0] = costs[..., 0]
+        else:
+            np.add(previous_row, costs, out=current_row)
+            current_row[..., 1:] = np.minimum(current_row[..., 1:],
+                                              previous_row[..., :-1] + 2 * costs[..., 1:])
+
+        if band is not None:
+            outside = np.abs(columns - i) > band
+            current_row[..., outside] = np.inf
+
+        cumulative_costs = np.cumsum(costs, axis=-1)
+        current_row -= cumulative_costs
+        np.minimum.accumulate(current_row, axis=-1, out=current_row)
+        current_row += cumulative_costs
+
+        if band is not None:
+            current_row[..., outside] = np.inf
+
+        # 역추적 방향: 선행 셀의 누적 비용이 가장 작은 쪽 (dtwalign과 같은 기준)
+        candidates[STEP_UP] = previous_row
+        candidates[STEP_DIAGONAL, ..., 0] = np.inf
+        candidates[STEP_DIAGONAL, ..., 1:] = previous_row[..., :-1]
+        candidates[STEP_LEFT, ..., 0] = np.inf
+        candidates[STEP_LEFT, ..., 1:] = current_row[..., :-1]
+        directions[..., i, :] = np.argmin(candidates, axis=0)
+
+        previous_row, current_row = current_row, previous_row
+
+    return directions
+
+
+def _last_row_per_column(directions: np.ndarray, last_row: int, last_column: int) -> np.ndarray:
+    """
+    끝점에서 (0, 0)까지 역추적하며 열마다 경로가 지나는 가장 큰 행을 기록합니다.
+
+    dtwalign의 get_warping_path()는 경로를 선형 보간(np.interp)하므로 한 열에 여러 행이
+    매핑되면 마지막(가장 큰) 행을 반환하고, 첫 열은 항상 경로의 최소 행(0)으로 덮어씁니다.
+    역방향으로 진행할 때 새 열에 처음 들어온 지점이 그 열의 가장 큰 행입니다.
+    """
+    step_of = directions.tolist()
+    last_rows = [0] * (last_column + 1)
+    i, j = last_row, last_column
+    last_rows[j] = i
+    while i != 0 or j != 0:
+        step = step_of[i][j]
+        if step == STEP_UP:
+            i -= 1
+            continue
+        if step == STEP_DIAGONAL:
+            i -= 1
+        j -= 1
+        last_rows[j] = i
+    last_rows[0] = 0
+    return np.array(last_rows, dtype=np.int64)
+
+
+def _parity_check(csv_path: str = './databases/data_ko.csv', number_of_trials: int = 2000):
+    """data_ko.csv 문장 코퍼스에서 dtwalign과 결과가 같은지 확인합니다."""
+    import random
+    import time
+    import WordMatching
+    from dtwalign import dtw_from_distance_matrix
+
+    with open(csv_path, encoding='utf-8') as csv_file:
+        sentences = [line.strip() for line in csv_file.read().split('\n')[1:] if line.strip()]
+
+    def perturb(words):
+        # 단어 누락/추가/변형을 섞어 실제 인식 결과와 비슷한 추정 문장을 만듭니다
+        estimated = []
+        for word in words:
+            dice = random.random()
+            if dice < 0.1:
+                continue
+            if dice < 0.2:
+                word = word + random.choice(sentences[0])
+            elif dice < 0.3:
+                word = word[:-1] or word
+            estimated.append(word)
+            if random.random() < 0.1:
+                estimated.append(random.choice(words))
+        return estimated
+
+    random.seed(0)
+    mismatches = 0
+    native_time = reference_time = 0.
+    for _ in range(number_of_trials):
+        words_real = random.choice(sentences).split()
+        if random.random() < 0.3:
+            # 문단 모드처럼 여러 문장을 이어 붙입니다
+            words_real += random.choice(sentences).split()
+        words_estimated = perturb(words_real)
+
+        pairs = [(words_estimated, words_real)]
+        pairs += [(estimated, real) for estimated, real in zip(words_estimated, words_real)]
+        for estimated, real in pairs:
+            distance_matrix = WordMatching.get_word_distance_matrix(estimated, real).T
+            start = time.perf_counter()
+            expected = dtw_from_distance_matrix(distance_matrix).get_warping_path()
+            reference_time += time.perf_counter() - start
+            start = time.perf_counter()
+            mapped = align_distance_matrix(distance_matrix)
+            native_time += time.perf_counter() - start
+            if not np.array_equal(expected, mapped):
+                mismatches += 1
+                print('불일치:', estimated, real, expected, mapped)
+
+    print(f'dtwalign {reference_time * 1e3:.1f} ms, WordAlignment {native_time * 1e3:.1f} ms, '
+          f'불일치 {mismatches}건')
+    return mismatches
+
+
+if __name__ == "__main__":
+    _parity_check()
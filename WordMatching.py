@@ -1,8 +1,7 @@
-import WordMetrics
+import EditDistance
 import numpy as np
 from string import punctuation
-from dtwalign import dtw_from_distance_matrix
-import time
+import WordAlignment
 from typing import List, Tuple
 
 offset_blank = 1
@@ -15,20 +14,18 @@ def get_word_distance_matrix(words_estimated: list, words_real: list) -> np.ndar
 
     word_distance_matrix = np.zeros(
         (number_of_estimated_words+offset_blank, number_of_real_words))
-    for idx_estimated in range(number_of_estimated_words):
-        for idx_real in range(number_of_real_words):
-            word_distance_matrix[idx_estimated, idx_real] = WordMetrics.edit_distance_python(
-                words_estimated[idx_estimated], words_real[idx_real])
+    # 모든 (추정, 실제) 단어 쌍을 한 번의 배치 호출로 계산 (반복되는 쌍은 재사용)
+    word_distance_matrix[:number_of_estimated_words] = EditDistance.edit_distance_matrix(
+        words_estimated, words_real)
 
     if offset_blank == 1:
-        for idx_real in range(number_of_real_words):
-            word_distance_matrix[number_of_estimated_words,
-                                 idx_real] = len(words_real[idx_real])
+        word_distance_matrix[number_of_estimated_words] = [
+            len(word_real) for word_real in words_real]
     return word_distance_matrix
 
 
 # get_best_path_from_distance_matrix 함수 제거됨 - cp_model(or-tools)이 필요했지만
-# 설치되지 않았고 사용되지 않았음 (use_dtw=True가 항상 사용됨)
+# 설치되지 않았고 사용되지 않았음 (항상 DTW로 매핑함)
 
 
 def get_resulting_string(mapped_indices: np.ndarray, words_estimated: list, words_real: list) -> Tuple[List,List]:
@@ -36,9 +33,15 @@ def get_resulting_string(mapped_indices: np.ndarray, words_estimated: list, word
     mapped_words_indices = []
     WORD_NOT_FOUND_TOKEN = '-'
     number_of_real_words = len(words_real)
+
+    # 경로를 한 번만 훑어 실제 단어마다 매핑된 추정 단어 위치를 모읍니다
+    positions_of_real_words = [[] for _ in range(number_of_real_words)]
+    for position, word_idx in enumerate(np.asarray(mapped_indices).tolist()):
+        if 0 <= word_idx < number_of_real_words:
+            positions_of_real_words[word_idx].append(position)
+
     for word_idx in range(number_of_real_words):
-        position_of_real_word_indices = np.where(
-            mapped_indices == word_idx)[0].astype(int)
+        position_of_real_word_indices = positions_of_real_words[word_idx]
 
         if len(position_of_real_word_indices) == 0:
             mapped_words.append(WORD_NOT_FOUND_TOKEN)
@@ -59,7 +62,7 @@ def get_resulting_string(mapped_indices: np.ndarray, words_estimated: list, word
                 idx_above_word = single_word_idx >= len(words_estimated)
                 if idx_above_word:
                     continue
-                error_word = WordMetrics.edit_distance_python(
+                error_word = EditDistance.edit_distance(
                     words_estimated[single_word_idx], words_real[word_idx])
                 if error_word < error:
                     error = error_word*1
@@ -73,20 +76,18 @@ def get_resulting_string(mapped_indices: np.ndarray, words_estimated: list, word
     return mapped_words, mapped_words_indices
 
 
-def get_best_mapped_words(words_estimated: list, words_real: list,use_dtw:bool = True) -> list:
+def get_best_mapped_words(words_estimated: list, words_real: list, band: int = None) -> list:
+    """
+    추정 단어를 실제 단어에 DTW로 매핑합니다.
+
+    band를 지정하면 Sakoe-Chiba 밴드 안에서만 정렬하여 긴 문단의 계산량을 줄입니다.
+    """
 
     word_distance_matrix = get_word_distance_matrix(
         words_estimated, words_real)
 
-    start = time.time()
-    
-    if use_dtw:
-        alignment = (dtw_from_distance_matrix(
-                word_distance_matrix.T))
-            
-        mapped_indices = alignment.get_warping_path()[:len(words_estimated)]
-        duration_of_mapping = time.time()-start
-    # else 블록 제거됨 - cp_model(or-tools)이 설치되지 않았고 사용되지 않음
+    mapped_indices = WordAlignment.align_distance_matrix(
+        word_distance_matrix.T, band=band)[:len(words_estimated)]
 
     mapped_words, mapped_words_indices = get_resulting_string(
         mapped_indices, words_estimated, words_real)
@@ -97,17 +98,73 @@ def get_best_mapped_words(words_estimated: list, words_real: list,use_dtw:bool =
 # 더 빠르지만 최적은 아님
 def get_best_mapped_words_dtw(words_estimated: list, words_real: list) -> list:
 
-    from dtwalign import dtw_from_distance_matrix
     word_distance_matrix = get_word_distance_matrix(
         words_estimated, words_real)
-    mapped_indices = dtw_from_distance_matrix(
-        word_distance_matrix).path[:-1, 0]
+    mapped_indices = WordAlignment.align_distance_matrix(
+        word_distance_matrix.T)[:len(words_estimated)]
 
     mapped_words, mapped_words_indices = get_resulting_string(
         mapped_indices, words_estimated, words_real)
     return mapped_words, mapped_words_indices
 
 
+def get_letters_correctness_all_words(mapped_words: list, words_real: list) -> str:
+    """
+    문장의 모든 (매핑된 단어, 실제 단어) 쌍에 대해 글자 정렬을 한 번의 배치로 수행하고
+    is_letter_correct_all_words 비트맵 문자열을 반환합니다.
+
+    단어마다 get_best_mapped_words(mapped_word, word_real)와
+    getWhichLettersWereTranscribedCorrectly를 호출한 결과와 같습니다.
+    (글자 사이 편집 거리는 같으면 0, 다르면 1이고 빈 행의 비용은 1입니다.)
+    """
+    number_of_words = len(words_real)
+    if number_of_words == 0:
+        return ''
+    words_estimated = [mapped_words[idx] for idx in range(number_of_words)]
+
+    real_lengths = np.array([len(word) for word in words_real])
+    estimated_lengths = np.array([len(word) for word in words_estimated])
+
+    # 패딩 코드는 어떤 글자와도 다르므로 빈 열(추정 길이 위치)의 비용은 자동으로 1이 됩니다
+    real_codes = np.full((number_of_words, real_lengths.max()), -1, dtype=np.int64)
+    estimated_codes = np.full((number_of_words, estimated_lengths.max() + offset_blank), -2,
+                              dtype=np.int64)
+    for idx in range(number_of_words):
+        real_codes[idx, :real_lengths[idx]] = [ord(letter) for letter in words_real[idx]]
+        estimated_codes[idx, :estimated_lengths[idx]] = [
+            ord(letter) for letter in words_estimated[idx]]
+    letter_distance_matrices = real_codes[:, :, None] != estimated_codes[:, None, :]
+
+    mapped_letters_all_words = WordAlignment.align_distance_matrices(
+        letter_distance_matrices, real_lengths, estimated_lengths + offset_blank)
+
+    is_letter_correct_all_words = ''
+    for idx, word_real in enumerate(words_real):
+        word_estimated = words_estimated[idx]
+        mapped_letters = mapped_letters_all_words[idx][:len(word_estimated)].tolist()
+
+        positions_of_real_letters = [[] for _ in range(len(word_real))]
+        for position, letter_idx in enumerate(mapped_letters):
+            positions_of_real_letters[letter_idx].append(position)
+
+        is_letter_correct = []
+        for letter_idx, letter in enumerate(word_real):
+            positions = positions_of_real_letters[letter_idx]
+            if len(positions) == 0:
+                mapped_letter = '-'
+            else:
+                # 같은 글자가 있으면 그 위치를, 없으면 첫 위치를 사용 (get_resulting_string과 동일)
+                mapped_letter = next((word_estimated[position] for position in positions
+                                      if word_estimated[position] == letter),
+                                     word_estimated[positions[0]])
+            is_letter_correct.append(
+                1 if letter.lower() == mapped_letter.lower() or letter in punctuation else 0)
+
+        is_letter_correct_all_words += ''.join([str(is_correct)
+                                                for is_correct in is_letter_correct]) + ' '
+    return is_letter_correct_all_words
+
+
 def getWhichLettersWereTranscribedCorrectly(real_word, transcribed_word):
     is_leter_correct = [None]*len(real_word)    
     for idx, letter in enumerate(real_word):   
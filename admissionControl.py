@@ -0,0 +1,200 @@
+"""
+채점 요청 승인 제어 (admission control)
+
+채점 요청은 디코딩 + ASR + 평가에 수 초가 걸리므로, 트래픽이 몰리면 대기열이 끝없이 늘어
+클라이언트가 시간 초과로 떠난 뒤에도 CPU가 그 요청들을 처리하게 됩니다.
+AdmissionController는 채점 앞에서 다음을 수행합니다.
+
+- 대기 + 처리 중인 요청 수를 max_queue_depth로 제한합니다.
+- 최근 단계별 처리 시간(디코딩, 인식, 후처리)의 지수 이동 평균(EWMA)으로 예상 대기 시간을
+  계산하고, 예상 완료 시간이 latency_budget_s를 넘으면 바로 거절합니다 (HTTP 503 + Retry-After).
+- 승인된 뒤 대기열에서 너무 오래 기다려 예산을 넘기게 된 요청은 실행하지 않고 버립니다 (shed).
+- 실행 전에 클라이언트 연결이 끊긴 요청은 취소합니다 (ASGI 서버에서 사용).
+
+대기열 길이와 거절/취소 횟수는 getMetrics()로 확인할 수 있습니다.
+"""
+import math
+import threading
+import time
+
+try:
+    import config
+    _cfg = config.get_config()
+except ImportError:
+    _cfg = {}
+
+# 대기 + 처리 중인 채점 요청의 최대 수
+MAX_QUEUE_DEPTH = _cfg.get('admission_max_queue_depth', 16)
+# 요청 도착부터 응답까지 허용하는 최대 예상 시간 (초)
+LATENCY_BUDGET_S = _cfg.get('scoring_latency_budget_s', 30.0)
+# 처리 시간 기록이 없을 때 사용할 예상 처리 시간 (초)
+INITIAL_SERVICE_TIME_S = 2.0
+# 단계별 처리 시간 EWMA의 가중치 (클수록 최근 요청을 더 반영)
+EWMA_ALPHA = 0.2
+
+
+class AdmissionRejected(Exception):
+    """요청을 승인하지 않았습니다. retry_after_s초 뒤에 다시 시도하도록 안내합니다."""
+
+    def __init__(self, reason: str, retry_after_s: float) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+
+    @property
+    def retryAfterHeader(self) -> str:
+        return str(max(1, math.ceil(self.retry_after_s)))
+
+
+class AdmissionTicket:
+    """승인된 요청 하나 (대기 → 실행 → 완료, 또는 취소/버림)"""
+
+    def __init__(self, controller, estimated_wait_s: float) -> None:
+        self.controller = controller
+        self.admitted_at = time.monotonic()
+        self.estimated_wait_s = estimated_wait_s
+        self.state = 'queued'
+
+    def cancel(self) -> bool:
+        """아직 실행되지 않았으면 취소합니다. 취소했으면 True를 반환합니다."""
+        return self.controller._cancel(self)
+
+
+class AdmissionController:
+
+    def __init__(self, concurrency: int = 1, max_queue_depth: int = MAX_QUEUE_DEPTH,
+                 latency_budget_s: float = LATENCY_BUDGET_S, ewma_alpha: float = EWMA_ALPHA,
+                 initial_service_time_s: float = INITIAL_SERVICE_TIME_S) -> None:
+        """
+        Args:
+            concurrency: 동시에 실행할 채점 요청 수 (나머지는 대기열에서 기다림)
+            max_queue_depth: 대기 + 처리 중인 요청의 최대 수
+            latency_budget_s: 허용하는 최대 예상 응답 시간 (초)
+            ewma_alpha: 단계별 처리 시간 EWMA 가중치
+            initial_service_time_s: 처리 시간 기록이 없을 때의 예상 처리 시간
+        """
+        self.concurrency = max(int(concurrency), 1)
+        self.max_queue_depth = max_queue_depth
+        self.latency_budget_s = latency_budget_s
+        self.ewma_alpha = ewma_alpha
+        self.initial_service_time_s = initial_service_time_s
+
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(self.concurrency)
+        self._stage_times = {}
+        self._queued = 0
+        self._running = 0
+        self._counts = {'admitted': 0, 'completed': 0, 'failed': 0, 'rejected_queue_full': 0,
+                        'rejected_budget': 0, 'shed': 0, 'cancelled': 0}
+
+    def estimatedServiceTime(self) -> float:
+        """단계별 처리 시간 EWMA의 합 (요청 하나의 예상 처리 시간)"""
+        if not self._stage_times:
+            return self.initial_service_time_s
+        return sum(self._stage_times.values())
+
+    def estimatedWait(self) -> float:
+        """지금 도착한 요청이 실행을 시작하기까지의 예상 대기 시간"""
+        ahead = self._queued + self._running
+        if ahead < self.concurrency:
+            return 0.0
+        return ((ahead - self.concurrency) // self.concurrency + 1) * self.estimatedServiceTime()
+
+    def admit(self) -> AdmissionTicket:
+        """
+        요청을 대기열에 넣습니다.
+
+        Raises:
+            AdmissionRejected: 대기열이 가득 찼거나 예상 응답 시간이 예산을 넘는 경우
+        """
+        with self._lock:
+            service_time = self.estimatedServiceTime()
+            wait = self.estimatedWait()
+            if self._queued + self._running >= self.max_queue_depth:
+                self._counts['rejected_queue_full'] += 1
+                raise AdmissionRejected('queue_full', wait)
+            if wait + service_time > self.latency_budget_s:
+                self._counts['rejected_budget'] += 1
+                raise AdmissionRejected('latency_budget', wait + service_time - self.latency_budget_s)
+            self._queued += 1
+            self._counts['admitted'] += 1
+            return AdmissionTicket(self, wait)
+
+    def call(self, ticket: AdmissionTicket, function, *args, **kwargs):
+        """
+        실행 슬롯을 얻은 뒤 function(*args, stage_timings=..., **kwargs)을 실행합니다.
+
+        function은 stage_timings 딕셔너리에 단계 이름별 처리 시간(초)을 기록하며, 기록하지
+        않으면 전체 실행 시간이 'total' 단계로 기록됩니다.
+
+        Raises:
+            AdmissionRejected: 대기 중에 취소되었거나, 기다리는 동안 예산을 넘기게 된 경우
+        """
+        remaining = self.latency_budget_s - (time.monotonic() - ticket.admitted_at)
+        acquired = remaining > 0 and self._slots.acquire(timeout=remaining)
+        try:
+            with self._lock:
+                if ticket.state == 'cancelled':
+                    raise AdmissionRejected('cancelled', 0)
+                waited = time.monotonic() - ticket.admitted_at
+                if not acquired or waited + self.estimatedServiceTime() > self.latency_budget_s:
+                    ticket.state = 'shed'
+                    self._queued -= 1
+                    self._counts['shed'] += 1
+                    raise AdmissionRejected('shed', self.estimatedWait())
+                ticket.state = 'running'
+                self._queued -= 1
+                self._running += 1
+
+            stage_timings = {}
+            start = time.monotonic()
+            try:
+                result = function(*args, stage_timings=stage_timings, **kwargs)
+            except BaseException:
+                self._finish(ticket, {}, failed=True)
+                raise
+            if not stage_timings:
+                stage_timings['total'] = time.monotonic() - start
+            self._finish(ticket, stage_timings)
+            return result
+        finally:
+            if acquired:
+                self._slots.release()
+
+    def run(self, function, *args, **kwargs):
+        """admit과 call을 이어서 실행합니다 (요청마다 스레드를 쓰는 서버용)."""
+        return self.call(self.admit(), function, *args, **kwargs)
+
+    def getMetrics(self) -> dict:
+        """대기열 길이, 처리 중인 요청 수, 단계별 예상 시간과 승인/거절 횟수를 반환합니다."""
+        with self._lock:
+            return {
+                'queue_depth': self._queued,
+                'running': self._running,
+                'concurrency': self.concurrency,
+                'max_queue_depth': self.max_queue_depth,
+                'latency_budget_s': self.latency_budget_s,
+                'estimated_wait_s': self.estimatedWait(),
+                'estimated_service_time_s': self.estimatedServiceTime(),
+                'stage_times_s': dict(self._stage_times),
+                **self._counts
+            }
+
+    def _finish(self, ticket: AdmissionTicket, stage_timings: dict, failed: bool = False) -> None:
+        with self._lock:
+            ticket.state = 'done'
+            self._running -= 1
+            self._counts['failed' if failed else 'completed'] += 1
+            for stage, seconds in stage_timings.items():
+                previous = self._stage_times.get(stage)
+                self._stage_times[stage] = seconds if previous is None else \
+                    previous + self.ewma_alpha * (seconds - previous)
+
+    def _cancel(self, ticket: AdmissionTicket) -> bool:
+        with self._lock:
+            if ticket.state != 'queued':
+                return False
+            ticket.state = 'cancelled'
+            self._queued -= 1
+            self._counts['cancelled'] += 1
+            return True
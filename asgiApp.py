@@ -0,0 +1,354 @@
+"""
+ASGI 웹 애플리케이션 (비동기 프런트엔드)
+
+webApp.py와 같은 경로를 제공하지만, 디코딩 + ASR + 채점처럼 오래 걸리는 작업은 크기가
+제한된 스레드 풀에서 실행하고 이벤트 루프는 요청 수신과 응답만 처리합니다. 채점 풀과
+가벼운 작업(샘플 문장, 정적 파일) 풀을 나누어 두었기 때문에 ASR이 포화되어도 /getSample과
+정적 파일 요청은 기다리지 않습니다. (트레이너와 Whisper 모델은 프로세스 간에 넘길 수 없고,
+torch와 CTranslate2는 추론 중 GIL을 놓으므로 프로세스 풀 대신 스레드 풀을 사용합니다.)
+
+종료 시(lifespan shutdown)에는 새 채점 요청을 503으로 거절하고, 처리 중인 작업이 끝날 때까지
+최대 ASGI_DRAIN_TIMEOUT_S초 기다린 뒤 풀을 닫습니다.
+
+채점 요청은 admissionControl.AdmissionController를 거칩니다. 예상 응답 시간이 예산을 넘으면
+503 + Retry-After로 거절하고, 실행 전에 연결이 끊긴 요청은 취소합니다.
+
+lambda_handler 함수들은 그대로이므로 Lambda 방식 배포에서도 계속 사용할 수 있습니다.
+
+실행 (uvicorn 필요: pip install uvicorn):
+
+    python asgiApp.py [--host 0.0.0.0] [--port 3000]
+    uvicorn asgiApp:app --port 3000
+"""
+import asyncio
+import json
+import mimetypes
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote
+
+import lambdaSpeechToScore
+import lambdaGetSample
+import streamingSession
+import resultCache
+import latencyMetrics
+from admissionControl import AdmissionController, AdmissionRejected
+from webApp import AUDIO_SUFFIXES, admission_gauges
+
+try:
+    import config
+    _cfg = config.get_config()
+except ImportError:
+    _cfg = {}
+
+# 채점(디코딩 + ASR + 평가)을 동시에 실행할 스레드 수
+SCORING_WORKERS = _cfg.get('asgi_scoring_workers', 2)
+# 샘플 문장과 정적 파일을 처리할 스레드 수
+LIGHT_WORKERS = _cfg.get('asgi_light_workers', 4)
+# 종료 시 처리 중인 요청을 기다리는 최대 시간 (초)
+DRAIN_TIMEOUT_S = _cfg.get('asgi_drain_timeout_s', 30)
+# 요청 본문 최대 크기 (바이트)
+MAX_BODY_BYTES = 32 * 1024 * 1024
+
+ROOT_FOLDER = os.path.dirname(os.path.realpath(__file__))
+STATIC_FOLDER = os.path.join(ROOT_FOLDER, 'static')
+INDEX_PATH = os.path.join(ROOT_FOLDER, 'templates', 'main.html')
+
+CORS_HEADERS = [(b'access-control-allow-origin', b'*'),
+                (b'access-control-allow-headers', b'*'),
+                (b'access-control-allow-methods', b'OPTIONS,POST,GET')]
+
+# webApp.py의 오류 응답과 같은 본문
+EMPTY_RESULT = {
+    'statusCode': 200,
+    'headers': {
+        'Access-Control-Allow-Headers': '*',
+        'Access-Control-Allow-Credentials': "true",
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+    },
+    'body': ''
+}
+
+
+class RequestTooLarge(Exception):
+    pass
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+class ASGIApp:
+    """경로별 요청을 스레드 풀로 넘기는 ASGI 애플리케이션"""
+
+    def __init__(self, scoring_workers: int = SCORING_WORKERS, light_workers: int = LIGHT_WORKERS,
+                 drain_timeout_s: float = DRAIN_TIMEOUT_S) -> None:
+        self.scoring_workers = scoring_workers
+        self.light_workers = light_workers
+        self.drain_timeout_s = drain_timeout_s
+        self.scoring_executor = None
+        self.light_executor = None
+        self.draining = False
+        self._in_flight = set()
+        # 채점 스레드 수만큼 실행하고, 예상 응답 시간이 예산을 넘는 요청은 503으로 거절합니다
+        self.admission = AdmissionController(concurrency=scoring_workers)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self._startExecutors()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.drain()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _startExecutors(self):
+        if self.scoring_executor is None:
+            self.scoring_executor = ThreadPoolExecutor(self.scoring_workers, thread_name_prefix='scoring')
+            self.light_executor = ThreadPoolExecutor(self.light_workers, thread_name_prefix='light')
+
+    async def drain(self):
+        """새 채점 요청을 막고 처리 중인 작업을 기다린 뒤 스레드 풀을 닫습니다."""
+        self.draining = True
+        start = time.monotonic()
+        if self._in_flight:
+            print(f'처리 중인 요청 {len(self._in_flight)}개를 기다립니다 (최대 {self.drain_timeout_s}초)')
+            await asyncio.wait(set(self._in_flight), timeout=self.drain_timeout_s)
+        for executor in (self.scoring_executor, self.light_executor):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        print(f'종료 준비 완료 ({time.monotonic() - start:.1f}초, 남은 요청 {len(self._in_flight)}개)')
+
+    async def _http(self, scope, receive, send):
+        # lifespan을 지원하지 않는 서버에서도 동작하도록 처음 요청에서 풀을 만듭니다
+        self._startExecutors()
+        method, path = scope['method'], scope['path']
+
+        if method == 'OPTIONS':
+            await self._respond(send, 200, b'')
+            return
+
+        try:
+            if method == 'GET':
+                if path == '/':
+                    await self._sendFile(send, INDEX_PATH)
+                elif path == '/getAdmissionMetrics':
+                    await self._respondResult(send, self.admission.getMetrics())
+                elif path == '/getResultCacheStats':
+                    result_cache = resultCache.get_result_cache()
+                    await self._respondResult(send, result_cache.getStats() if result_cache is not None else {})
+                elif path == '/metrics':
+                    metrics = latencyMetrics.render_prometheus(admission_gauges(self.admission.getMetrics()))
+                    await self._respond(send, 200, metrics.encode('utf-8'),
+                                        'text/plain; version=0.0.4; charset=utf-8')
+                elif path == '/getRequestTraces':
+                    await self._respondResult(send, {'enabled': latencyMetrics.ENABLE_REQUEST_TRACES,
+                                                     'traces': latencyMetrics.get_recent_traces()})
+                elif path.startswith('/static/'):
+                    await self._sendFile(send, os.path.join(STATIC_FOLDER, unquote(path[len('/static/'):])))
+                else:
+                    await self._respond(send, 404, b'Not Found', 'text/plain')
+                return
+
+            if method != 'POST':
+                await self._respond(send, 405, b'Method Not Allowed', 'text/plain')
+                return
+
+            if path == '/getSample':
+                body = await self._readBody(receive)
+                event = {'body': json.dumps(json.loads(body))}
+                result = await self._run(self.light_executor, lambdaGetSample.lambda_handler, event, [])
+                await self._respondResult(send, result)
+            elif path in ('/GetAccuracyFromRecordedAudio', '/GetAccuracyFromRecordedAudioBinary'):
+                if self.draining:
+                    await self._respond(send, 503, b'Server is shutting down', 'text/plain',
+                                        [(b'retry-after', b'5')])
+                    return
+                body = await self._readBody(receive)
+                ticket = self.admission.admit()
+                result = await self._score(scope, path, body, ticket, receive)
+                await self._respondResult(send, result)
+            elif path == '/startStreamingSession':
+                data = json.loads(await self._readBody(receive))
+                result = await self._run(self.light_executor, lambdaSpeechToScore.start_stream, data['title'],
+                                         data.get('language', 'ko'), data.get('sampleRate', 16000))
+                await self._respondResult(send, result)
+            elif path == '/streamAudioChunk':
+                query = _parse_query(scope)
+                body = await self._readBody(receive)
+                result = await self._run(self.light_executor, lambdaSpeechToScore.add_stream_chunk,
+                                         query.get('session', ''), body, query.get('format', 'f32'))
+                await self._respondResult(send, result)
+            elif path == '/finishStreamingSession':
+                if self.draining:
+                    await self._respond(send, 503, b'Server is shutting down', 'text/plain',
+                                        [(b'retry-after', b'5')])
+                    return
+                session_id = _parse_query(scope).get('session', '')
+                await self._readBody(receive)
+                ticket = self.admission.admit()
+                result = await self._runAdmitted(ticket, receive, lambdaSpeechToScore.finish_stream, session_id)
+                await self._respondResult(send, result)
+            else:
+                await self._respond(send, 404, b'Not Found', 'text/plain')
+        except RequestTooLarge:
+            await self._respond(send, 413, b'Request Entity Too Large', 'text/plain')
+        except AdmissionRejected as rejected:
+            body = json.dumps({'error': rejected.reason, 'retry_after': rejected.retryAfterHeader})
+            await self._respond(send, 503, body.encode('utf-8'), 'application/json',
+                                [(b'retry-after', rejected.retryAfterHeader.encode('latin-1'))])
+        except ClientDisconnected:
+            # 응답을 받을 클라이언트가 없습니다
+            pass
+        except streamingSession.StreamingSessionError:
+            await self._respond(send, 404, b'{"error": "unknown_session"}', 'application/json')
+        except streamingSession.StreamingSessionLimit as e:
+            # 스트리밍 세션 수 초과
+            await self._respond(send, 503, json.dumps({'error': str(e)}).encode('utf-8'),
+                                'application/json', [(b'retry-after', b'5')])
+        except streamingSession.StreamingAudioTooLong as e:
+            await self._respond(send, 413, json.dumps({'error': str(e)}).encode('utf-8'), 'application/json')
+        except streamingSession.StreamingUnavailable as e:
+            await self._respond(send, 501, json.dumps({'error': str(e)}).encode('utf-8'), 'application/json')
+
+    async def _score(self, scope, path, body, ticket, receive):
+        try:
+            if path == '/GetAccuracyFromRecordedAudio':
+                event = {'body': json.dumps(json.loads(body))}
+                return await self._runAdmitted(ticket, receive,
+                                               lambdaSpeechToScore.lambda_handler, event, [])
+
+            headers = {name.decode('latin-1').lower(): value.decode('latin-1')
+                       for name, value in scope['headers']}
+            query = _parse_query(scope)
+            real_text = unquote(headers.get('x-title', '')) or query.get('title', '')
+            language = headers.get('x-language') or query.get('language', 'ko')
+            content_type = headers.get('content-type', '').split(';')[0].strip()
+            suffix = AUDIO_SUFFIXES.get(content_type, '.ogg')
+            return await self._runAdmitted(ticket, receive, lambdaSpeechToScore.score_audio_bytes,
+                                           body, real_text, language, suffix)
+        except (AdmissionRejected, ClientDisconnected):
+            raise
+        except Exception as e:
+            print('오류: ', str(e))
+            return EMPTY_RESULT
+
+    async def _runAdmitted(self, ticket, receive, function, *args):
+        """
+        승인된 채점 작업을 채점 풀에서 실행합니다. 작업이 시작되기 전에 클라이언트 연결이
+        끊기면 작업을 취소해 CPU를 쓰지 않습니다.
+        """
+        task = asyncio.ensure_future(
+            self._run(self.scoring_executor, self.admission.call, ticket, function, *args))
+        disconnect = asyncio.ensure_future(_wait_for_disconnect(receive))
+        await asyncio.wait({task, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+        if task.done():
+            disconnect.cancel()
+            return task.result()
+
+        if ticket.cancel():
+            task.cancel()
+        else:
+            # 이미 실행 중인 작업은 멈출 수 없으므로 끝나도록 두고 결과는 버립니다
+            task.add_done_callback(lambda finished: finished.cancelled() or finished.exception())
+        raise ClientDisconnected()
+
+    async def _run(self, executor, function, *args):
+        """함수를 스레드 풀에서 실행하고, 종료 시 기다릴 수 있도록 처리 중 목록에 넣습니다."""
+        future = asyncio.get_running_loop().run_in_executor(executor, function, *args)
+        self._in_flight.add(future)
+        try:
+            return await future
+        finally:
+            self._in_flight.discard(future)
+
+    async def _readBody(self, receive) -> bytes:
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > MAX_BODY_BYTES:
+                raise RequestTooLarge()
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                break
+        return b''.join(chunks)
+
+    async def _sendFile(self, send, file_path):
+        file_path = os.path.realpath(file_path)
+        # 정적 폴더 밖의 파일은 제공하지 않습니다
+        if file_path != INDEX_PATH and not file_path.startswith(STATIC_FOLDER + os.sep):
+            await self._respond(send, 404, b'Not Found', 'text/plain')
+            return
+        try:
+            content = await self._run(self.light_executor, _read_file, file_path)
+        except OSError:
+            await self._respond(send, 404, b'Not Found', 'text/plain')
+            return
+        content_type = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type.endswith('javascript'):
+            content_type += '; charset=utf-8'
+        await self._respond(send, 200, content, content_type)
+
+    async def _respondResult(self, send, result):
+        # Flask와 같이 딕셔너리는 JSON으로, 문자열은 text/html로 응답합니다
+        if isinstance(result, dict):
+            await self._respond(send, 200, json.dumps(result).encode('utf-8'), 'application/json')
+        else:
+            await self._respond(send, 200, str(result).encode('utf-8'), 'text/html; charset=utf-8')
+
+    async def _respond(self, send, status, body, content_type=None, extra_headers=()):
+        headers = list(CORS_HEADERS)
+        headers.append((b'content-length', str(len(body)).encode('latin-1')))
+        if content_type is not None:
+            headers.append((b'content-type', content_type.encode('latin-1')))
+        headers.extend(extra_headers)
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+
+def _parse_query(scope) -> dict:
+    return {name: values[0] for name, values in
+            parse_qs(scope.get('query_string', b'').decode('utf-8')).items()}
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+def _read_file(file_path):
+    with open(file_path, 'rb') as file:
+        return file.read()
+
+
+app = ASGIApp()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='비동기(ASGI) 발음 트레이너 서버')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=3000)
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit('asgiApp.py를 실행하려면 uvicorn이 필요합니다: pip install uvicorn')
+    uvicorn.run(app, host=args.host, port=args.port, timeout_graceful_shutdown=DRAIN_TIMEOUT_S)
@@ -0,0 +1,210 @@
+"""
+ASR 마이크로 배치 스케줄러
+
+여러 요청이 동시에 녹음을 보내면 요청마다 model.transcribe를 따로 실행하는 대신,
+짧은 대기 창(batch_window_ms) 안에 도착한 요청을 최대 max_batch_size개까지 모아
+FasterWhisperASRModel.transcribeBatch(BatchedInferencePipeline) 한 번으로 전사하고
+결과를 각 요청에 돌려줍니다.
+
+ASRScheduler는 IASRModel을 구현하므로 PronunciationTrainer의 ASR 모델 자리에 그대로
+넣을 수 있습니다. 요청마다 마감 시간(deadline)을 지정할 수 있으며, 마감이 지날 때까지 배치에
+들어가지 못한 요청은 전사하지 않고 ASRDeadlineExceeded로 실패시킵니다. 이미 전사 중인 요청은
+결과를 버리지 않도록 끝까지 기다리고 늦은 완료(late_completions)로 집계합니다.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+import ModelInterfaces as mi
+
+
+class ASRDeadlineExceeded(TimeoutError):
+    """요청이 마감 시간 안에 전사되지 못했습니다."""
+
+
+class _ASRRequest:
+    __slots__ = ('audio', 'deadline', 'enqueued_at', 'future')
+
+    def __init__(self, audio, deadline: float) -> None:
+        self.audio = audio
+        self.deadline = deadline
+        self.enqueued_at = time.monotonic()
+        self.future = Future()
+
+
+class ASRScheduler(mi.IASRModel):
+
+    def __init__(self, asr_model: mi.IASRModel, max_batch_size: int = 8,
+                 batch_window_ms: float = 20, default_deadline_s: float = None) -> None:
+        """
+        Args:
+            asr_model: 전사에 사용할 모델 (transcribeBatch가 없으면 요청을 차례대로 전사)
+            max_batch_size: 한 배치의 최대 요청 수
+            batch_window_ms: 첫 요청이 도착한 뒤 다른 요청을 기다리는 시간
+            default_deadline_s: 요청을 넣은 뒤 결과를 기다리는 기본 최대 시간 (None이면 무제한)
+        """
+        self.asr_model = asr_model
+        self.max_batch_size = max(int(max_batch_size), 1)
+        self.batch_window = batch_window_ms / 1000
+        self.default_deadline_s = default_deadline_s
+
+        self._queue = queue.Queue()
+        self._metrics_lock = threading.Lock()
+        self._batch_size_counts = {}
+        self._requests = 0
+        self._expired = 0
+        self._late_completions = 0
+        self._failed = 0
+        self._queue_wait_total = 0.
+        self._queue_wait_max = 0.
+        self._inference_total = 0.
+
+        self._transcript = ""
+        self._word_locations = []
+
+        self._worker = threading.Thread(target=self._run, name='asr-scheduler', daemon=True)
+        self._worker.start()
+
+    def submit(self, audio, deadline_s: float = None) -> Future:
+        """
+        전사 요청을 대기열에 넣고 결과(ASRResult)를 받을 Future를 반환합니다.
+
+        Args:
+            audio: 16 kHz 오디오 (np.ndarray 또는 torch.Tensor)
+            deadline_s: 지금부터의 마감 시간 (None이면 default_deadline_s)
+        """
+        if deadline_s is None:
+            deadline_s = self.default_deadline_s
+        deadline = time.monotonic() + deadline_s if deadline_s is not None else None
+        request = _ASRRequest(audio, deadline)
+        self._queue.put(request)
+        return request.future
+
+    def transcribeAudio(self, audio, deadline_s: float = None) -> mi.ASRResult:
+        """
+        요청을 넣고 배치 전사 결과를 기다립니다 (여러 스레드에서 동시에 호출 가능).
+        마감까지 배치에 들어가지 못하면 ASRDeadlineExceeded를 올리고, 이미 전사 중이면 결과를 기다립니다.
+        """
+        if deadline_s is None:
+            deadline_s = self.default_deadline_s
+        future = self.submit(audio, deadline_s)
+        try:
+            return future.result(timeout=deadline_s)
+        except ASRDeadlineExceeded:
+            # 작업 스레드가 이미 마감 초과로 처리한 요청 (TimeoutError의 하위 클래스이므로 먼저 잡습니다)
+            raise
+        except FutureTimeoutError:
+            # 아직 배치에 들어가지 않았으면 취소해 전사하지 않도록 합니다
+            if future.cancel():
+                with self._metrics_lock:
+                    self._expired += 1
+                raise ASRDeadlineExceeded(f'ASR 요청이 {deadline_s}초 안에 처리되지 않았습니다')
+        # 이미 실행 중인 배치에 들어간 요청은 전사가 끝나므로 결과를 버리지 않고 기다립니다
+        result = future.result()
+        with self._metrics_lock:
+            self._late_completions += 1
+        return result
+
+    def processAudio(self, audio):
+        self._transcript, self._word_locations = self.transcribeAudio(audio)
+
+    def getTranscript(self) -> str:
+        return self._transcript
+
+    def getWordLocations(self) -> list:
+        return self._word_locations
+
+    def close(self) -> None:
+        """대기 중인 요청을 처리한 뒤 작업 스레드를 멈춥니다."""
+        self._queue.put(None)
+        self._worker.join()
+
+    def getMetrics(self) -> dict:
+        """배치 크기 분포와 대기열 대기 시간 등 스케줄러 지표를 반환합니다."""
+        with self._metrics_lock:
+            batches = sum(self._batch_size_counts.values())
+            batched_requests = sum(size * count for size, count in self._batch_size_counts.items())
+            return {
+                "requests": self._requests,
+                "batches": batches,
+                "expired": self._expired,
+                "late_completions": self._late_completions,
+                "failed": self._failed,
+                "queue_depth": self._queue.qsize(),
+                "mean_batch_size": batched_requests / batches if batches else 0.0,
+                "batch_size_counts": dict(sorted(self._batch_size_counts.items())),
+                "mean_queue_wait_ms": self._queue_wait_total / batched_requests * 1000 if batched_requests else 0.0,
+                "max_queue_wait_ms": self._queue_wait_max * 1000,
+                "mean_batch_inference_ms": self._inference_total / batches * 1000 if batches else 0.0
+            }
+
+    def _run(self) -> None:
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+            batch = [request]
+            closing = False
+
+            # 첫 요청이 도착한 뒤 대기 창 동안 배치를 채웁니다
+            window_end = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch_size:
+                remaining = window_end - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is None:
+                    closing = True
+                    break
+                batch.append(request)
+
+            self._runBatch(batch)
+            if closing:
+                return
+
+    def _runBatch(self, batch: list) -> None:
+        now = time.monotonic()
+        runnable = []
+        for request in batch:
+            with self._metrics_lock:
+                self._requests += 1
+            if request.deadline is not None and now > request.deadline:
+                # 마감이 지난 요청은 전사하지 않습니다
+                if request.future.set_running_or_notify_cancel():
+                    with self._metrics_lock:
+                        self._expired += 1
+                    request.future.set_exception(ASRDeadlineExceeded('ASR 요청 마감 시간이 지났습니다'))
+                continue
+            if request.future.set_running_or_notify_cancel():
+                runnable.append(request)
+        if not runnable:
+            return
+
+        start = time.monotonic()
+        try:
+            if hasattr(self.asr_model, 'transcribeBatch'):
+                results = self.asr_model.transcribeBatch([request.audio for request in runnable])
+            else:
+                results = [self.asr_model.transcribeAudio(request.audio) for request in runnable]
+        except Exception as error:
+            with self._metrics_lock:
+                self._failed += len(runnable)
+            for request in runnable:
+                request.future.set_exception(error)
+            return
+        inference_time = time.monotonic() - start
+
+        with self._metrics_lock:
+            size = len(runnable)
+            self._batch_size_counts[size] = self._batch_size_counts.get(size, 0) + 1
+            self._inference_total += inference_time
+            for request in runnable:
+                wait = start - request.enqueued_at
+                self._queue_wait_total += wait
+                self._queue_wait_max = max(self._queue_wait_max, wait)
+
+        for request, result in zip(runnable, results):
+            request.future.set_result(result)
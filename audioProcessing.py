@@ -0,0 +1,624 @@
+"""
+녹음 오디오 디코딩과 리샘플링
+
+요청 바이트(BytesIO)를 soundfile(libsndfile)로 바로 디코딩해 미리 할당한 float32 버퍼
+하나에 채웁니다. WAV, FLAC, OGG(Vorbis/Opus), MP3 등 libsndfile이 지원하는 형식은
+디스크를 거치지 않습니다. libsndfile이 읽지 못하는 코덱(예: 브라우저의 WebM/Opus)만
+임시 파일에 써서 audioread(ffmpeg/GStreamer 등)로 디코딩합니다.
+
+리샘플링은 torchaudio Resample의 기본 설정(sinc_interp_hann, lowpass_filter_width=6,
+rolloff=0.99)과 같은 다상(polyphase) 필터를 NumPy로 적용합니다. 필터는 실제 입력
+샘플링 레이트별로 캐시되며, 16 kHz 입력은 그대로 통과합니다.
+
+브라우저 녹음은 말하기 전후로 1~2초의 무음이 흔하므로, find_speech_bounds로 프레임 에너지가
+잡음 바닥보다 충분히 큰 첫/마지막 구간을 찾아 ASR 앞에서 잘라낼 수 있습니다.
+
+요청 하나의 오디오는 디코딩 버퍼(또는 리샘플링 출력) 하나로 끝까지 처리됩니다. torch 텐서는
+torch.from_numpy로 같은 메모리를 공유하고, 정규화는 이 버퍼를 제자리에서 바꿉니다. 노이즈 감소는
+ASR 모델이 별도 버퍼에 적용하므로, 운율 특징은 배포 방식과 관계없이 게이트 전 오디오로 계산됩니다.
+PeakMemoryTracker로 요청별 최대 할당량을 확인할 수 있습니다.
+"""
+import io
+import math
+import os
+import tempfile
+import time
+import tracemalloc
+import audioread
+import numpy as np
+from functools import lru_cache
+
+try:
+    import soundfile
+except (ImportError, OSError):
+    # soundfile 또는 libsndfile이 없으면 항상 audioread 경로를 사용합니다
+    soundfile = None
+
+try:
+    import config
+    _cfg = config.get_config()
+except ImportError:
+    _cfg = {}
+
+
+# ASR 모델이 기대하는 샘플링 레이트
+TARGET_SAMPLING_RATE = 16000
+# 한 번에 필터를 적용할 출력 블록 수 (임시 메모리 상한)
+RESAMPLE_BLOCK_SIZE = 8192
+# load_audio_resampled가 한 번에 디코딩할 입력 프레임 수
+DECODE_BLOCK_FRAMES = 65536
+
+
+def load_audio_bytes(file_bytes: bytes, suffix: str = ".ogg", dtype=np.float32):
+    """
+    인코딩된 오디오 바이트를 디코딩합니다.
+
+    Args:
+        file_bytes: 업로드된 오디오 파일의 바이트
+        suffix: audioread 대체 경로에서 사용할 임시 파일 확장자
+        dtype: 출력 샘플 형식
+
+    Returns:
+        (신호, 샘플링 레이트). 신호는 audioread_load와 같이 모노이면 (샘플 수,),
+        다채널이면 (채널 수, 샘플 수) 형태입니다.
+    """
+    if soundfile is not None:
+        try:
+            return soundfile_load(file_bytes, dtype=dtype)
+        except (RuntimeError, TypeError):
+            # libsndfile이 지원하지 않는 컨테이너/코덱
+            pass
+
+    return _audioread_bytes_load(file_bytes, suffix, dtype)
+
+
+def _audioread_bytes_load(file_bytes: bytes, suffix: str, dtype):
+    tmp = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+    tmp_name = tmp.name
+    try:
+        tmp.write(file_bytes)
+        tmp.close()
+        return audioread_load(tmp_name, dtype=dtype)
+    finally:
+        os.remove(tmp_name)
+
+
+def load_audio_resampled(file_bytes: bytes, suffix: str = ".ogg",
+                         new_freq: int = TARGET_SAMPLING_RATE) -> np.ndarray:
+    """
+    인코딩된 오디오 바이트를 new_freq 모노 float32 신호로 디코딩합니다.
+
+    libsndfile이 읽을 수 있는 형식은 DECODE_BLOCK_FRAMES 단위로 읽어 StreamingResampler에
+    넣으므로, 원래 샘플링 레이트의 전체 신호를 만들지 않고 출력 버퍼 하나만 할당합니다.
+    결과는 load_audio_bytes 뒤에 resample_audio를 적용한 것과 (float32 반올림 오차 안에서) 같습니다.
+
+    Args:
+        file_bytes: 업로드된 오디오 파일의 바이트
+        suffix: audioread 대체 경로에서 사용할 임시 파일 확장자
+        new_freq: 출력 샘플링 레이트
+
+    Returns:
+        (출력 샘플 수,) 형태의 float32 신호
+    """
+    if soundfile is not None:
+        try:
+            with soundfile.SoundFile(io.BytesIO(file_bytes)) as sound_file:
+                return _read_resampled(sound_file, new_freq)
+        except (RuntimeError, TypeError):
+            # libsndfile이 지원하지 않는 컨테이너/코덱
+            pass
+
+    signal, sr_native = _audioread_bytes_load(file_bytes, suffix, np.float32)
+    return resample_audio(signal, sr_native, new_freq)
+
+
+def _read_resampled(sound_file, new_freq: int) -> np.ndarray:
+    orig_freq, n_channels = sound_file.samplerate, sound_file.channels
+    frames = max(sound_file.frames, 0)
+    if orig_freq == new_freq and n_channels == 1:
+        return sound_file.read(out=np.empty((frames, 1), dtype=np.float32)).reshape(-1)
+
+    resampler = StreamingResampler(orig_freq, new_freq)
+    output = np.empty(math.ceil(new_freq * frames / orig_freq), dtype=np.float32)
+    position = 0
+    block = np.empty((DECODE_BLOCK_FRAMES, n_channels), dtype=np.float32)
+    while True:
+        chunk = sound_file.read(out=block)
+        if len(chunk) == 0:
+            break
+        resampled = resampler.process(chunk[:, 0] if n_channels == 1 else chunk.T)
+        output, position = _append_samples(output, position, resampled)
+    output, position = _append_samples(output, position, resampler.flush())
+    return output[:position]
+
+
+def _append_samples(output: np.ndarray, position: int, samples: np.ndarray) -> tuple:
+    # 헤더의 프레임 수가 실제보다 작은 파일을 위해 필요할 때만 버퍼를 늘립니다
+    if position + len(samples) > len(output):
+        grown = np.empty(max(2 * len(output), position + len(samples)), dtype=np.float32)
+        grown[:position] = output[:position]
+        output = grown
+    output[position:position + len(samples)] = samples
+    return output, position + len(samples)
+
+
+def soundfile_load(file_bytes: bytes, dtype=np.float32):
+    """soundfile로 메모리의 오디오 바이트를 미리 할당한 버퍼 하나에 디코딩합니다."""
+    with soundfile.SoundFile(io.BytesIO(file_bytes)) as sound_file:
+        sr_native = sound_file.samplerate
+        n_channels = sound_file.channels
+        y = np.empty((max(sound_file.frames, 0), n_channels), dtype=dtype)
+        y = sound_file.read(out=y)
+
+    if n_channels > 1:
+        return y.T, sr_native
+    return y.reshape(-1), sr_native
+
+
+def audioread_load(path, offset=0.0, duration=None, dtype=np.float32):
+    """audioread를 사용하여 오디오 버퍼를 로드합니다.
+
+    디코딩된 정수 블록을 하나의 바이트 버퍼에 이어 붙인 뒤 한 번에 부동 소수점으로 변환합니다.
+    """
+
+    buffer = bytearray()
+    with audioread.audio_open(path) as input_file:
+        sr_native = input_file.samplerate
+        n_channels = input_file.channels
+
+        # 16비트 샘플 단위의 시작/끝 위치
+        s_start = int(np.round(sr_native * offset)) * n_channels
+
+        if duration is None:
+            s_end = np.inf
+        else:
+            s_end = s_start + \
+                (int(np.round(sr_native * duration)) * n_channels)
+
+        n = 0
+
+        for frame in input_file:
+            n_prev = n
+            n = n + len(frame) // 2
+
+            if n < s_start:
+                # 오프셋이 현재 프레임 이후에 있음
+                # 계속 읽기
+                continue
+
+            if s_end < n_prev:
+                # 끝을 벗어났습니다. 읽기 중지
+                break
+
+            frame = memoryview(frame)
+            if s_end < n:
+                # 끝이 이 프레임에 있습니다. 자르기
+                frame = frame[: (s_end - n_prev) * 2]
+
+            if n_prev <= s_start <= n:
+                # 시작이 이 프레임에 있습니다
+                frame = frame[(s_start - n_prev) * 2:]
+
+            # 현재 프레임을 추가
+            buffer += frame
+
+    y = buf_to_float(buffer, dtype=dtype)
+    if n_channels > 1:
+        y = y.reshape((-1, n_channels)).T
+
+    return y, sr_native
+
+# Librosa에서 가져옴
+
+
+def buf_to_float(x, n_bytes=2, dtype=np.float32):
+    """정수 버퍼를 부동 소수점 값으로 변환합니다.
+    이것은 주로 정수 값 wav 데이터를 numpy 배열로 로드할 때 유용합니다.
+
+    Parameters
+    ----------
+    x : np.ndarray [dtype=int]
+        정수 값 데이터 버퍼
+
+    n_bytes : int [1, 2, 4]
+        ``x``의 샘플당 바이트 수
+
+    dtype : numeric type
+        대상 출력 유형 (기본값: 32비트 부동 소수점)
+
+    Returns
+    -------
+    x_float : np.ndarray [dtype=float]
+        부동 소수점으로 캐스팅된 입력 데이터 버퍼
+    """
+
+    # 데이터의 스케일을 반전
+    scale = 1.0 / float(1 << ((8 * n_bytes) - 1))
+
+    # 형식 문자열 구성
+    fmt = "<i{:d}".format(n_bytes)
+
+    # 데이터 버퍼를 재조정하고 형식화
+    y = np.frombuffer(x, fmt).astype(dtype)
+    y *= scale
+    return y
+
+
+def resample_audio(signal: np.ndarray, orig_freq: int,
+                   new_freq: int = TARGET_SAMPLING_RATE) -> np.ndarray:
+    """
+    오디오를 new_freq로 리샘플링하고 다채널 입력은 모노로 합칩니다.
+
+    Args:
+        signal: (샘플 수,) 또는 (채널 수, 샘플 수) 형태의 신호 (audioread_load 출력 형식)
+        orig_freq: 입력 샘플링 레이트
+        new_freq: 출력 샘플링 레이트
+
+    Returns:
+        (출력 샘플 수,) 형태의 float32 신호. 샘플링 레이트가 같으면 복사하지 않습니다.
+    """
+    signal = np.asarray(signal, dtype=np.float32)
+    if signal.ndim > 1:
+        # 리샘플링은 선형이므로 채널 평균을 먼저 구해 한 번만 필터링합니다
+        signal = signal.mean(axis=0, dtype=np.float32)
+
+    orig_freq, new_freq = int(orig_freq), int(new_freq)
+    if orig_freq == new_freq or len(signal) == 0:
+        return signal
+
+    gcd = math.gcd(orig_freq, new_freq)
+    orig_step, new_step = orig_freq // gcd, new_freq // gcd
+    kernel, width = _sinc_resample_kernel(orig_step, new_step)
+
+    # torchaudio와 같은 패딩: 앞에 width개, 뒤에 width + orig_step개의 0을 붙인 신호에서
+    # 출력 블록 k는 [k*orig_step, k*orig_step + 커널 길이) 구간을 사용합니다
+    length = len(signal)
+    number_of_windows = (length + 2 * width + orig_step - kernel.shape[0]) // orig_step + 1
+    resampled = _apply_resample_kernel(signal, kernel, orig_step, width, number_of_windows)
+
+    target_length = math.ceil(new_step * length / orig_step)
+    return resampled[:target_length]
+
+
+def _apply_resample_kernel(signal: np.ndarray, kernel: np.ndarray, orig_step: int,
+                           front_padding: int = 0, number_of_windows: int = None) -> np.ndarray:
+    """
+    signal 앞에 front_padding개의 0이 있고 뒤로는 0이 이어진다고 보고, orig_step 간격으로
+    커널 길이의 창을 잘라 다상 필터를 적용합니다.
+
+    패딩한 신호 전체를 만들지 않고, 경계에 걸친 블록만 블록 크기의 임시 버퍼에 채웁니다.
+    """
+    kernel_length = kernel.shape[0]
+    if number_of_windows is None:
+        number_of_windows = (front_padding + len(signal) - kernel_length) // orig_step + 1
+    number_of_windows = max(number_of_windows, 0)
+
+    # 겹치는 창을 블록 단위로 연속 버퍼에 모아 행렬 곱 한 번으로 필터링합니다
+    resampled = np.empty((number_of_windows, kernel.shape[1]), dtype=np.float32)
+    block_buffer = np.empty((min(number_of_windows, RESAMPLE_BLOCK_SIZE), kernel_length), dtype=np.float32)
+    for block_start in range(0, number_of_windows, RESAMPLE_BLOCK_SIZE):
+        count = min(RESAMPLE_BLOCK_SIZE, number_of_windows - block_start)
+        start = block_start * orig_step - front_padding
+        end = start + (count - 1) * orig_step + kernel_length
+        if start >= 0 and end <= len(signal):
+            segment = signal[start:end]
+        else:
+            segment = np.zeros(end - start, dtype=np.float32)
+            overlap_start, overlap_end = max(start, 0), min(end, len(signal))
+            if overlap_end > overlap_start:
+                segment[overlap_start - start:overlap_end - start] = signal[overlap_start:overlap_end]
+        block_buffer[:count] = np.lib.stride_tricks.sliding_window_view(segment, kernel_length)[::orig_step]
+        np.matmul(block_buffer[:count], kernel, out=resampled[block_start:block_start + count])
+    return resampled.reshape(-1)
+
+
+class StreamingResampler:
+    """
+    녹음 중 도착하는 조각(chunk)을 차례로 리샘플링합니다.
+
+    resample_audio와 같은 필터와 패딩을 사용하므로, 모든 조각을 process에 넣고 flush한
+    결과를 이어 붙이면 전체 신호를 resample_audio로 변환한 결과와 같습니다.
+    """
+
+    def __init__(self, orig_freq: int, new_freq: int = TARGET_SAMPLING_RATE) -> None:
+        self.orig_freq, self.new_freq = int(orig_freq), int(new_freq)
+        gcd = math.gcd(self.orig_freq, self.new_freq)
+        self.orig_step, self.new_step = self.orig_freq // gcd, self.new_freq // gcd
+        self.kernel, self.width = _sinc_resample_kernel(self.orig_step, self.new_step)
+        # 아직 필터링하지 않은 입력 (앞쪽 패딩 포함)
+        self._pending = np.zeros(self.width, dtype=np.float32)
+        self._input_length = 0
+        self._output_length = 0
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        """조각을 추가하고 지금 계산할 수 있는 출력 샘플을 반환합니다."""
+        chunk = np.asarray(chunk, dtype=np.float32)
+        if chunk.ndim > 1:
+            chunk = chunk.mean(axis=0, dtype=np.float32)
+        self._input_length += len(chunk)
+        if self.orig_freq == self.new_freq:
+            self._output_length += len(chunk)
+            return chunk
+
+        self._pending = np.concatenate((self._pending, chunk))
+        number_of_blocks = (len(self._pending) - self.kernel.shape[0]) // self.orig_step + 1
+        return self._emit(max(number_of_blocks, 0))
+
+    def flush(self) -> np.ndarray:
+        """입력이 끝났을 때 남은 출력 샘플을 반환합니다."""
+        if self.orig_freq == self.new_freq:
+            return np.zeros(0, dtype=np.float32)
+        self._pending = np.concatenate(
+            (self._pending, np.zeros(self.width + self.orig_step, dtype=np.float32)))
+        number_of_blocks = (len(self._pending) - self.kernel.shape[0]) // self.orig_step + 1
+        output = self._emit(number_of_blocks)
+        target_length = math.ceil(self.new_step * self._input_length / self.orig_step)
+        return output[:max(target_length - (self._output_length - len(output)), 0)]
+
+    def _emit(self, number_of_blocks: int) -> np.ndarray:
+        if number_of_blocks == 0:
+            return np.zeros(0, dtype=np.float32)
+        used = (number_of_blocks - 1) * self.orig_step + self.kernel.shape[0]
+        output = _apply_resample_kernel(self._pending[:used], self.kernel, self.orig_step)
+        self._pending = self._pending[number_of_blocks * self.orig_step:]
+        self._output_length += len(output)
+        return output
+
+
+@lru_cache(maxsize=16)
+def _sinc_resample_kernel(orig_step: int, new_step: int, lowpass_filter_width: int = 6,
+                          rolloff: float = 0.99):
+    """
+    torchaudio의 sinc_interp_hann 다상 필터를 만듭니다 (gcd로 약분된 비율 기준).
+
+    Returns:
+        ((커널 길이, new_step) float32 필터 행렬, 패딩 폭)
+    """
+    base_freq = min(orig_step, new_step) * rolloff
+    width = math.ceil(lowpass_filter_width * orig_step / base_freq)
+    idx = np.arange(-width, width + orig_step, dtype=np.float64) / orig_step
+    t = np.arange(0, -new_step, -1, dtype=np.float64)[:, None] / new_step + idx[None, :]
+    t *= base_freq
+    np.clip(t, -lowpass_filter_width, lowpass_filter_width, out=t)
+
+    window = np.cos(t * math.pi / lowpass_filter_width / 2) ** 2
+    t *= math.pi
+    with np.errstate(divide='ignore', invalid='ignore'):
+        kernels = np.where(t == 0, 1.0, np.sin(t) / t)
+    kernels *= window * (base_freq / orig_step)
+    return np.ascontiguousarray(kernels.T, dtype=np.float32), width
+
+
+# 앞뒤 무음 제거 (ASR 전에 적용)
+ENABLE_SILENCE_TRIMMING = _cfg.get('enable_silence_trimming', True)
+# 잘라낸 음성 앞뒤에 남겨 둘 여유 (단어 시작/끝의 약한 자음과 Whisper 문맥용)
+TRIM_PADDING_MS = _cfg.get('trim_padding_ms', 250)
+# 에너지를 계산할 프레임 길이
+TRIM_FRAME_MS = 20
+# 잡음 바닥(하위 10% 프레임 RMS)보다 이만큼(dB) 크면 음성으로 봅니다
+TRIM_THRESHOLD_DB = 12.0
+# 잡음이 거의 없는 녹음에서는 가장 큰 프레임보다 이만큼(dB) 작은 프레임까지 음성으로 봅니다
+TRIM_PEAK_RANGE_DB = 40.0
+# 이보다 짧게 튀는 에너지(클릭, 마우스 소리)는 음성으로 보지 않습니다
+TRIM_MIN_SPEECH_MS = 60
+
+
+def find_speech_bounds(signal: np.ndarray, sampling_rate: int = TARGET_SAMPLING_RATE,
+                       padding_ms: int = TRIM_PADDING_MS) -> tuple:
+    """
+    앞뒤 무음을 뺀 음성 구간을 찾습니다.
+
+    Args:
+        signal: (samples,) 모노 오디오
+        sampling_rate: 샘플링 레이트
+        padding_ms: 음성 구간 앞뒤에 남길 여유 (밀리초)
+
+    Returns:
+        (시작 샘플, 끝 샘플). 음성을 찾지 못하면 (0, len(signal))로 자르지 않습니다.
+    """
+    frame_length = sampling_rate * TRIM_FRAME_MS // 1000
+    min_speech_frames = max(TRIM_MIN_SPEECH_MS // TRIM_FRAME_MS, 1)
+    number_of_frames = len(signal) // frame_length
+    if number_of_frames <= min_speech_frames:
+        return 0, len(signal)
+
+    frames = signal[:number_of_frames * frame_length].reshape(number_of_frames, frame_length)
+    rms = np.sqrt(np.einsum('ij,ij->i', frames, frames) / frame_length)
+    threshold = max(np.percentile(rms, 10) * 10 ** (TRIM_THRESHOLD_DB / 20),
+                    rms.max() * 10 ** (-TRIM_PEAK_RANGE_DB / 20))
+
+    # min_speech_frames개 이상 이어진 음성 프레임의 시작 위치
+    is_speech = (rms > threshold).astype(np.int32)
+    runs = np.flatnonzero(np.convolve(is_speech, np.ones(min_speech_frames, dtype=np.int32),
+                                      mode='valid') == min_speech_frames)
+    if len(runs) == 0:
+        return 0, len(signal)
+
+    padding = sampling_rate * padding_ms // 1000
+    start = max(int(runs[0]) * frame_length - padding, 0)
+    end = min((int(runs[-1]) + min_speech_frames) * frame_length + padding, len(signal))
+    return start, end
+
+
+# 업로드 채점 요청마다 최대 메모리 할당량을 측정할지 여부
+TRACE_AUDIO_MEMORY = _cfg.get('trace_audio_memory', False)
+
+
+class PeakMemoryTracker:
+    """
+    with 블록 안에서 새로 할당된 최대 바이트를 tracemalloc으로 측정합니다.
+
+    NumPy 배열은 tracemalloc에 할당을 보고하므로 디코딩, 리샘플링, 노이즈 감소 버퍼가 모두
+    집계됩니다. torch가 직접 할당한 메모리는 집계되지 않습니다 (from_numpy로 공유한 버퍼는 NumPy
+    쪽에서 집계됨). 처음 사용할 때 추적을 시작해 계속 켜 두며, 여러 요청이 동시에 측정하면 최대값이
+    합쳐지므로 정확한 값은 요청을 하나씩 처리할 때 얻을 수 있습니다.
+    """
+
+    def __init__(self) -> None:
+        self.peak_bytes = 0
+        self._baseline = 0
+
+    def __enter__(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self._baseline = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        self.peak_bytes = max(tracemalloc.get_traced_memory()[1] - self._baseline, 0)
+        return False
+
+
+def _benchmark(duration_in_seconds: float = 5.0, number_of_runs: int = 20):
+    """WAV/FLAC/OGG 업로드를 메모리 경로와 임시 파일 경로로 디코딩해 비교합니다."""
+    sampling_rate = 48000
+    t = np.arange(int(duration_in_seconds * sampling_rate)) / sampling_rate
+    signal = (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+    for format_name, subtype in (('WAV', 'PCM_16'), ('FLAC', 'PCM_16'), ('OGG', 'VORBIS')):
+        encoded = io.BytesIO()
+        soundfile.write(encoded, signal, sampling_rate, format=format_name, subtype=subtype)
+        file_bytes = encoded.getvalue()
+
+        start = time.perf_counter()
+        for _ in range(number_of_runs):
+            y, fs = load_audio_bytes(file_bytes)
+        memory_time = (time.perf_counter() - start) / number_of_runs
+        message = f'{format_name:5s} 메모리 디코딩 {memory_time * 1e3:7.2f} ms'
+
+        if format_name == 'WAV':
+            # audioread 기본 백엔드(raw)는 WAV만 읽을 수 있습니다
+            start = time.perf_counter()
+            for _ in range(number_of_runs):
+                with tempfile.NamedTemporaryFile(suffix='.wav') as tmp:
+                    tmp.write(file_bytes)
+                    tmp.flush()
+                    y_reference, _ = audioread_load(tmp.name)
+            file_time = (time.perf_counter() - start) / number_of_runs
+            message += (f', 임시 파일 + audioread {file_time * 1e3:7.2f} ms, '
+                        f'최대 차이 {np.max(np.abs(y - y_reference)):.2e}')
+        print(message + f' ({len(y) / fs:.1f}초, {fs} Hz)')
+
+
+def _resample_benchmark(duration_in_seconds: float = 5.0, number_of_runs: int = 20):
+    """torchaudio Resample과 결과 및 속도를 비교합니다."""
+    import torch
+    from torchaudio.transforms import Resample
+
+    random_state = np.random.RandomState(0)
+    for orig_freq in (48000, 44100, 22050, 16000):
+        signal = random_state.uniform(-0.5, 0.5, int(duration_in_seconds * orig_freq)).astype(np.float32)
+        transform = Resample(orig_freq=orig_freq, new_freq=TARGET_SAMPLING_RATE)
+
+        start = time.perf_counter()
+        for _ in range(number_of_runs):
+            expected = transform(torch.Tensor(signal)).numpy()
+        torch_time = (time.perf_counter() - start) / number_of_runs
+
+        start = time.perf_counter()
+        for _ in range(number_of_runs):
+            resampled = resample_audio(signal, orig_freq)
+        numpy_time = (time.perf_counter() - start) / number_of_runs
+
+        print(f'{orig_freq:5d} Hz -> {TARGET_SAMPLING_RATE} Hz  torchaudio {torch_time * 1e3:7.2f} ms, '
+              f'resample_audio {numpy_time * 1e3:7.2f} ms, 길이 일치 {expected.shape == resampled.shape}, '
+              f'최대 차이 {np.max(np.abs(expected - resampled)):.2e}')
+
+
+def _trim_benchmark(number_of_runs: int = 20):
+    """
+    앞뒤 무음이 있는 브라우저 녹음 형태의 신호에서 무음 제거 비용과 줄어드는 길이를 측정합니다.
+    faster-whisper가 설치되어 있으면 전사 앞단(Silero VAD)의 처리 시간도 비교합니다.
+    """
+    try:
+        from faster_whisper.vad import VadOptions, get_speech_timestamps
+    except ImportError:
+        get_speech_timestamps = None
+
+    random_state = np.random.RandomState(0)
+    sampling_rate = TARGET_SAMPLING_RATE
+    for lead_in_seconds, speech_in_seconds, tail_in_seconds in ((1.0, 3.0, 1.0), (2.0, 3.0, 1.5), (1.5, 6.0, 2.0)):
+        # 배경 잡음 + 음절 단위로 진폭이 바뀌는 유성음
+        t = np.arange(int(speech_in_seconds * sampling_rate)) / sampling_rate
+        speech = sum(np.sin(2 * np.pi * 140 * harmonic * t) / harmonic for harmonic in range(1, 6))
+        speech *= 0.3 * np.maximum(np.sin(2 * np.pi * 4 * t), 0.1)
+        signal = np.concatenate([np.zeros(int(lead_in_seconds * sampling_rate)), speech,
+                                 np.zeros(int(tail_in_seconds * sampling_rate))])
+        signal = (signal + 0.003 * random_state.randn(len(signal))).astype(np.float32)
+
+        start_time = time.perf_counter()
+        for _ in range(number_of_runs):
+            start, end = find_speech_bounds(signal)
+        trim_time = (time.perf_counter() - start_time) / number_of_runs
+
+        message = (f'{len(signal) / sampling_rate:4.1f}초 -> {(end - start) / sampling_rate:4.1f}초 '
+                   f'(음성 {lead_in_seconds:.2f}~{lead_in_seconds + speech_in_seconds:.2f}초, '
+                   f'검출 {start / sampling_rate:.2f}~{end / sampling_rate:.2f}초), '
+                   f'무음 제거 {trim_time * 1e3:5.2f} ms')
+        if get_speech_timestamps is not None:
+            vad_times = []
+            for audio in (signal, signal[start:end]):
+                start_time = time.perf_counter()
+                for _ in range(number_of_runs // 4):
+                    get_speech_timestamps(audio, VadOptions())
+                vad_times.append((time.perf_counter() - start_time) / (number_of_runs // 4))
+            message += f', Silero VAD {vad_times[0] * 1e3:6.1f} -> {vad_times[1] * 1e3:6.1f} ms'
+        print(message)
+
+
+def _memory_benchmark(duration_in_seconds: float = 30.0):
+    """
+    30초 WAV 업로드를 디코딩 -> 리샘플링 -> 정규화 -> 노이즈 감소까지 처리하면서 단계마다
+    새 배열을 만드는 경우와 버퍼 하나를 제자리에서 바꾸는 경우의 최대 할당량을 비교합니다.
+    """
+    import spectralGate
+
+    def speech_mask(audio):
+        # 1초 음성, 1초 무음이 번갈아 나옵니다
+        mask = np.zeros(len(audio), dtype=bool)
+        for start in range(0, len(audio), 2 * TARGET_SAMPLING_RATE):
+            mask[start:start + TARGET_SAMPLING_RATE] = True
+        return mask
+
+    random_state = np.random.RandomState(0)
+    for sampling_rate in (16000, 48000):
+        t = np.arange(int(duration_in_seconds * sampling_rate)) / sampling_rate
+        signal = 0.3 * np.sin(2 * np.pi * 220 * t) * (np.sin(2 * np.pi * 0.5 * t) > 0)
+        signal = (signal + 0.01 * random_state.randn(len(signal))).astype(np.float32)
+        encoded = io.BytesIO()
+        soundfile.write(encoded, signal, sampling_rate, format='WAV', subtype='PCM_16')
+        file_bytes = encoded.getvalue()
+        del t, signal, encoded
+
+        def copying_pipeline():
+            audio, fs = load_audio_bytes(file_bytes)
+            audio = resample_audio(audio, fs)
+            audio = audio - np.mean(audio)
+            audio = audio / np.max(np.abs(audio))
+            audio = audio.astype(np.float32)
+            return spectralGate.reduce_noise(audio, speech_mask(audio))
+
+        def in_place_pipeline():
+            audio = load_audio_resampled(file_bytes)
+            audio -= np.mean(audio)
+            audio /= np.max(np.abs(audio))
+            audio = np.asarray(audio, dtype=np.float32)
+            # 노이즈 감소는 ASR 전용 버퍼에 씁니다 (정규화된 녹음은 운율 특징 계산에 그대로 사용)
+            return spectralGate.reduce_noise(audio, speech_mask(audio))
+
+        results = []
+        for name, pipeline in (('단계마다 복사', copying_pipeline), ('버퍼 하나', in_place_pipeline)):
+            with PeakMemoryTracker() as tracker:
+                results.append(pipeline())
+            print(f'{sampling_rate:5d} Hz {name:8s} 최대 할당 {tracker.peak_bytes / 2 ** 20:6.1f} MB '
+                  f'(최종 오디오 {results[-1].nbytes / 2 ** 20:.1f} MB)')
+        print(f'결과 최대 차이 {np.max(np.abs(results[0] - results[1])):.2e}')
+    tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    _benchmark()
+    _resample_benchmark()
+    _trim_benchmark()
+    _memory_benchmark()
@@ -18,6 +18,95 @@ WHISPER_MODEL_SIZE = "small"
 # FasterWhisper 사용 여부 (표준 Whisper보다 4-5배 빠름)
 USE_FASTER_WHISPER = True
 
+# 동시 전사 작업자 수 (CTranslate2 num_workers)
+# 하나의 모델을 여러 스레드(요청)가 공유할 때 동시에 전사할 수 있는 요청 수입니다.
+# 1이면 전사 호출은 차례대로 처리됩니다. 작업자마다 추론 버퍼를 따로 사용하므로
+# 늘리면 메모리 사용량도 늘어납니다 (CPU 코어 수 이하로 설정 권장)
+ASR_NUM_WORKERS = 1
+
+# ASR 마이크로 배치 (asrScheduler.py)
+# True이면 동시에 들어온 요청을 짧은 대기 창 동안 모아 BatchedInferencePipeline으로
+# 한 번에 전사합니다. 동시 요청이 많을 때 처리량이 늘지만, 요청마다 최대
+# ASR_BATCH_WINDOW_MS만큼 대기 시간이 더해집니다.
+ENABLE_ASR_BATCHING = False
+
+# 한 배치에 모을 최대 요청 수
+ASR_MAX_BATCH_SIZE = 8
+
+# 첫 요청이 도착한 뒤 다른 요청을 기다리는 시간 (밀리초)
+ASR_BATCH_WINDOW_MS = 20
+
+# 요청별 전사 마감 시간 (초). 이 시간 안에 배치에 들어가지 못한 요청은 전사하지 않고 실패합니다
+# (이미 전사 중인 요청은 끝까지 기다립니다). None이면 제한 없음
+ASR_REQUEST_DEADLINE_S = None
+
+# ============================================================================
+# 프리포크 서버 설정 (preforkServer.py)
+# ============================================================================
+
+# HTTP 워커 프로세스 수 (0이면 CPU 코어 수)
+# Whisper 모델은 ASR 프로세스 하나에만 불러오고, 문장 인덱스와 IPA 표는 워커들이 공유합니다
+PREFORK_WORKERS = 0
+
+# 워커가 이 시간(초) 동안 하트비트를 보내지 않으면 멈춘 것으로 보고 다시 시작합니다
+# ASR 프로세스는 전사 하나가 이 시간보다 오래 걸려도 다시 시작됩니다
+# 가장 긴 요청 처리 시간보다 길게 설정하세요
+WORKER_HEARTBEAT_TIMEOUT_S = 120
+
+# 워커가 ASR 프로세스의 전사 결과를 기다리는 최대 시간 (초)
+REMOTE_ASR_TIMEOUT_S = 120
+
+# ============================================================================
+# 비동기(ASGI) 서버 설정 (asgiApp.py)
+# ============================================================================
+
+# 채점(디코딩 + ASR + 평가)을 동시에 실행할 스레드 수
+ASGI_SCORING_WORKERS = 2
+
+# 샘플 문장과 정적 파일 요청을 처리할 스레드 수 (채점이 밀려도 이 요청들은 기다리지 않습니다)
+ASGI_LIGHT_WORKERS = 4
+
+# 종료 시 처리 중인 요청이 끝나기를 기다리는 최대 시간 (초)
+ASGI_DRAIN_TIMEOUT_S = 30
+
+# ============================================================================
+# 채점 요청 승인 제어 (admissionControl.py)
+# ============================================================================
+
+# 대기 + 처리 중인 채점 요청의 최대 수 (넘으면 503으로 거절)
+ADMISSION_MAX_QUEUE_DEPTH = 16
+
+# 채점 요청의 최대 예상 응답 시간 (초)
+# 최근 단계별 처리 시간으로 계산한 예상 대기 + 처리 시간이 이 값을 넘으면
+# 503 + Retry-After로 바로 거절하여, 클라이언트가 떠난 뒤에 처리되는 요청을 줄입니다
+SCORING_LATENCY_BUDGET_S = 30.0
+
+# ============================================================================
+# 채점 결과 캐시 (resultCache.py)
+# ============================================================================
+
+# 같은 녹음 + 같은 참조 문장의 재요청(네트워크 재시도 등)에 전사 없이 이전 결과를 돌려줍니다
+# 프로세스 메모리에 보관할 결과의 최대 바이트 (0이면 메모리 캐시 사용 안 함)
+RESULT_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+# 워커 프로세스들이 함께 쓰는 디스크 캐시 디렉터리 (None이면 사용 안 함)
+# 예: "./databases/result_cache"
+RESULT_CACHE_DIR = None
+
+# 디스크 캐시의 최대 바이트 (넘으면 오래된 결과부터 삭제)
+RESULT_CACHE_DISK_MAX_BYTES = 256 * 1024 * 1024
+
+# ============================================================================
+# 스트리밍 채점 설정 (streamingSession.py)
+# ============================================================================
+
+# 음성 뒤에 이 시간(밀리초) 이상 무음이 이어지면 구간을 닫고 미리 전사합니다
+# 짧게 하면 녹음 종료 후 남는 전사 시간이 줄지만, 단어 중간의 쉼에서 잘릴 수 있습니다
+STREAMING_MIN_SILENCE_MS = 600
+
+# 스트리밍 세션 하나가 받을 수 있는 최대 녹음 길이 (초). 넘는 조각은 413으로 거절합니다
+STREAMING_MAX_SECONDS = 120
+
 # ============================================================================
 # 노이즈 감지 및 필터링 설정
 # ============================================================================
@@ -27,6 +116,25 @@ USE_FASTER_WHISPER = True
 # False: 노이즈 감소 비활성화 (깨끗한 환경에서만)
 ENABLE_NOISE_REDUCTION = True
 
+# 앞뒤 무음 제거
+# True: 전사 전에 녹음 앞뒤의 무음을 잘라 Whisper 입력을 줄입니다 (단어 시간은 원래 녹음 기준)
+ENABLE_SILENCE_TRIMMING = True
+
+# 잘라낸 음성 앞뒤에 남겨 둘 여유 (밀리초)
+# 첫 단어나 마지막 단어가 잘린다면 늘리세요
+TRIM_PADDING_MS = 250
+
+# 요청별 최대 메모리 측정
+# True: 업로드 채점 요청마다 tracemalloc으로 NumPy 버퍼의 최대 할당량을 요청 추적에 남깁니다
+# (ENABLE_REQUEST_TRACES도 켜야 기록됩니다)
+# (측정 중에는 모든 할당이 느려지므로 메모리 여유를 확인할 때만 켜세요)
+TRACE_AUDIO_MEMORY = False
+
+# 요청별 단계 추적
+# True: 채점 요청마다 단계별 시작 위치와 처리 시간을 한 줄로 출력하고 /getRequestTraces에 최근 기록을 남깁니다
+# 단계별 히스토그램(/metrics)은 이 설정과 관계없이 항상 기록됩니다
+ENABLE_REQUEST_TRACES = False
+
 # VAD (Voice Activity Detection) 민감도
 # 노이즈가 많은 환경에서는 "high" 또는 "very_high" 사용
 # 깨끗한 환경에서는 "low" 또는 "moderate" 사용
@@ -76,6 +184,18 @@ MAX_SILENCE_RATIO = 0.8
 # }
 CUSTOM_VAD_PARAMETERS = None
 
+# ============================================================================
+# 음소 변환 캐시 설정
+# ============================================================================
+
+# 프로세스당 기억할 최대 변환 결과 수 (LRU 방식으로 오래된 항목부터 제거)
+# 0이면 캐시를 사용하지 않습니다
+PHONEM_CACHE_SIZE = 4096
+
+# 시작 시 미리 불러올 변환 결과 파일 (JSON: {"텍스트": "IPA", ...})
+# None이면 사용하지 않습니다. 예: "./databases/phonem_cache_ko.json"
+PHONEM_CACHE_WARM_FILE = None
+
 
 def get_config() -> dict:
     """
@@ -87,11 +207,35 @@ def get_config() -> dict:
     return {
         "model_size": WHISPER_MODEL_SIZE,
         "use_faster_whisper": USE_FASTER_WHISPER,
+        "asr_num_workers": ASR_NUM_WORKERS,
+        "enable_asr_batching": ENABLE_ASR_BATCHING,
+        "asr_max_batch_size": ASR_MAX_BATCH_SIZE,
+        "asr_batch_window_ms": ASR_BATCH_WINDOW_MS,
+        "asr_request_deadline_s": ASR_REQUEST_DEADLINE_S,
+        "prefork_workers": PREFORK_WORKERS,
+        "worker_heartbeat_timeout_s": WORKER_HEARTBEAT_TIMEOUT_S,
+        "remote_asr_timeout_s": REMOTE_ASR_TIMEOUT_S,
+        "asgi_scoring_workers": ASGI_SCORING_WORKERS,
+        "asgi_light_workers": ASGI_LIGHT_WORKERS,
+        "asgi_drain_timeout_s": ASGI_DRAIN_TIMEOUT_S,
+        "admission_max_queue_depth": ADMISSION_MAX_QUEUE_DEPTH,
+        "scoring_latency_budget_s": SCORING_LATENCY_BUDGET_S,
+        "streaming_min_silence_ms": STREAMING_MIN_SILENCE_MS,
+        "streaming_max_seconds": STREAMING_MAX_SECONDS,
+        "result_cache_max_bytes": RESULT_CACHE_MAX_BYTES,
+        "result_cache_dir": RESULT_CACHE_DIR,
+        "result_cache_disk_max_bytes": RESULT_CACHE_DISK_MAX_BYTES,
         "enable_noise_reduction": ENABLE_NOISE_REDUCTION,
+        "enable_silence_trimming": ENABLE_SILENCE_TRIMMING,
+        "trim_padding_ms": TRIM_PADDING_MS,
+        "trace_audio_memory": TRACE_AUDIO_MEMORY,
+        "enable_request_traces": ENABLE_REQUEST_TRACES,
         "vad_aggressiveness": VAD_AGGRESSIVENESS,
         "min_snr_threshold": MIN_SNR_THRESHOLD,
         "max_silence_ratio": MAX_SILENCE_RATIO,
-        "custom_vad_parameters": CUSTOM_VAD_PARAMETERS
+        "custom_vad_parameters": CUSTOM_VAD_PARAMETERS,
+        "phonem_cache_size": PHONEM_CACHE_SIZE,
+        "phonem_cache_warm_file": PHONEM_CACHE_WARM_FILE
     }
 
 
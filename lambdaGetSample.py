@@ -1,20 +1,22 @@
 
-import pandas as pd
 import json
 import RuleBasedModels
+import SentenceIndex
+import SentenceStore
 import epitran
 import random
 import pickle
 
 
 class TextDataset():
-    def __init__(self, table):
-        self.table_dataframe = table
-        self.number_of_samples = len(table)
+    def __init__(self, sentences):
+        # 메모리 매핑된 문장 저장소 (SentenceStore)
+        self.sentences = sentences
+        self.number_of_samples = len(sentences)
 
     def __getitem__(self, idx):
 
-        line = [self.table_dataframe['sentence'].iloc[idx]]
+        line = [self.sentences[idx]]
         return line
 
     def __len__(self):
@@ -24,12 +26,13 @@ class TextDataset():
 sample_folder = "./databases/"
 lambda_database = {}
 lambda_ipa_converter = {}
+lambda_sentence_index = {}
 available_languages = ['ko']
 
 for language in available_languages:
-    df = pd.read_csv(sample_folder+'data_'+language+'.csv',delimiter=';')
-    lambda_database[language] = TextDataset(df)
+    lambda_database[language] = TextDataset(SentenceStore.load_or_convert(language))
     lambda_ipa_converter[language] = RuleBasedModels.get_phonem_converter(language)
+    lambda_sentence_index[language] = SentenceIndex.get_sentence_index(language)
 
 lambda_translate_new_sample = False
 
@@ -51,8 +54,15 @@ def lambda_handler(event, context):
 
     translated_trascript = ""
 
-    current_ipa = lambda_ipa_converter[language].convertToPhonem(
-        current_transcript[0])
+    # 미리 계산된 인덱스에서 IPA를 찾고, 없으면 직접 변환합니다
+    reference = None
+    if lambda_sentence_index[language] is not None:
+        reference = lambda_sentence_index[language].lookup(current_transcript[0])
+    if reference is not None:
+        current_ipa = reference.ipa
+    else:
+        current_ipa = lambda_ipa_converter[language].convertToPhonem(
+            current_transcript[0])
 
     result = {'real_transcript': current_transcript,
               'ipa_transcript': current_ipa,
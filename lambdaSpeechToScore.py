@@ -1,25 +1,24 @@
 
 import torch
 import json
-import os
+import contextlib
 import WordMatching as wm
 import utilsFileIO
 import pronunciationTrainer
 import base64
 import time
-import audioread
+import audioProcessing
+import streamingSession
+import latencyMetrics
 import numpy as np
-from torchaudio.transforms import Resample
-import io
-import tempfile
+# 기존 코드 호환: 디코딩 함수는 audioProcessing으로 옮겨졌습니다
+from audioProcessing import audioread_load, buf_to_float
 
 trainer_SST_lambda = {}
 trainer_SST_lambda['ko'] = pronunciationTrainer.getTrainer("ko")
 
-transform = Resample(orig_freq=48000, new_freq=16000)
 
-
-def lambda_handler(event, context):
+def lambda_handler(event, context, stage_timings: dict = None):
 
     data = json.loads(event['body'])
 
@@ -28,6 +27,26 @@ def lambda_handler(event, context):
         data['base64Audio'][22:].encode('utf-8'))
     language = data['language']
 
+    return score_audio_bytes(file_bytes, real_text, language, stage_timings=stage_timings)
+
+
+def score_audio_bytes(file_bytes: bytes, real_text: str, language: str, suffix: str = ".ogg",
+                      stage_timings: dict = None):
+    """
+    업로드된 오디오 바이트로 발음을 평가합니다.
+
+    JSON(base64) 엔드포인트와 바이너리 업로드 엔드포인트가 함께 사용합니다.
+
+    Args:
+        file_bytes: 인코딩된 오디오 파일의 바이트
+        real_text: 참조 문장
+        language: 언어 코드
+        suffix: 임시 파일로 디코딩해야 할 때 사용할 확장자
+        stage_timings: 주어지면 단계별 처리 시간(초)을 기록합니다 (decode, recognition, postprocess)
+
+    Returns:
+        평가 결과 JSON 문자열 (참조 문장이 비어 있으면 빈 응답 딕셔너리)
+    """
     if len(real_text) == 0:
         return {
             'statusCode': 200,
@@ -40,27 +59,92 @@ def lambda_handler(event, context):
             'body': ''
         }
 
-    tmp = tempfile.NamedTemporaryFile(suffix=".ogg", delete=False)
-    tmp_name = tmp.name
+    if stage_timings is None:
+        stage_timings = {}
+    # 최대 메모리는 요청 추적에 기록되므로 추적이 켜져 있을 때만 측정합니다
+    trace_memory = audioProcessing.TRACE_AUDIO_MEMORY and latencyMetrics.ENABLE_REQUEST_TRACES
+    memory_tracker = audioProcessing.PeakMemoryTracker() if trace_memory else contextlib.nullcontext()
+    with latencyMetrics.request_trace('score_audio_bytes'), latencyMetrics.stage_timer('total'):
+        with memory_tracker:
+            stage_start = time.time()
+
+            # 요청 바이트에서 바로 디코딩하면서 16 kHz 모노로 변환합니다 (지원하지 않는 코덱만 임시 파일 사용).
+            # 텐서는 NumPy 버퍼를 공유하며, 이후 정규화는 이 버퍼를 제자리에서 바꿉니다
+            # (노이즈 감소는 ASR 모델이 별도 버퍼에 적용)
+            # (디코딩과 리샘플링은 블록 단위로 함께 진행되므로 한 단계로 잽니다)
+            with latencyMetrics.stage_timer('decode'):
+                signal = torch.from_numpy(
+                    audioProcessing.load_audio_resampled(file_bytes, suffix=suffix)).unsqueeze(0)
+            stage_timings['decode'] = time.time() - stage_start
+
+            stage_start = time.time()
+            result = trainer_SST_lambda[language].processAudioForGivenText(
+                signal, real_text)
+            stage_timings['recognition'] = time.time() - stage_start
+        if trace_memory:
+            latencyMetrics.annotate('peak_memory_mb', round(memory_tracker.peak_bytes / 2 ** 20, 1))
+
+        start = time.time()
+        with latencyMetrics.stage_timer('serialization'):
+            response = format_result(result)
+        stage_timings['postprocess'] = time.time() - start
+    return response
+
+
+def start_stream(real_text: str, language: str, sample_rate: int) -> dict:
+    """
+    녹음 중에 PCM 조각을 받아 미리 전사하는 스트리밍 세션을 시작합니다.
 
-    try:
-        tmp.write(file_bytes)
-        tmp.flush()
+    Args:
+        real_text: 참조 문장
+        language: 언어 코드
+        sample_rate: 보낼 PCM의 샘플링 레이트 (예: 브라우저 AudioContext.sampleRate)
 
-        tmp.close()
+    Returns:
+        {'session_id': 세션 ID}
+    """
+    session_id = streamingSession.start_session(
+        trainer_SST_lambda[language], real_text, int(sample_rate))
+    return {'session_id': session_id}
 
-        signal, fs = audioread_load(tmp_name)
 
-    finally:
+def add_stream_chunk(session_id: str, pcm_bytes: bytes, sample_format: str = 'f32') -> dict:
+    """
+    스트리밍 세션에 모노 PCM 조각을 추가합니다.
 
-        os.remove(tmp_name)
+    Args:
+        session_id: start_stream이 반환한 세션 ID
+        pcm_bytes: 리틀 엔디언 PCM 바이트
+        sample_format: 'f32'(float32) 또는 's16'(16비트 정수)
 
-    signal = transform(torch.Tensor(signal)).unsqueeze(0)
+    Returns:
+        받은 길이, 닫힌 구간 수, 지금까지의 부분 전사
+    """
+    if sample_format == 's16':
+        pcm = buf_to_float(pcm_bytes)
+    else:
+        pcm = np.frombuffer(pcm_bytes, dtype='<f4')
+    return streamingSession.get_session(session_id).addChunk(pcm)
 
-    result = trainer_SST_lambda[language].processAudioForGivenText(
-        signal, real_text)
 
-    start = time.time()
+def finish_stream(session_id: str, stage_timings: dict = None) -> str:
+    """스트리밍 세션을 끝내고 score_audio_bytes와 같은 형식의 결과를 반환합니다."""
+    if stage_timings is None:
+        stage_timings = {}
+    with latencyMetrics.request_trace('finish_stream'), latencyMetrics.stage_timer('total_stream'):
+        stage_start = time.time()
+        result = streamingSession.finish_session(session_id)
+        stage_timings['recognition'] = time.time() - stage_start
+
+        start = time.time()
+        with latencyMetrics.stage_timer('serialization'):
+            response = format_result(result)
+        stage_timings['postprocess'] = time.time() - start
+    return response
+
+
+def format_result(result: dict) -> str:
+    """processAudioForGivenText 결과를 응답 JSON 문자열로 만듭니다."""
     real_transcripts_ipa = ' '.join(
         [word[0] for word in result['real_and_transcribed_words_ipa']])
     matched_transcripts_ipa = ' '.join(
@@ -74,21 +158,11 @@ def lambda_handler(event, context):
     words_real = real_transcripts.lower().split()
     mapped_words = matched_transcripts.split()
 
-    is_letter_correct_all_words = ''
-    for idx, word_real in enumerate(words_real):
-
-        mapped_letters, mapped_letters_indices = wm.get_best_mapped_words(
-            mapped_words[idx], word_real)
-
-        is_letter_correct = wm.getWhichLettersWereTranscribedCorrectly(
-            word_real, mapped_letters)
-
-        is_letter_correct_all_words += ''.join([str(is_correct)
-                                                for is_correct in is_letter_correct]) + ' '
+    is_letter_correct_all_words = wm.get_letters_correctness_all_words(
+        mapped_words, words_real)
 
     pair_accuracy_category = ' '.join(
         [str(category) for category in result['pronunciation_categories']])
-    print('결과 후처리 시간: ', str(time.time()-start))
 
     res = {'real_transcript': result['recording_transcript'],
            'ipa_transcript': result['recording_ipa'],
@@ -100,95 +174,9 @@ def lambda_handler(event, context):
            'end_time': result['end_time'],
            'is_letter_correct_all_words': is_letter_correct_all_words}
 
-    return json.dumps(res)
-
-
-
-
-def audioread_load(path, offset=0.0, duration=None, dtype=np.float32):
-    """audioread를 사용하여 오디오 버퍼를 로드합니다.
-
-    한 번에 한 블록씩 로드한 다음 결과를 연결합니다.
-    """
-
-    y = []
-    with audioread.audio_open(path) as input_file:
-        sr_native = input_file.samplerate
-        n_channels = input_file.channels
-
-        s_start = int(np.round(sr_native * offset)) * n_channels
-
-        if duration is None:
-            s_end = np.inf
-        else:
-            s_end = s_start + \
-                (int(np.round(sr_native * duration)) * n_channels)
-
-        n = 0
-
-        for frame in input_file:
-            frame = buf_to_float(frame, dtype=dtype)
-            n_prev = n
-            n = n + len(frame)
-
-            if n < s_start:
-                # 오프셋이 현재 프레임 이후에 있음
-                # 계속 읽기
-                continue
-
-            if s_end < n_prev:
-                # 끝을 벗어났습니다. 읽기 중지
-                break
-
-            if s_end < n:
-                # 끝이 이 프레임에 있습니다. 자르기
-                frame = frame[: s_end - n_prev]
-
-            if n_prev <= s_start <= n:
-                # 시작이 이 프레임에 있습니다
-                frame = frame[(s_start - n_prev):]
-
-            # 현재 프레임을 추가
-            y.append(frame)
-
-    if y:
-        y = np.concatenate(y)
-        if n_channels > 1:
-            y = y.reshape((-1, n_channels)).T
-    else:
-        y = np.empty(0, dtype=dtype)
+    # 녹음 오디오로 계산한 단어별 운율 특징 (선택 필드, start_time과 같은 순서의 공백 구분 문자열)
+    for key in ('word_durations', 'word_energies', 'word_intonations'):
+        if key in result:
+            res[key] = result[key]
 
-    return y, sr_native
-
-# Librosa에서 가져옴
-
-
-def buf_to_float(x, n_bytes=2, dtype=np.float32):
-    """정수 버퍼를 부동 소수점 값으로 변환합니다.
-    이것은 주로 정수 값 wav 데이터를 numpy 배열로 로드할 때 유용합니다.
-
-    Parameters
-    ----------
-    x : np.ndarray [dtype=int]
-        정수 값 데이터 버퍼
-
-    n_bytes : int [1, 2, 4]
-        ``x``의 샘플당 바이트 수
-
-    dtype : numeric type
-        대상 출력 유형 (기본값: 32비트 부동 소수점)
-
-    Returns
-    -------
-    x_float : np.ndarray [dtype=float]
-        부동 소수점으로 캐스팅된 입력 데이터 버퍼
-    """
-
-    # 데이터의 스케일을 반전
-    scale = 1.0 / float(1 << ((8 * n_bytes) - 1))
-
-    # 형식 문자열 구성
-    fmt = "<i{:d}".format(n_bytes)
-
-    # 데이터 버퍼를 재조정하고 형식화
-    return scale * np.frombuffer(x, fmt).astype(dtype)
+    return json.dumps(res)
@@ -0,0 +1,238 @@
+"""
+채점 단계별 지연 시간 계측
+
+채점 요청은 디코딩(+리샘플링), 전처리, VAD/품질 확인/노이즈 감소, ASR, 단어 정렬, IPA 변환,
+점수 계산, 운율 특징, 결과 직렬화 단계를 거칩니다. 각 단계를 stage_timer로 감싸면 처리 시간이
+프로세스 안의 단계별 히스토그램에 기록됩니다.
+
+- 히스토그램은 고정 버킷의 누적 개수(Prometheus histogram)와 최근 PERCENTILE_WINDOW개 값의
+  백분위수(p50/p90/p99)를 함께 제공합니다. render_prometheus()의 텍스트를 /metrics로 노출합니다.
+- ENABLE_REQUEST_TRACES를 켜면 request_trace 블록 안의 단계가 요청별 추적으로 묶여 한 줄로
+  출력되고, 최근 TRACE_HISTORY개를 get_recent_traces()로 확인할 수 있습니다. 끄면 추적 비용은
+  ContextVar 조회 한 번입니다. annotate()로 단계 시간 외의 값(예: 요청별 최대 메모리)을 덧붙일 수 있습니다.
+
+여러 프로세스(프리포크 워커)는 각자 히스토그램을 가지므로, 스크레이프는 워커마다 따로 집계됩니다.
+"""
+import bisect
+import contextlib
+import contextvars
+import threading
+import time
+from collections import deque
+import numpy as np
+
+try:
+    import config
+    _cfg = config.get_config()
+except ImportError:
+    _cfg = {}
+
+# 히스토그램 버킷 상한 (초). 마지막에 +Inf 버킷이 추가됩니다
+LATENCY_BUCKETS_S = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# 백분위수를 계산할 최근 관측 수 (단계별)
+PERCENTILE_WINDOW = 1024
+# /metrics에 노출할 백분위수
+QUANTILES = (0.5, 0.9, 0.99)
+# 요청별 추적 기록 여부
+ENABLE_REQUEST_TRACES = _cfg.get('enable_request_traces', False)
+# 보관할 최근 요청 추적 수
+TRACE_HISTORY = 100
+
+METRIC_NAME = 'pronunciation_stage_duration_seconds'
+
+
+class LatencyHistogram:
+    """고정 버킷 개수, 합계와 최근 관측값 링 버퍼 (호출하는 쪽에서 잠금)"""
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS_S, window: int = PERCENTILE_WINDOW) -> None:
+        self.buckets = tuple(buckets)
+        # 마지막 칸은 +Inf 버킷
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._recent = np.zeros(window)
+        self._recent_index = 0
+
+    def observe(self, seconds: float) -> None:
+        # 상한이 seconds 이상인 첫 버킷 (Prometheus의 le 의미)
+        self.bucket_counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self._recent[self._recent_index % len(self._recent)] = seconds
+        self._recent_index += 1
+
+    def percentiles(self, quantiles: tuple = QUANTILES) -> np.ndarray:
+        """최근 관측값의 백분위수 (관측이 없으면 0)"""
+        recent = self._recent[:min(self._recent_index, len(self._recent))]
+        if len(recent) == 0:
+            return np.zeros(len(quantiles))
+        return np.quantile(recent, quantiles)
+
+    def cumulativeCounts(self) -> list:
+        return np.cumsum(self.bucket_counts).tolist()
+
+
+class LatencyRegistry:
+    """단계 이름별 LatencyHistogram 모음"""
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS_S, window: int = PERCENTILE_WINDOW) -> None:
+        self.buckets = buckets
+        self.window = window
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = LatencyHistogram(self.buckets, self.window)
+            histogram.observe(seconds)
+
+    def getSummary(self) -> dict:
+        """단계별 호출 수, 평균과 최근 백분위수 (밀리초)"""
+        with self._lock:
+            summary = {}
+            for stage, histogram in sorted(self._histograms.items()):
+                p50, p90, p99 = histogram.percentiles((0.5, 0.9, 0.99)) * 1e3
+                summary[stage] = {'count': histogram.count,
+                                  'mean_ms': histogram.sum / histogram.count * 1e3,
+                                  'p50_ms': p50, 'p90_ms': p90, 'p99_ms': p99}
+            return summary
+
+    def renderPrometheus(self, gauges: dict = None) -> str:
+        """
+        Prometheus 텍스트 형식(0.0.4)으로 히스토그램과 최근 백분위수를 출력합니다.
+
+        Args:
+            gauges: 함께 출력할 {메트릭 이름: 숫자} (예: 승인 제어 대기열 길이)
+        """
+        lines = [f'# HELP {METRIC_NAME} Scoring pipeline stage latency.',
+                 f'# TYPE {METRIC_NAME} histogram']
+        quantile_lines = [f'# HELP {METRIC_NAME}_recent Stage latency quantiles over the last '
+                          f'{self.window} observations.',
+                          f'# TYPE {METRIC_NAME}_recent gauge']
+        with self._lock:
+            for stage, histogram in sorted(self._histograms.items()):
+                label = f'stage="{stage}"'
+                for bound, count in zip(self.buckets + ('+Inf',), histogram.cumulativeCounts()):
+                    lines.append(f'{METRIC_NAME}_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f'{METRIC_NAME}_sum{{{label}}} {histogram.sum:.6f}')
+                lines.append(f'{METRIC_NAME}_count{{{label}}} {histogram.count}')
+                for quantile, value in zip(QUANTILES, histogram.percentiles(QUANTILES)):
+                    quantile_lines.append(f'{METRIC_NAME}_recent{{{label},quantile="{quantile}"}} {value:.6f}')
+        lines.extend(quantile_lines)
+        for name, value in (gauges or {}).items():
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {float(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+# 프로세스 전체의 히스토그램과 최근 요청 추적
+registry = LatencyRegistry()
+_recent_traces = deque(maxlen=TRACE_HISTORY)
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+
+
+@contextlib.contextmanager
+def stage_timer(stage: str):
+    """
+    블록의 처리 시간을 stage 히스토그램에 기록하고, 요청 추적 중이면 추적에도 추가합니다.
+
+    예:
+        with latencyMetrics.stage_timer('alignment'):
+            ...
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start, start)
+
+
+def observe(stage: str, seconds: float, started_at: float = None) -> None:
+    """
+    이미 측정한 처리 시간을 기록합니다 (예: ASR 모델이 직접 잰 단계별 시간).
+
+    Args:
+        stage: 단계 이름
+        seconds: 처리 시간 (초)
+        started_at: 시작 시각 (time.perf_counter 기준, 추적에서 요청 시작부터의 위치로 사용)
+    """
+    registry.observe(stage, seconds)
+    trace = _current_trace.get()
+    if trace is not None:
+        offset = (started_at if started_at is not None else time.perf_counter() - seconds) - trace['_start']
+        trace['stages'].append((stage, round(offset * 1e3, 2), round(seconds * 1e3, 2)))
+
+
+@contextlib.contextmanager
+def request_trace(name: str):
+    """
+    ENABLE_REQUEST_TRACES이면 블록 안의 단계 시간을 요청 하나의 추적으로 모읍니다.
+    추적을 끄면 아무것도 하지 않습니다.
+    """
+    if not ENABLE_REQUEST_TRACES or _current_trace.get() is not None:
+        yield
+        return
+
+    trace = {'request': name, 'started_at': time.time(), 'stages': [], '_start': time.perf_counter()}
+    token = _current_trace.set(trace)
+    try:
+        yield
+    finally:
+        _current_trace.reset(token)
+        trace['total_ms'] = round((time.perf_counter() - trace.pop('_start')) * 1e3, 2)
+        _recent_traces.append(trace)
+        print(f"요청 추적 {name} {trace['total_ms']:.1f} ms: " +
+              ', '.join([f'{stage} +{offset:.1f} {duration:.1f} ms' for stage, offset, duration in trace['stages']] +
+                        [f'{key} {value}' for key, value in trace.get('annotations', {}).items()]))
+
+
+def annotate(name: str, value) -> None:
+    """요청 추적 중이면 단계 시간 외의 값(예: 최대 메모리)을 추적에 덧붙입니다."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.setdefault('annotations', {})[name] = value
+
+
+def get_recent_traces() -> list:
+    """최근 요청 추적 (오래된 순)"""
+    return list(_recent_traces)
+
+
+def render_prometheus(gauges: dict = None) -> str:
+    return registry.renderPrometheus(gauges)
+
+
+def _benchmark(number_of_observations: int = 100000):
+    """stage_timer 한 번의 비용과 렌더링 시간을 측정합니다."""
+    benchmark_registry = LatencyRegistry()
+    random_state = np.random.RandomState(0)
+    samples = random_state.lognormal(-4, 1.5, number_of_observations)
+
+    start = time.perf_counter()
+    for seconds in samples:
+        benchmark_registry.observe('stage', seconds)
+    observe_time = (time.perf_counter() - start) / number_of_observations
+
+    start = time.perf_counter()
+    for _ in range(number_of_observations // 10):
+        with stage_timer('benchmark'):
+            pass
+    timer_time = (time.perf_counter() - start) / (number_of_observations // 10)
+
+    benchmark_registry.renderPrometheus()
+    start = time.perf_counter()
+    text = benchmark_registry.renderPrometheus()
+    render_time = time.perf_counter() - start
+
+    p50, p90, p99 = benchmark_registry._histograms['stage'].percentiles((0.5, 0.9, 0.99))
+    expected = np.quantile(samples[-PERCENTILE_WINDOW:], (0.5, 0.9, 0.99))
+    print(f'observe {observe_time * 1e6:.2f} µs, stage_timer {timer_time * 1e6:.2f} µs, '
+          f'렌더링 {render_time * 1e3:.2f} ms ({len(text)} 바이트)')
+    print(f'최근 백분위수 p50 {p50 * 1e3:.2f} / p90 {p90 * 1e3:.2f} / p99 {p99 * 1e3:.2f} ms '
+          f'(기대값과 일치: {np.allclose((p50, p90, p99), expected)})')
+
+
+if __name__ == "__main__":
+    _benchmark()
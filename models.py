@@ -2,12 +2,13 @@
 한국어 발음 트레이너를 위한 모델 팩토리 함수
 음성 인식에 Whisper ASR 사용 (FasterWhisper 또는 표준 Whisper)
 """
+import os
 from ModelInterfaces import IASRModel
 
 
 def getASRModel(language: str, use_whisper: bool = True, use_faster_whisper: bool = True, 
                 model_size: str = "small", enable_noise_reduction: bool = True,
-                vad_aggressiveness: str = "moderate") -> IASRModel:
+                vad_aggressiveness: str = "moderate", num_workers: int = 1) -> IASRModel:
     """
     지정된 언어에 대한 ASR 모델을 가져옵니다.
     
@@ -19,6 +20,7 @@ def getASRModel(language: str, use_whisper: bool = True, use_faster_whisper: boo
         enable_noise_reduction: 노이즈 감소 활성화 (기본값: True)
         vad_aggressiveness: VAD 민감도 - 노이즈가 많은 환경에서는 "high" 또는 "very_high" 사용
                           ("low", "moderate", "high", "very_high")
+        num_workers: 하나의 모델로 동시에 전사할 수 있는 요청 수 (FasterWhisper 전용)
     
     Returns:
         IASRModel: ASR 모델 인스턴스
@@ -33,7 +35,8 @@ def getASRModel(language: str, use_whisper: bool = True, use_faster_whisper: boo
             return FasterWhisperASRModel(
                 model_name=model_size,
                 enable_noise_reduction=enable_noise_reduction,
-                vad_aggressiveness=vad_aggressiveness
+                vad_aggressiveness=vad_aggressiveness,
+                num_workers=num_workers
             )
         else:
             # 표준 Whisper 사용 (레거시)
@@ -50,3 +53,37 @@ def getASRModel(language: str, use_whisper: bool = True, use_faster_whisper: boo
             return WhisperASRModel(model_name=model_name)
     else:
         raise ValueError('한국어는 Whisper ASR만 지원됩니다')
+
+
+def getModelIdentity(model_size: str) -> dict:
+    """
+    FasterWhisperASRModel이 model_size로 실제로 불러올 모델을 식별합니다 (다운로드하지 않음).
+
+    허브 모델 이름이면 로컬 캐시의 스냅샷 경로(리비전 해시 포함)를, 로컬 디렉터리면 그 경로를
+    사용하고, model.bin의 수정 시각과 크기를 함께 기록합니다. 아직 받지 않은 모델이면 경로는 None입니다.
+
+    Args:
+        model_size: 모델 크기 또는 모델 디렉터리 경로
+
+    Returns:
+        {'model': model_size, 'path': 실제 경로, 'model_file': [수정 시각, 크기]}
+    """
+    path = None
+    if os.path.isdir(model_size):
+        path = model_size
+    else:
+        try:
+            from faster_whisper.utils import download_model
+            path = download_model(model_size, local_files_only=True)
+        except Exception:
+            path = None
+
+    model_file = None
+    if path is not None:
+        path = os.path.realpath(path)
+        try:
+            stat = os.stat(os.path.join(path, 'model.bin'))
+            model_file = [stat.st_mtime, stat.st_size]
+        except OSError:
+            model_file = None
+    return {'model': model_size, 'path': path, 'model_file': model_file}
@@ -0,0 +1,484 @@
+"""
+프리포크(pre-fork) 웹 서버
+
+부모 프로세스가 문장 저장소, 참조 문장 인덱스, 한글 음절 IPA 표, epitran과 Flask 앱을
+한 번만 불러온 뒤 gc.freeze()로 고정하고 워커 프로세스들을 fork합니다. 워커들은 이
+읽기 전용 데이터를 copy-on-write로 공유하므로 워커를 늘려도 메모리가 워커 수만큼
+늘어나지 않습니다 (메모리 매핑된 .npy/.npz 데이터는 페이지 캐시로 공유됩니다).
+
+Whisper 모델은 ASR 프로세스 하나에만 불러옵니다. CTranslate2(faster-whisper)는 모델을
+불러올 때 작업 스레드를 만들기 때문에, 모델을 불러온 프로세스를 fork하면 자식에서는
+전사가 멈춥니다. 그래서 워커들은 RemoteASRModel로 ASR 프로세스에 오디오를 보내고 결과를
+받습니다. ENABLE_ASR_BATCHING이면 여러 워커의 요청이 ASR 프로세스에서 한 배치로 묶입니다.
+
+요청 분배는 모든 워커가 공유하는 하나의 리슨 소켓에서 커널이 맡고, 부모 프로세스는
+감독자(supervisor)로서 각 자식의 하트비트를 확인합니다. 종료되었거나 하트비트가
+HEARTBEAT_TIMEOUT_S 동안 없는(요청 처리 중 멈춘) 자식은 다시 fork합니다. HTTP 워커는 요청
+사이마다(그리고 ASR 프로세스의 응답을 기다리는 동안에도), ASR 프로세스는 이전 하트비트 이전에 시작된 전사가 남아 있지 않을 때만 하트비트를
+보내므로, 전사 하나가 HEARTBEAT_TIMEOUT_S보다 오래 멈추면 ASR 프로세스도 다시 시작됩니다.
+
+실행:
+
+    python preforkServer.py [--workers N] [--port 3000]
+    python preforkServer.py --benchmark [--workers N]   # 워커별 메모리(RSS/PSS) 비교
+"""
+import argparse
+import contextlib
+import gc
+import os
+import select
+import signal
+import socket
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+import ModelInterfaces as mi
+
+try:
+    import config
+    _cfg = config.get_config()
+except ImportError:
+    _cfg = {}
+
+# 워커 수 (0이면 CPU 코어 수)
+NUMBER_OF_WORKERS = _cfg.get('prefork_workers', 0)
+# 하트비트 간격과, 이 시간 동안 하트비트가 없으면 멈춘 것으로 보고 다시 시작하는 시간
+HEARTBEAT_INTERVAL_S = 1.0
+HEARTBEAT_TIMEOUT_S = _cfg.get('worker_heartbeat_timeout_s', 120)
+# 시작 직후(RESPAWN_BACKOFF_S 이내) 종료되는 자식은 재시작 간격을 두 배씩 늘립니다 (최대 60초)
+RESPAWN_BACKOFF_S = 10
+# 워커가 ASR 프로세스의 응답을 기다리는 최대 시간
+ASR_REQUEST_TIMEOUT_S = _cfg.get('remote_asr_timeout_s', 120)
+
+
+# HTTP 워커 프로세스의 하트비트 파이프 (_serve_http에서 지정, ASR 응답을 기다리는 동안 사용)
+_worker_heartbeat_fd = None
+
+
+class RemoteASRError(RuntimeError):
+    """ASR 프로세스에서 전사하지 못했습니다."""
+
+
+class RemoteASRModel(mi.IASRModel):
+    """ASR 프로세스의 모델로 전사하는 프록시 (연결은 프로세스마다 처음 사용할 때 만듭니다)"""
+
+    def __init__(self, address, authkey: bytes, timeout_s: float = ASR_REQUEST_TIMEOUT_S) -> None:
+        self.address = address
+        self.authkey = authkey
+        self.timeout_s = timeout_s
+        self._connection = None
+        self._connection_pid = None
+        self._lock = threading.Lock()
+        self._transcript = ""
+        self._word_locations = []
+
+    def transcribeAudio(self, audio) -> mi.ASRResult:
+        if hasattr(audio, 'detach'):
+            audio = audio.detach().cpu().numpy()
+
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    connection = self._connect()
+                    connection.send(audio)
+                    if not self._waitForReply(connection):
+                        self._disconnect()
+                        raise RemoteASRError(f'ASR 프로세스가 {self.timeout_s}초 안에 응답하지 않았습니다')
+                    status, payload = connection.recv()
+                    break
+                except (EOFError, OSError) as error:
+                    # ASR 프로세스가 다시 시작되었으면 한 번 다시 연결합니다
+                    self._disconnect()
+                    if attempt:
+                        raise RemoteASRError(f'ASR 프로세스에 연결할 수 없습니다: {error}')
+
+        if status == 'error':
+            raise RemoteASRError(payload)
+        return mi.ASRResult(*payload)
+
+    def processAudio(self, audio):
+        self._transcript, self._word_locations = self.transcribeAudio(audio)
+
+    def getTranscript(self) -> str:
+        return self._transcript
+
+    def getWordLocations(self) -> list:
+        return self._word_locations
+
+    def _waitForReply(self, connection) -> bool:
+        """
+        timeout_s 동안 응답을 기다립니다. HTTP 워커에서는 기다리는 동안 HEARTBEAT_INTERVAL_S마다
+        하트비트를 보내므로, 느리지만 정상인 전사를 기다리는 워커를 감독자가 종료하지 않습니다
+        (기다리는 시간은 timeout_s로 제한됩니다).
+        """
+        deadline = time.monotonic() + self.timeout_s
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if connection.poll(min(remaining, HEARTBEAT_INTERVAL_S)):
+                return True
+            if _worker_heartbeat_fd is not None:
+                os.write(_worker_heartbeat_fd, b'.')
+
+    def _connect(self):
+        # fork 전에 만든 연결은 부모의 것이므로 자식에서는 새로 연결합니다
+        if self._connection is None or self._connection_pid != os.getpid():
+            self._connection = Client(self.address, family='AF_UNIX', authkey=self.authkey)
+            self._connection_pid = os.getpid()
+        return self._connection
+
+    def _disconnect(self):
+        if self._connection is not None and self._connection_pid == os.getpid():
+            self._connection.close()
+        self._connection = None
+
+
+def preload(language: str, remote_asr_model: mi.IASRModel) -> None:
+    """
+    워커들이 공유할 상태를 현재 프로세스에 불러옵니다.
+
+    트레이너는 Whisper 모델 대신 remote_asr_model을 사용하고, 문장 저장소, 인덱스,
+    IPA 변환기와 Flask 앱은 webApp을 가져올 때 lambda 모듈들이 불러옵니다.
+    """
+    import pronunciationTrainer
+    pronunciationTrainer.shared_asr_model = remote_asr_model
+    import webApp  # noqa: F401  (lambdaSpeechToScore, lambdaGetSample 초기화)
+
+
+class _TranscriptionTracker:
+    """ASR 프로세스에서 진행 중인 전사의 시작 시각 (하트비트를 보낼지 판단합니다)"""
+
+    def __init__(self) -> None:
+        self._started = {}
+        self._lock = threading.Lock()
+        self._last_beat = time.monotonic()
+
+    @contextlib.contextmanager
+    def transcribing(self):
+        token = object()
+        with self._lock:
+            self._started[token] = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._lock:
+                del self._started[token]
+
+    def isServing(self) -> bool:
+        """
+        이전 하트비트 이전에 시작된 전사가 없으면 True를 반환하고 하트비트 시각을 갱신합니다.
+        전사 하나가 끝나지 않는 동안에는 계속 False이므로, 감독자가 멈춘 프로세스를 찾을 수 있습니다.
+        """
+        with self._lock:
+            if any(started < self._last_beat for started in self._started.values()):
+                return False
+            self._last_beat = time.monotonic()
+            return True
+
+
+def _serve_asr(listener: Listener, heartbeat_fd: int, language: str) -> None:
+    """ASR 프로세스: 모델을 한 번 불러오고 워커 연결마다 스레드 하나로 전사 요청을 처리합니다."""
+    import pronunciationTrainer
+    asr_model = pronunciationTrainer.loadASRModel(language)
+    tracker = _TranscriptionTracker()
+    print(f'ASR 프로세스 준비 완료 (pid {os.getpid()})')
+
+    def accept_connections():
+        while True:
+            connection = listener.accept()
+            threading.Thread(target=_handle_asr_connection, args=(asr_model, connection, tracker),
+                             daemon=True).start()
+
+    threading.Thread(target=accept_connections, daemon=True).start()
+    _beat_until_stopped(heartbeat_fd, lambda: time.sleep(HEARTBEAT_INTERVAL_S), tracker.isServing)
+
+
+def _handle_asr_connection(asr_model: mi.IASRModel, connection, tracker: _TranscriptionTracker) -> None:
+    import torch
+    with connection:
+        while True:
+            try:
+                audio = connection.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                with tracker.transcribing():
+                    result = asr_model.transcribeAudio(torch.from_numpy(audio))
+                reply = ('ok', tuple(result))
+            except Exception as error:
+                reply = ('error', f'{type(error).__name__}: {error}')
+            try:
+                connection.send(reply)
+            except OSError:
+                return
+
+
+def _serve_http(listen_socket: socket.socket, heartbeat_fd: int) -> None:
+    """HTTP 워커: 공유 리슨 소켓에서 요청을 하나씩 처리하고 요청 사이마다 하트비트를 보냅니다."""
+    from werkzeug.serving import make_server
+    import streamingSession
+    import webApp
+    global _worker_heartbeat_fd
+
+    # RemoteASRModel이 ASR 응답을 기다리는 동안에도 하트비트를 보냅니다
+    _worker_heartbeat_fd = heartbeat_fd
+
+    # 커널이 연결을 워커들에 나눠 주므로 세션의 조각이 세션을 모르는 워커로 갈 수 있습니다
+    streamingSession.disable_sessions()
+
+    host, port = listen_socket.getsockname()[:2]
+    server = make_server(host, port, webApp.app, fd=listen_socket.fileno())
+    # 여러 워커가 같은 연결을 두고 깨어나므로, 연결을 놓친 워커는 accept에서 기다리지 않고 돌아갑니다
+    server.socket.setblocking(False)
+    server.timeout = HEARTBEAT_INTERVAL_S
+    _beat_until_stopped(heartbeat_fd, server.handle_request)
+
+
+def _beat_until_stopped(heartbeat_fd: int, step, is_serving=None) -> None:
+    """
+    SIGTERM을 받을 때까지 step을 반복하며 매번 하트비트를 씁니다.
+    is_serving을 주면 True를 반환할 때만 하트비트를 씁니다.
+    """
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+    while not stopping:
+        if is_serving is None or is_serving():
+            os.write(heartbeat_fd, b'.')
+        step()
+
+
+class PreforkServer:
+    """HTTP 워커들과 ASR 프로세스를 fork하고 감독하는 부모 프로세스"""
+
+    def __init__(self, host: str = '0.0.0.0', port: int = 3000, number_of_workers: int = None,
+                 language: str = 'ko', heartbeat_timeout_s: float = HEARTBEAT_TIMEOUT_S) -> None:
+        self.host = host
+        self.port = port
+        self.number_of_workers = number_of_workers or NUMBER_OF_WORKERS or os.cpu_count() or 1
+        self.language = language
+        self.heartbeat_timeout_s = heartbeat_timeout_s
+
+        self._children = {}  # pid -> {'kind', 'heartbeat_fd', 'started', 'last_beat', 'exiting'}
+        self._pending_spawns = []  # (시작할 시각, kind)
+        self._failures = {'asr': 0, 'http': 0}
+        self._stopping = False
+        self.listen_socket = None
+        self.asr_listener = None
+
+    def serve(self) -> None:
+        """공유 상태를 불러오고 자식 프로세스들을 fork한 뒤 감독합니다."""
+        authkey = os.urandom(32)
+        self.asr_listener = Listener(family='AF_UNIX', authkey=authkey)
+
+        start = time.time()
+        preload(self.language, RemoteASRModel(self.asr_listener.address, authkey))
+        # 불러온 객체를 GC 추적에서 빼서, 자식의 GC가 공유 페이지를 건드려 복사되지 않게 합니다
+        gc.collect()
+        gc.freeze()
+        print(f'공유 상태 로드 완료 ({time.time() - start:.1f}초, 고정 객체 {gc.get_freeze_count()}개)')
+
+        self.listen_socket = socket.create_server((self.host, self.port), backlog=128)
+        self.listen_socket.setblocking(False)
+
+        signal.signal(signal.SIGTERM, self._requestStop)
+        signal.signal(signal.SIGINT, self._requestStop)
+
+        self._spawn('asr')
+        for _ in range(self.number_of_workers):
+            self._spawn('http')
+        print(f'http://{self.host}:{self.port}/ 에서 워커 {self.number_of_workers}개로 서비스 중 '
+              f'(부모 pid {os.getpid()})')
+
+        try:
+            while not self._stopping:
+                self._superviseOnce()
+        finally:
+            self._stopChildren()
+            self.listen_socket.close()
+            self.asr_listener.close()
+
+    def _spawn(self, kind: str) -> int:
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                os.close(read_fd)
+                for child in self._children.values():
+                    os.close(child['heartbeat_fd'])
+                signal.signal(signal.SIGINT, signal.SIG_IGN)
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                if kind == 'asr':
+                    _serve_asr(self.asr_listener, write_fd, self.language)
+                else:
+                    _serve_http(self.listen_socket, write_fd)
+            except BaseException as error:
+                print(f'{kind} 프로세스 오류 (pid {os.getpid()}): {error}')
+                exit_code = 1
+            finally:
+                # 부모에게서 물려받은 정리 함수(atexit 등)를 실행하지 않습니다
+                os._exit(exit_code)
+
+        os.close(write_fd)
+        now = time.monotonic()
+        self._children[pid] = {'kind': kind, 'heartbeat_fd': read_fd, 'started': now,
+                               'last_beat': now, 'exiting': False}
+        return pid
+
+    def _superviseOnce(self) -> None:
+        # 종료 중인 자식(파이프가 닫혔거나 강제 종료한 자식)은 회수될 때까지 제외합니다
+        heartbeat_fds = {child['heartbeat_fd']: pid for pid, child in self._children.items()
+                         if not child['exiting']}
+        try:
+            readable, _, _ = select.select(list(heartbeat_fds), [], [], HEARTBEAT_INTERVAL_S)
+        except InterruptedError:
+            readable = []
+        now = time.monotonic()
+        for fd in readable:
+            child = self._children[heartbeat_fds[fd]]
+            if os.read(fd, 4096):
+                child['last_beat'] = now
+            else:
+                child['exiting'] = True
+
+        # 하트비트가 끊긴 자식은 멈춘 것으로 보고 종료합니다 (아래에서 회수 후 다시 fork)
+        for pid, child in self._children.items():
+            if not child['exiting'] and now - child['last_beat'] > self.heartbeat_timeout_s:
+                print(f"{child['kind']} 프로세스 {pid} 응답 없음 ({self.heartbeat_timeout_s}초), 다시 시작합니다")
+                child['exiting'] = True
+                self._kill(pid)
+
+        while self._children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                break
+            child = self._children.pop(pid, None)
+            if child is None:
+                continue
+            os.close(child['heartbeat_fd'])
+            if not self._stopping:
+                self._scheduleRespawn(pid, child, status)
+
+        for due in [due for due in self._pending_spawns if due[0] <= now]:
+            self._pending_spawns.remove(due)
+            self._spawn(due[1])
+
+    def _scheduleRespawn(self, pid: int, child: dict, status: int) -> None:
+        """종료된 자식을 다시 시작합니다. 시작 직후 계속 종료되면 간격을 늘립니다."""
+        kind = child['kind']
+        if time.monotonic() - child['started'] < RESPAWN_BACKOFF_S:
+            self._failures[kind] += 1
+            delay = min(2 ** (self._failures[kind] - 1), 60)
+        else:
+            self._failures[kind] = 0
+            delay = 0
+        print(f"{kind} 프로세스 {pid} 종료 (상태 {status}), {delay}초 후 다시 시작합니다")
+        self._pending_spawns.append((time.monotonic() + delay, kind))
+
+    def _requestStop(self, signum, frame) -> None:
+        self._stopping = True
+
+    def _kill(self, pid: int, sig: int = signal.SIGKILL) -> None:
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def _stopChildren(self, grace_period_s: float = 10.0) -> None:
+        """HTTP 워커가 처리 중인 요청을 끝내도록 SIGTERM을 보내고, 시간이 지나면 강제 종료합니다."""
+        for pid in self._children:
+            self._kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + grace_period_s
+        while self._children:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+            if pid:
+                os.close(self._children.pop(pid)['heartbeat_fd'])
+            elif time.monotonic() > deadline:
+                for pid in self._children:
+                    self._kill(pid)
+                deadline = float('inf')
+            else:
+                time.sleep(0.05)
+
+
+def _read_memory(pid: int) -> dict:
+    """/proc/<pid>/smaps_rollup에서 RSS, PSS, 공유/전용 메모리(MB)를 읽습니다."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as smaps:
+        for line in smaps:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {'rss': values['Rss'], 'pss': values['Pss'],
+            'shared': values['Shared_Clean'] + values['Shared_Dirty'],
+            'private': values['Private_Clean'] + values['Private_Dirty']}
+
+
+def _memory_benchmark(number_of_workers: int = 4, language: str = 'ko') -> None:
+    """
+    워커가 각자 상태를 불러올 때와 부모에서 불러와 fork할 때의 워커별 메모리를 비교합니다.
+
+    두 경우 모두 워커는 샘플 문장 요청을 몇 번 처리한 뒤 측정합니다. Whisper 모델은 두 경우
+    모두 포함하지 않습니다 (프리포크 서버에서는 ASR 프로세스 하나에만 불러옵니다).
+    """
+    import json
+    remote_asr_model = RemoteASRModel(None, b'')
+
+    def run_worker(load_in_worker, ready_fd):
+        if load_in_worker:
+            preload(language, remote_asr_model)
+        import lambdaGetSample
+        for idx in range(32):
+            lambdaGetSample.lambda_handler({'body': json.dumps({'language': language, 'index': idx})}, [])
+        os.write(ready_fd, b'.')
+        while True:
+            time.sleep(60)
+
+    for shared in (False, True):
+        if shared:
+            preload(language, remote_asr_model)
+            gc.collect()
+            gc.freeze()
+
+        pids = []
+        read_fd, write_fd = os.pipe()
+        for _ in range(number_of_workers):
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    run_worker(not shared, write_fd)
+                finally:
+                    os._exit(0)
+            pids.append(pid)
+        for _ in pids:
+            os.read(read_fd, 1)
+
+        usages = [_read_memory(pid) for pid in pids]
+        for pid in pids:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        os.close(read_fd)
+        os.close(write_fd)
+
+        def mean(key):
+            return sum(usage[key] for usage in usages) / len(usages)
+
+        label = '부모에서 불러와 공유' if shared else '워커마다 따로 불러옴'
+        print(f'{label:14s} 워커 {number_of_workers}개: 워커당 RSS {mean("rss"):7.1f} MB, '
+              f'PSS {mean("pss"):7.1f} MB, 전용 {mean("private"):7.1f} MB, '
+              f'PSS 합계 {sum(usage["pss"] for usage in usages):7.1f} MB')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='프리포크 발음 트레이너 서버')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=3000)
+    parser.add_argument('--workers', type=int, default=None, help='HTTP 워커 수 (기본값: CPU 코어 수)')
+    parser.add_argument('--benchmark', action='store_true', help='워커별 메모리 사용량 비교')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        _memory_benchmark(args.workers or 4)
+    else:
+        PreforkServer(args.host, args.port, args.workers).serve()
@@ -7,13 +7,25 @@ IPA 음소로 변환하고, 발음 정확도를 계산합니다.
 import torch
 import numpy as np
 import models as mo
-import WordMetrics
+import EditDistance
 import WordMatching as wm
 import ModelInterfaces as mi
 import AIModels
 import RuleBasedModels
-from string import punctuation
-import time
+import SentenceIndex
+import audioProcessing
+import resultCache
+import latencyMetrics
+from typing import Optional
+
+
+# removePunctuation용 변환 표 (string.punctuation 문자를 지움). 참조 문장 인덱스의 채점용 코드와
+# 같은 정규화가 되도록 SentenceIndex의 표를 사용합니다
+PUNCTUATION_TABLE = SentenceIndex.PUNCTUATION_TABLE
+
+# getTrainer가 ASR 모델을 직접 불러오는 대신 사용할 모델
+# preforkServer는 여기에 원격 ASR 모델을 지정해, 워커들이 Whisper 모델을 따로 불러오지 않게 합니다
+shared_asr_model = None
 
 
 def getTrainer(language: str, enable_noise_reduction: bool = None, 
@@ -30,6 +42,35 @@ def getTrainer(language: str, enable_noise_reduction: bool = None,
     Returns:
         PronunciationTrainer 인스턴스
     """
+    asr_model = shared_asr_model
+    if asr_model is None:
+        asr_model = loadASRModel(language, enable_noise_reduction,
+                                 vad_aggressiveness, model_size)
+    
+    # lambdaGetSample과 같은 변환기(및 변환 캐시)를 공유합니다
+    phonem_converter = RuleBasedModels.get_phonem_converter(language)
+    sentence_index = SentenceIndex.get_sentence_index(language)
+
+    trainer = PronunciationTrainer(
+        asr_model, phonem_converter, sentence_index, resultCache.get_result_cache())
+
+    return trainer
+
+
+def loadASRModel(language: str, enable_noise_reduction: bool = None,
+                 vad_aggressiveness: str = None, model_size: str = None) -> mi.IASRModel:
+    """
+    config.py 설정으로 ASR 모델을 불러옵니다 (ENABLE_ASR_BATCHING이면 배치 스케줄러로 감쌈).
+
+    Args:
+        language: 언어 코드 ('ko'만 지원)
+        enable_noise_reduction: 노이즈 감소 활성화 여부 (None이면 config.py에서 읽음)
+        vad_aggressiveness: VAD 민감도 (None이면 config.py에서 읽음)
+        model_size: Whisper 모델 크기 (None이면 config.py에서 읽음)
+
+    Returns:
+        IASRModel 인스턴스
+    """
     # 설정 파일에서 기본값 가져오기
     try:
         import config
@@ -41,14 +82,19 @@ def getTrainer(language: str, enable_noise_reduction: bool = None,
             vad_aggressiveness = cfg.get('vad_aggressiveness', "moderate")
         if model_size is None:
             model_size = cfg.get('model_size', "small")
+        num_workers = cfg.get('asr_num_workers', 1)
+        enable_batching = cfg.get('enable_asr_batching', False)
     except ImportError:
         # config.py가 없으면 하드코딩된 기본값 사용
+        cfg = {}
         if enable_noise_reduction is None:
             enable_noise_reduction = True
         if vad_aggressiveness is None:
             vad_aggressiveness = "moderate"
         if model_size is None:
             model_size = "small"
+        num_workers = 1
+        enable_batching = False
 
     asr_model = mo.getASRModel(
         language, 
@@ -56,18 +102,18 @@ def getTrainer(language: str, enable_noise_reduction: bool = None,
         use_faster_whisper=True,
         model_size=model_size,
         enable_noise_reduction=enable_noise_reduction,
-        vad_aggressiveness=vad_aggressiveness
+        vad_aggressiveness=vad_aggressiveness,
+        num_workers=num_workers
     )
-    
-    if language == 'ko':
-        phonem_converter = RuleBasedModels.KoreanPhonemConverter()
-    else:
-        raise ValueError('한국어만 지원됩니다')
-
-    trainer = PronunciationTrainer(
-        asr_model, phonem_converter)
-
-    return trainer
+    if enable_batching:
+        # 동시 요청을 모아 한 번에 전사합니다
+        import asrScheduler
+        asr_model = asrScheduler.ASRScheduler(
+            asr_model,
+            max_batch_size=cfg.get('asr_max_batch_size', 8),
+            batch_window_ms=cfg.get('asr_batch_window_ms', 20),
+            default_deadline_s=cfg.get('asr_request_deadline_s'))
+    return asr_model
 
 
 class PronunciationTrainer:
@@ -82,15 +128,24 @@ class PronunciationTrainer:
     categories_thresholds = np.array([80, 60, 59])
 
     sampling_rate = 16000
+    # ASR 전에 앞뒤 무음을 잘라냅니다
+    trim_silence = audioProcessing.ENABLE_SILENCE_TRIMMING
 
-    def __init__(self, asr_model: mi.IASRModel, word_to_ipa_coverter: mi.ITextToPhonemModel) -> None:
+    def __init__(self, asr_model: mi.IASRModel, word_to_ipa_coverter: mi.ITextToPhonemModel,
+                 sentence_index: SentenceIndex.SentenceIndex = None,
+                 result_cache: resultCache.ScoringResultCache = None) -> None:
         self.asr_model = asr_model
         self.ipa_converter = word_to_ipa_coverter
+        self.sentence_index = sentence_index
+        # 같은 녹음과 참조 문장의 재요청은 전사를 다시 실행하지 않습니다
+        self.result_cache = result_cache
 
-    def getTranscriptAndWordsLocations(self, audio_length_in_samples: int):
+    def getTranscriptAndWordsLocations(self, audio_length_in_samples: int, asr_result: mi.ASRResult = None):
 
-        audio_transcript = self.asr_model.getTranscript()
-        word_locations_in_samples = self.asr_model.getWordLocations()
+        if asr_result is None:
+            # 이전 방식: 모델에 저장된 마지막 전사 결과 (동시 요청에서는 안전하지 않음)
+            asr_result = mi.ASRResult(self.asr_model.getTranscript(), self.asr_model.getWordLocations())
+        audio_transcript, word_locations_in_samples = asr_result
 
         fade_duration_in_samples = 0.05*self.sampling_rate
         word_locations_in_samples = [(int(np.maximum(0, word['start_ts']-fade_duration_in_samples)), int(np.minimum(
@@ -99,42 +154,101 @@ class PronunciationTrainer:
         return audio_transcript, word_locations_in_samples
 
     def getWordsRelativeIntonation(self, Audio: torch.tensor, word_locations: list):
-        intonations = torch.zeros((len(word_locations), 1))
-        intonation_fade_samples = 0.3*self.sampling_rate
-        print(intonations.shape)
-        for word in range(len(word_locations)):
-            intonation_start = int(np.maximum(
-                0, word_locations[word][0]-intonation_fade_samples))
-            intonation_end = int(np.minimum(
-                Audio.shape[1]-1, word_locations[word][1]+intonation_fade_samples))
-            intonations[word] = torch.sqrt(torch.mean(
-                Audio[0][intonation_start:intonation_end]**2))
-
-        intonations = intonations/torch.mean(intonations)
-        return intonations
+        intonations = self.getWordsProsodyFeatures(Audio[0].numpy(), word_locations)['intonations']
+        return torch.from_numpy(intonations.astype(np.float32)).unsqueeze(1)
+
+    def getWordsProsodyFeatures(self, audio: np.ndarray, word_locations: list) -> dict:
+        """
+        단어별 길이, 에너지, 상대 억양을 한 번에 계산합니다.
+
+        모든 창의 경계를 정렬해 경계 사이 구간의 제곱 합을 np.add.reduceat 한 번으로 구하고,
+        그 누적 합의 차이로 각 창의 RMS를 얻습니다. 단어가 많은 긴 문장에서도 단어마다 오디오를
+        잘라 계산하지 않습니다.
+
+        Args:
+            audio: (samples,) 녹음
+            word_locations: getTranscriptAndWordsLocations의 (시작, 끝) 샘플 위치 목록
+
+        Returns:
+            단어별 np.ndarray 딕셔너리
+            durations: 단어 길이 (초)
+            energies: 단어 구간의 RMS (녹음 최대 진폭 기준 dB)
+            intonations: 앞뒤 0.3초를 포함한 구간의 RMS를 단어 평균으로 나눈 상대 억양
+        """
+        locations = np.asarray(word_locations, dtype=np.int64).reshape(-1, 2)
+        if len(locations) == 0 or len(audio) == 0:
+            empty = np.zeros(0)
+            return {'durations': empty, 'energies': empty, 'intonations': empty}
+
+        starts = np.clip(locations[:, 0], 0, len(audio))
+        ends = np.clip(locations[:, 1], starts, len(audio))
+        intonation_fade_samples = int(0.3*self.sampling_rate)
+        intonation_starts = np.maximum(0, starts - intonation_fade_samples)
+        intonation_ends = np.maximum(np.minimum(len(audio) - 1, ends + intonation_fade_samples),
+                                     intonation_starts)
+
+        # cumulative_energy[k] = audio[boundaries[0]:boundaries[k]]의 제곱 합
+        # (구간 합은 float32 쌍별 합산으로 충분히 정확하고, 누적은 긴 녹음을 위해 float64로 함)
+        boundaries = np.unique(np.concatenate((starts, ends, intonation_starts, intonation_ends)))
+        cumulative_energy = np.zeros(len(boundaries))
+        if len(boundaries) > 1:
+            squared = np.square(audio[boundaries[0]:boundaries[-1]])
+            np.cumsum(np.add.reduceat(squared, boundaries[:-1] - boundaries[0]), dtype=np.float64,
+                      out=cumulative_energy[1:])
+
+        def window_rms(window_starts, window_ends):
+            energy = (cumulative_energy[np.searchsorted(boundaries, window_ends)]
+                      - cumulative_energy[np.searchsorted(boundaries, window_starts)])
+            return np.sqrt(np.maximum(energy, 0.0) / np.maximum(window_ends - window_starts, 1))
+
+        peak = max(float(audio.max()), -float(audio.min()), 1e-10)
+        energies = 20 * np.log10(np.maximum(window_rms(starts, ends) / peak, 1e-10))
+
+        intonations = window_rms(intonation_starts, intonation_ends)
+        mean_intonation = np.mean(intonations)
+        if mean_intonation > 0:
+            intonations = intonations / mean_intonation
+
+        return {'durations': (locations[:, 1] - locations[:, 0]) / self.sampling_rate,
+                'energies': energies, 'intonations': intonations}
 
     ##################### ASR 함수 ###########################
 
     def processAudioForGivenText(self, recordedAudio: torch.Tensor = None, real_text=None):
 
-        start = time.time()
+        if self.result_cache is not None and real_text is not None:
+            key = self.result_cache.makeKey(recordedAudio, real_text)
+            return self.result_cache.getOrCompute(
+                key, lambda: self._processAudioForGivenText(recordedAudio, real_text))
+        return self._processAudioForGivenText(recordedAudio, real_text)
+
+    def _processAudioForGivenText(self, recordedAudio: torch.Tensor, real_text) -> dict:
         recording_transcript, recording_ipa, word_locations = self.getAudioTranscript(
             recordedAudio)
-        print('NN 오디오 전사 시간: ', str(time.time()-start))
 
-        start = time.time()
+        return self.scoreTranscript(recording_transcript, recording_ipa, word_locations, real_text,
+                                    recordedAudio[0].numpy())
+
+    def scoreTranscript(self, recording_transcript: str, recording_ipa: str, word_locations: list,
+                        real_text=None, recorded_audio: np.ndarray = None) -> dict:
+        """
+        전사 결과를 참조 문장과 비교해 processAudioForGivenText와 같은 결과를 만듭니다.
+        recorded_audio((samples,) 녹음)가 주어지면 단어별 길이, 에너지, 상대 억양도 함께 반환합니다.
+        """
+        reference = self.lookupReference(real_text)
         real_and_transcribed_words, real_and_transcribed_words_ipa, mapped_words_indices = self.matchSampleAndRecordedWords(
-            real_text, recording_transcript)
-        print('전사 매칭 시간: ', str(time.time()-start))
+            real_text, recording_transcript, reference)
 
         start_time, end_time = self.getWordLocationsFromRecordInSeconds(
             word_locations, mapped_words_indices)
 
-        pronunciation_accuracy, current_words_pronunciation_accuracy = self.getPronunciationAccuracy(
-            real_and_transcribed_words)  # _ipa 사용
+        with latencyMetrics.stage_timer('scoring'):
+            pronunciation_accuracy, current_words_pronunciation_accuracy = self.getPronunciationAccuracy(
+                real_and_transcribed_words,  # _ipa 사용
+                (reference.word_codes, reference.word_lengths) if reference is not None else None)
 
-        pronunciation_categories = self.getWordsPronunciationCategory(
-            current_words_pronunciation_accuracy)
+            pronunciation_categories = self.getWordsPronunciationCategory(
+                current_words_pronunciation_accuracy)
 
         result = {'recording_transcript': recording_transcript,
                   'real_and_transcribed_words': real_and_transcribed_words,
@@ -142,23 +256,57 @@ class PronunciationTrainer:
                   'real_and_transcribed_words_ipa': real_and_transcribed_words_ipa, 'pronunciation_accuracy': pronunciation_accuracy,
                   'pronunciation_categories': pronunciation_categories}
 
+        if recorded_audio is not None and len(word_locations) > 0:
+            with latencyMetrics.stage_timer('prosody'):
+                result.update(self.getWordsProsodyInRecord(
+                    recorded_audio, word_locations, mapped_words_indices))
+
         return result
 
     def getAudioTranscript(self, recordedAudio: torch.Tensor = None):
         current_recorded_audio = recordedAudio
 
-        current_recorded_audio = self.preprocessAudio(
-            current_recorded_audio)
+        with latencyMetrics.stage_timer('preprocess'):
+            current_recorded_audio = self.preprocessAudio(
+                current_recorded_audio)
 
-        self.asr_model.processAudio(current_recorded_audio)
+        # 요청마다 결과를 따로 받으므로 여러 스레드가 같은 트레이너를 사용할 수 있습니다
+        with latencyMetrics.stage_timer('asr'):
+            asr_result = self.transcribeAudio(current_recorded_audio)
 
         current_recorded_transcript, current_recorded_word_locations = self.getTranscriptAndWordsLocations(
-            current_recorded_audio.shape[1])
-        current_recorded_ipa = self.ipa_converter.convertToPhonem(
-            current_recorded_transcript)
+            current_recorded_audio.shape[1], asr_result)
+        with latencyMetrics.stage_timer('ipa_transcript'):
+            current_recorded_ipa = self.ipa_converter.convertToPhonem(
+                current_recorded_transcript)
 
         return current_recorded_transcript, current_recorded_ipa, current_recorded_word_locations
 
+    def transcribeAudio(self, audio: torch.Tensor) -> mi.ASRResult:
+        """
+        앞뒤 무음을 잘라낸 오디오를 전사합니다.
+
+        Whisper의 처리 시간은 입력 길이에 비례하므로 음성 구간만 넘기고, 단어 위치는 잘라낸
+        만큼 옮겨 원래 녹음 기준(샘플)으로 반환합니다.
+
+        Args:
+            audio: (1, samples) 전처리된 오디오
+
+        Returns:
+            ASRResult (단어 위치는 원래 녹음 기준)
+        """
+        if not self.trim_silence:
+            return self.asr_model.transcribeAudio(audio)
+
+        start, end = audioProcessing.find_speech_bounds(audio[0].numpy(), self.sampling_rate)
+        asr_result = self.asr_model.transcribeAudio(audio[:, start:end])
+        if start == 0:
+            return asr_result
+        word_locations = [dict(location, start_ts=location['start_ts'] + start,
+                               end_ts=location['end_ts'] + start)
+                          for location in asr_result.word_locations]
+        return mi.ASRResult(asr_result.transcript, word_locations)
+
     def getWordLocationsFromRecordInSeconds(self, word_locations, mapped_words_indices) -> list:
         start_time = []
         end_time = []
@@ -169,68 +317,128 @@ class PronunciationTrainer:
                                   [1])/self.sampling_rate)
         return ' '.join([str(time) for time in start_time]), ' '.join([str(time) for time in end_time])
 
+    def getWordsProsodyInRecord(self, recorded_audio: np.ndarray, word_locations: list,
+                                mapped_words_indices) -> dict:
+        """
+        getWordsProsodyFeatures 결과를 참조 문장의 단어 순서로 바꿔 start_time과 같은 공백 구분 문자열로 반환합니다.
+        매핑되지 않은 단어(인덱스 -1)는 '-'로 표시합니다.
+        """
+        features = self.getWordsProsodyFeatures(recorded_audio, word_locations)
+        mapped_words_indices = np.asarray(mapped_words_indices, dtype=np.int64)
+        is_mapped = mapped_words_indices >= 0
+        # 음수 인덱스가 마지막 단어의 값을 가져오지 않도록 매핑된 단어만 고릅니다
+        mapped_positions = mapped_words_indices[is_mapped]
+
+        def format_values(values: np.ndarray, value_format: str) -> str:
+            formatted = iter(format(value, value_format) for value in values[mapped_positions])
+            return ' '.join(next(formatted) if mapped else '-' for mapped in is_mapped.tolist())
+
+        return {'word_durations': format_values(features['durations'], '.3f'),
+                'word_energies': format_values(features['energies'], '.1f'),
+                'word_intonations': format_values(features['intonations'], '.3f')}
+
     ##################### ASR 함수 종료 ###########################
 
     ##################### 평가 함수 ###########################
-    def matchSampleAndRecordedWords(self, real_text, recorded_transcript):
+    def lookupReference(self, real_text) -> Optional[SentenceIndex.ReferenceSentence]:
+        """참조 문장 인덱스에서 real_text를 찾습니다 (인덱스가 없거나 없는 문장이면 None)."""
+        if real_text is None:
+            real_text = self.current_transcript[0]
+        if self.sentence_index is None:
+            return None
+        return self.sentence_index.lookup(real_text)
+
+    def matchSampleAndRecordedWords(self, real_text, recorded_transcript, reference=None):
         words_estimated = recorded_transcript.split()
 
         if real_text is None:
-            words_real = self.current_transcript[0].split()
+            real_text = self.current_transcript[0]
+
+        # 참조 문장이 인덱스에 있으면 미리 계산된 단어 분할과 IPA를 사용합니다
+        if reference is None:
+            reference = self.lookupReference(real_text)
+        if reference is not None:
+            words_real = reference.words
+            words_real_ipa = reference.words_ipa
         else:
             words_real = real_text.split()
+            with latencyMetrics.stage_timer('ipa_reference'):
+                words_real_ipa = [self.ipa_converter.convertToPhonem(word) for word in words_real]
 
-        mapped_words, mapped_words_indices = wm.get_best_mapped_words(
-            words_estimated, words_real)
+        with latencyMetrics.stage_timer('alignment'):
+            mapped_words, mapped_words_indices = wm.get_best_mapped_words(
+                words_estimated, words_real)
 
         real_and_transcribed_words = []
         real_and_transcribed_words_ipa = []
-        for word_idx in range(len(words_real)):
-            if word_idx >= len(mapped_words)-1:
-                mapped_words.append('-')
-            real_and_transcribed_words.append(
-                (words_real[word_idx],    mapped_words[word_idx]))
-            real_and_transcribed_words_ipa.append((self.ipa_converter.convertToPhonem(words_real[word_idx]),
-                                                   self.ipa_converter.convertToPhonem(mapped_words[word_idx])))
+        with latencyMetrics.stage_timer('ipa'):
+            for word_idx in range(len(words_real)):
+                if word_idx >= len(mapped_words)-1:
+                    mapped_words.append('-')
+                real_and_transcribed_words.append(
+                    (words_real[word_idx],    mapped_words[word_idx]))
+                real_and_transcribed_words_ipa.append((words_real_ipa[word_idx],
+                                                       self.ipa_converter.convertToPhonem(mapped_words[word_idx])))
         return real_and_transcribed_words, real_and_transcribed_words_ipa, mapped_words_indices
 
-    def getPronunciationAccuracy(self, real_and_transcribed_words_ipa) -> float:
-        total_mismatches = 0.
-        number_of_phonemes = 0.
-        current_words_pronunciation_accuracy = []
-        for pair in real_and_transcribed_words_ipa:
-
-            real_without_punctuation = self.removePunctuation(pair[0]).lower()
-            number_of_word_mismatches = WordMetrics.edit_distance_python(
-                real_without_punctuation, self.removePunctuation(pair[1]).lower())
-            total_mismatches += number_of_word_mismatches
-            number_of_phonemes_in_word = len(real_without_punctuation)
-            number_of_phonemes += number_of_phonemes_in_word
-
-            current_words_pronunciation_accuracy.append(float(
-                number_of_phonemes_in_word-number_of_word_mismatches)/number_of_phonemes_in_word*100)
-
-        percentage_of_correct_pronunciations = (
-            number_of_phonemes-total_mismatches)/number_of_phonemes*100
+    def getPronunciationAccuracy(self, real_and_transcribed_words_ipa, reference_word_codes: tuple = None) -> float:
+        """
+        단어 쌍 전체의 정확도를 한 번에 계산합니다.
+
+        모든 단어를 한 문자열로 이어 문장부호 제거와 소문자 변환을 한 번씩만 적용하고,
+        편집 거리는 EditDistance.edit_distance_pairs 한 번으로 구합니다.
+
+        Args:
+            real_and_transcribed_words_ipa: (참조 단어, 전사 단어) 쌍 목록
+            reference_word_codes: 참조 문장 인덱스의 (word_codes, word_lengths). 참조 단어를 다시
+                                  인코딩하지 않고 편집 거리 계산에 사용합니다
+
+        Returns:
+            (전체 정확도(반올림), 단어별 정확도 리스트)
+        """
+        words = '\n'.join(word for pair in real_and_transcribed_words_ipa for word in pair)
+        words = words.translate(PUNCTUATION_TABLE).lower().split('\n') if real_and_transcribed_words_ipa else []
+        real_words, transcribed_words = words[0::2], words[1::2]
+
+        if reference_word_codes is not None and len(reference_word_codes[1]) != len(real_words):
+            reference_word_codes = None
+        number_of_word_mismatches = EditDistance.edit_distance_pairs(
+            real_words, transcribed_words, reference_word_codes)
+        number_of_phonemes_in_word = np.array([len(word) for word in real_words], dtype=np.int64)
+        # 문장부호만 있는 단어는 발음할 음소가 없으므로 정확도 100으로 두고 전체 합계에서 뺍니다
+        # (0으로 나누면 NaN이 되어 JSON 응답이 깨집니다)
+        has_phonemes = number_of_phonemes_in_word > 0
+        total_mismatches = float(number_of_word_mismatches[has_phonemes].sum())
+        number_of_phonemes = float(number_of_phonemes_in_word.sum())
+
+        current_words_pronunciation_accuracy = np.full(len(real_words), 100.)
+        current_words_pronunciation_accuracy[has_phonemes] = (
+            number_of_phonemes_in_word[has_phonemes] - number_of_word_mismatches[has_phonemes]
+        ) / number_of_phonemes_in_word[has_phonemes] * 100
+
+        if number_of_phonemes == 0:
+            # 채점할 음소가 하나도 없으면 0점
+            percentage_of_correct_pronunciations = 0.
+        else:
+            percentage_of_correct_pronunciations = (
+                number_of_phonemes-total_mismatches)/number_of_phonemes*100
 
-        return np.round(percentage_of_correct_pronunciations), current_words_pronunciation_accuracy
+        return np.round(percentage_of_correct_pronunciations), current_words_pronunciation_accuracy.tolist()
 
     def removePunctuation(self, word: str) -> str:
-        return ''.join([char for char in word if char not in punctuation])
+        return word.translate(PUNCTUATION_TABLE)
 
     def getWordsPronunciationCategory(self, accuracies) -> list:
-        categories = []
-
-        for accuracy in accuracies:
-            categories.append(
-                self.getPronunciationCategoryFromAccuracy(accuracy))
-
-        return categories
+        """단어별 정확도 벡터 전체를 가장 가까운 임계값의 범주로 한 번에 바꿉니다."""
+        accuracies = np.asarray(accuracies, dtype=np.float64).reshape(-1, 1)
+        return list(np.argmin(np.abs(self.categories_thresholds - accuracies), axis=1))
 
     def getPronunciationCategoryFromAccuracy(self, accuracy) -> int:
         return np.argmin(abs(self.categories_thresholds-accuracy))
 
     def preprocessAudio(self, audio: torch.tensor) -> torch.tensor:
-        audio = audio-torch.mean(audio)
-        audio = audio/torch.max(torch.abs(audio))
+        """DC 성분을 빼고 최대 진폭을 1로 맞춥니다. 새 텐서를 만들지 않고 audio를 제자리에서 바꿉니다."""
+        audio -= torch.mean(audio)
+        minimum, maximum = torch.aminmax(audio)
+        audio /= torch.maximum(-minimum, maximum)
         return audio
@@ -0,0 +1,309 @@
+"""
+채점 결과 캐시
+
+모바일 네트워크에서 클라이언트가 같은 녹음을 다시 보내면(재시도, 재제출) 매번 Whisper 전사를
+다시 실행하게 됩니다. ScoringResultCache는 PronunciationTrainer.processAudioForGivenText 앞에서
+다음 값의 해시를 키로 결과를 기억합니다.
+
+- 디코딩 + 리샘플링된 오디오(float32 PCM) 바이트
+- 참조 문장
+- 설정 지문(채점 결과를 바꾸는 config.py 값, 실제 ASR 모델 경로/리비전, IPA 변환기 버전, 결과 형식 버전):
+  모델이나 변환기, 전처리 설정이 바뀌면 이전 결과를 쓰지 않습니다. 포트, 작업자 수, 대기열 한도 같은
+  운영 설정은 지문에 넣지 않으므로 조정해도 캐시가 비워지지 않습니다
+
+결과는 JSON 바이트로 저장하므로 크기를 정확히 셀 수 있습니다. 프로세스 메모리 계층은 바이트
+합계가 max_bytes를 넘으면 오래 쓰지 않은 항목부터 제거하고, 선택적인 디스크 계층
+(RESULT_CACHE_DIR)은 같은 서버의 프리포크 워커들이 함께 사용합니다. 같은 키의 요청이 처리 중이면
+뒤 요청은 전사를 다시 실행하지 않고 앞 요청의 결과를 기다립니다.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+
+try:
+    import config
+    _cfg = config.get_config()
+except ImportError:
+    _cfg = {}
+
+# 결과 형식이 바뀌면 올려서 이전 캐시 항목을 무효화합니다
+RESULT_FORMAT_VERSION = 2
+# 디스크 계층 크기를 이 횟수의 쓰기마다 확인합니다
+DISK_TRIM_INTERVAL = 64
+# 채점 결과에 영향을 주는 설정 키 (나머지는 처리 방식이나 용량만 바꾸므로 지문에 넣지 않습니다)
+RESULT_CONFIG_KEYS = (
+    'model_size', 'use_faster_whisper', 'enable_noise_reduction', 'enable_silence_trimming',
+    'trim_padding_ms', 'vad_aggressiveness', 'min_snr_threshold', 'max_silence_ratio',
+    'custom_vad_parameters', 'streaming_min_silence_ms')
+
+
+def _converter_version(language: str):
+    import RuleBasedModels
+    import SentenceIndex
+    return SentenceIndex.get_converter_version(RuleBasedModels.get_phonem_converter(language))
+
+
+def config_fingerprint(cfg: dict = None, language: str = 'ko') -> str:
+    """채점 결과를 바꾸는 설정 값, ASR 모델 식별 정보, IPA 변환기 버전과 결과 형식 버전의 해시"""
+    if cfg is None:
+        cfg = _cfg
+    import models
+    description = json.dumps({
+        'config': {key: cfg.get(key) for key in RESULT_CONFIG_KEYS},
+        'model': models.getModelIdentity(cfg.get('model_size', 'small')),
+        'converter': _converter_version(language),
+        'version': RESULT_FORMAT_VERSION
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(description.encode('utf-8')).hexdigest()[:16]
+
+
+def _to_builtin(value):
+    # 결과에는 numpy 스칼라(정확도, 범주)가 들어 있습니다
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f'{type(value).__name__}는 JSON으로 저장할 수 없습니다')
+
+
+class ScoringResultCache:
+    """메모리(크기 제한 LRU) + 선택적 디스크 계층의 채점 결과 캐시"""
+
+    def __init__(self, max_bytes: int = 16 * 2 ** 20, disk_dir: str = None,
+                 disk_max_bytes: int = 256 * 2 ** 20, fingerprint: str = None) -> None:
+        """
+        Args:
+            max_bytes: 메모리 계층이 보관할 최대 바이트 (0이면 메모리 계층 사용 안 함)
+            disk_dir: 디스크 계층 디렉터리 (None이면 사용 안 함)
+            disk_max_bytes: 디스크 계층의 최대 바이트
+            fingerprint: 설정 지문 (None이면 config_fingerprint())
+        """
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.fingerprint = fingerprint if fingerprint is not None else config_fingerprint()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._disk_writes = 0
+        self.bytes_held = 0
+        self.disk_bytes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        if disk_dir is not None:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._trimDisk()
+
+    def makeKey(self, audio, real_text: str) -> str:
+        """
+        Args:
+            audio: 디코딩된 오디오 (torch.Tensor 또는 np.ndarray)
+            real_text: 참조 문장
+        """
+        if hasattr(audio, 'detach'):
+            audio = audio.detach().cpu().numpy()
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(self.fingerprint.encode('ascii'))
+        digest.update(str(audio.dtype).encode('ascii') + str(audio.shape).encode('ascii'))
+        digest.update(memoryview(np.ascontiguousarray(audio)).cast('B'))
+        digest.update((real_text or '').encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key: str):
+        """캐시된 결과 딕셔너리를 반환합니다. 없으면 None"""
+        data, tier = self._find(key)
+        with self._lock:
+            self._countLookup(tier)
+        return json.loads(data) if data is not None else None
+
+    def put(self, key: str, result: dict) -> None:
+        data = json.dumps(result, default=_to_builtin, ensure_ascii=False).encode('utf-8')
+        self._putMemory(key, data)
+        if self.disk_dir is not None:
+            self._writeDisk(key, data)
+
+    def getOrCompute(self, key: str, compute):
+        """
+        캐시된 결과를 반환하거나, compute()로 계산해 저장한 뒤 반환합니다.
+        같은 키를 계산 중인 요청이 있으면 그 결과를 기다리고(coalesced로 한 번만 셉니다),
+        앞 요청이 실패했으면 기다리던 요청 중 하나가 새로 계산을 맡습니다.
+        """
+        waited = False
+        while True:
+            data, tier = self._find(key)
+            if data is not None:
+                with self._lock:
+                    if waited:
+                        self.coalesced += 1
+                    else:
+                        self._countLookup(tier)
+                return json.loads(data)
+
+            with self._lock:
+                # 확인한 뒤 앞 요청이 막 끝났을 수 있습니다
+                data = self._entries.get(key)
+                if data is None:
+                    event = self._in_flight.get(key)
+                    if event is None:
+                        event = self._in_flight[key] = threading.Event()
+                        self.misses += 1
+                        break
+                else:
+                    self._entries.move_to_end(key)
+                    if waited:
+                        self.coalesced += 1
+                    else:
+                        self.memory_hits += 1
+            if data is not None:
+                return json.loads(data)
+            event.wait()
+            waited = True
+
+        try:
+            result = compute()
+            self.put(key, result)
+            return result
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            event.set()
+
+    def getStats(self) -> dict:
+        with self._lock:
+            # 기다려 받은 요청도 전사를 다시 실행하지 않았으므로 적중으로 봅니다
+            hits = self.memory_hits + self.disk_hits + self.coalesced
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes_held": self.bytes_held,
+                "max_bytes": self.max_bytes,
+                "disk_bytes": self.disk_bytes,
+                "disk_max_bytes": self.disk_max_bytes if self.disk_dir is not None else 0,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "hit_ratio": hits / lookups if lookups else 0.0
+            }
+
+    def _find(self, key: str):
+        """(JSON 바이트, 'memory' 또는 'disk') 또는 (None, None). 통계는 세지 않습니다."""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                return data, 'memory'
+        if self.disk_dir is not None:
+            data = self._readDisk(key)
+            if data is not None:
+                self._putMemory(key, data)
+                return data, 'disk'
+        return None, None
+
+    def _countLookup(self, tier) -> None:
+        # self._lock을 잡은 상태에서 호출합니다
+        if tier == 'memory':
+            self.memory_hits += 1
+        elif tier == 'disk':
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+
+    def _putMemory(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes_held -= len(previous)
+            self._entries[key] = data
+            self.bytes_held += len(data)
+            while self.bytes_held > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes_held -= len(evicted)
+                self.evictions += 1
+
+    def _diskPath(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], key + '.json')
+
+    def _readDisk(self, key: str):
+        path = self._diskPath(key)
+        try:
+            with open(path, 'rb') as cache_file:
+                data = cache_file.read()
+            # 최근에 사용한 항목이 디스크 정리에서 늦게 제거되도록 수정 시각을 갱신합니다
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def _writeDisk(self, key: str, data: bytes) -> None:
+        path = self._diskPath(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 다른 워커가 쓰다 만 파일을 읽지 않도록 임시 파일에 쓴 뒤 바꿉니다
+            descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(descriptor, 'wb') as cache_file:
+                cache_file.write(data)
+            os.replace(temporary_path, path)
+        except OSError as e:
+            print(f"⚠️  채점 결과 캐시 쓰기 실패: {e}")
+            return
+
+        with self._lock:
+            self._disk_writes += 1
+            self.disk_bytes += len(data)
+            trim = self._disk_writes % DISK_TRIM_INTERVAL == 1
+        if trim:
+            self._trimDisk()
+
+    def _trimDisk(self) -> None:
+        """디스크 계층이 disk_max_bytes를 넘으면 오래된 파일부터 지웁니다."""
+        files = []
+        for directory in os.scandir(self.disk_dir):
+            if not directory.is_dir():
+                continue
+            for entry in os.scandir(directory.path):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in files)
+        if total > self.disk_max_bytes:
+            files.sort()
+            for _, size, path in files:
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                if total <= self.disk_max_bytes * 0.9:
+                    break
+        with self._lock:
+            self.disk_bytes = total
+
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """config.py 설정으로 만든 프로세스 전체의 캐시 (RESULT_CACHE_MAX_BYTES가 0이고 디스크도 없으면 None)"""
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is None:
+            max_bytes = _cfg.get('result_cache_max_bytes', 16 * 2 ** 20)
+            disk_dir = _cfg.get('result_cache_dir', None)
+            if max_bytes <= 0 and disk_dir is None:
+                return None
+            _result_cache = ScoringResultCache(
+                max_bytes, disk_dir, _cfg.get('result_cache_disk_max_bytes', 256 * 2 ** 20))
+        return _result_cache
@@ -72,6 +72,14 @@ const blockUI = () => {
   document.getElementById("buttonNext").style["background-color"] = "#adadad";
 };
 
+// 서버가 바빠 채점 요청을 받지 않았을 때 (HTTP 503): 잠시 후 다시 녹음할 수 있도록 안내
+const UIBusy = (retryAfter) => {
+  unblockUI();
+  document.getElementById("main_title").innerHTML = page_title;
+  document.getElementById("recording_result").innerHTML =
+    "Server is busy. Please try recording again in " + retryAfter + " seconds.";
+};
+
 const UIError = () => {
   blockUI();
   document.getElementById("buttonNext").onclick = () => getNextSample(); // 오류 발생 시 사용자는 새 샘플만 가져올 수 있음
@@ -373,10 +381,7 @@ const startMediaDevice = () => {
         let audioUrl = URL.createObjectURL(audioBlob);
         audioRecorded = new Audio(audioUrl);
 
-        let audioBase64 = await convertBlobToBase64(audioBlob);
-
-        let minimumAllowedLength = 6;
-        if (audioBase64.length < minimumAllowedLength) {
+        if (audioBlob.size === 0) {
           setTimeout(UIRecordingError, 50); // Make sure this function finished after get called again
           return;
         }
@@ -392,17 +397,31 @@ const startMediaDevice = () => {
           text = text.replace(/\s\s+/g, " ");
           currentText = [text];
 
-          await fetch(apiMainPathSTS + "/GetAccuracyFromRecordedAudio", {
-            method: "post",
-            body: JSON.stringify({
-              title: currentText[0],
-              base64Audio: audioBase64,
-              language: AILanguage,
-            }),
-            headers: { "X-Api-Key": STScoreAPIKey },
-          })
-            .then((res) => res.json())
+          // 녹음을 base64/JSON으로 감싸지 않고 바이너리 그대로 전송합니다
+          const query = new URLSearchParams({
+            title: currentText[0],
+            language: AILanguage,
+          });
+          await fetch(
+            apiMainPathSTS + "/GetAccuracyFromRecordedAudioBinary?" + query,
+            {
+              method: "post",
+              body: audioBlob,
+              headers: {
+                "X-Api-Key": STScoreAPIKey,
+                "Content-Type": mediaRecorder.mimeType || "audio/ogg",
+              },
+            },
+          )
+            .then((res) => {
+              if (res.status === 503) {
+                UIBusy(res.headers.get("Retry-After") || "1");
+                return null;
+              }
+              return res.json();
+            })
             .then((data) => {
+              if (data === null) return;
               if (playAnswerSounds)
                 playSoundForAnswerAccuracy(
                   parseFloat(data.pronunciation_accuracy),
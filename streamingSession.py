@@ -0,0 +1,364 @@
+"""
+스트리밍 채점 세션
+
+녹음이 끝난 뒤 전체 클립을 올리고 디코딩 + ASR을 기다리는 대신, 녹음 중에 PCM 조각을
+받아 바로 16 kHz로 리샘플링하고 에너지 VAD로 발화 구간을 나눕니다. 구간이 닫힐 때마다
+(음성 뒤에 MIN_SILENCE_MS 이상의 무음) 그 구간을 백그라운드에서 전사하므로, 녹음을 멈추면
+마지막 구간만 전사하면 됩니다.
+
+녹음이 끝나면 업로드 채점(processAudioForGivenText)과 같은 순서로 처리합니다. 전체 녹음으로
+결과 캐시를 찾고, 없으면 전체 녹음을 preprocessAudio로 정규화한 뒤 구간별 전사 결과를 구간
+시작 위치만큼 옮겨 합치고, 그 녹음으로 점수와 운율 특징을 계산합니다. 구간 전사도
+trainer.transcribeAudio를 거치므로 앞뒤 무음 자르기가 똑같이 적용됩니다. 업로드 채점과 다른
+점은 Whisper가 녹음 전체가 아니라 구간마다(구간별로 정규화된 오디오를) 전사한다는 것뿐이며,
+`python streamingSession.py [WAV 파일]`로 두 결과를 비교할 수 있습니다.
+
+세션은 프로세스 메모리에 있으므로 한 세션의 요청은 같은 프로세스로 가야 합니다
+(webApp.py, asgiApp.py처럼 단일 프로세스 서버에서 사용). 요청이 여러 워커로 나뉘는
+preforkServer는 disable_sessions()로 스트리밍을 끄고, 세션 요청은 StreamingUnavailable로 거절됩니다.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import torch
+import audioProcessing
+import latencyMetrics
+import ModelInterfaces as mi
+
+try:
+    import config
+    _cfg = config.get_config()
+except ImportError:
+    _cfg = {}
+
+SAMPLING_RATE = audioProcessing.TARGET_SAMPLING_RATE
+# VAD 프레임 길이
+FRAME_MS = 30
+# 음성 뒤에 이만큼 무음이 이어지면 구간을 닫고 전사를 시작합니다
+MIN_SILENCE_MS = _cfg.get('streaming_min_silence_ms', 600)
+# 무음이 없어도 구간을 이 길이에서 닫습니다 (Whisper 입력 창 30초 이내)
+MAX_SEGMENT_S = 25
+# 잡음 바닥보다 이만큼(dB) 크면 음성으로 봅니다
+SPEECH_THRESHOLD_DB = 10.0
+# 이보다 작은 RMS는 잡음 바닥과 관계없이 무음으로 봅니다
+MIN_SPEECH_RMS = 1e-3
+# 이 시간 동안 요청이 없는 세션은 정리합니다
+SESSION_IDLE_TIMEOUT_S = 120
+MAX_SESSIONS = 64
+# 세션 하나가 받을 수 있는 최대 녹음 길이 (초). 넘는 조각은 StreamingAudioTooLong으로 거절합니다
+STREAMING_MAX_SECONDS = _cfg.get('streaming_max_seconds', 120)
+# 이 프로세스에서 세션을 받을지 여부 (disable_sessions 참고)
+SESSIONS_ENABLED = True
+
+
+class StreamingSessionError(KeyError):
+    """세션이 없거나 만료되었습니다."""
+
+
+class StreamingSessionLimit(RuntimeError):
+    """동시에 열 수 있는 세션 수(MAX_SESSIONS)를 넘었습니다."""
+
+
+class StreamingAudioTooLong(ValueError):
+    """세션의 녹음이 STREAMING_MAX_SECONDS를 넘습니다."""
+
+
+class StreamingUnavailable(RuntimeError):
+    """이 서버에서는 스트리밍 세션을 사용할 수 없습니다 (여러 프로세스가 요청을 나눠 받는 서버)."""
+
+
+class EnergyVAD:
+    """프레임 RMS 에너지를 천천히 따라가는 잡음 바닥과 비교해 음성 여부를 판별합니다."""
+
+    def __init__(self, threshold_db: float = SPEECH_THRESHOLD_DB, min_rms: float = MIN_SPEECH_RMS,
+                 adaptation: float = 0.02) -> None:
+        self.threshold = 10 ** (threshold_db / 20)
+        self.min_rms = min_rms
+        self.adaptation = adaptation
+        self.noise_floor = None
+
+    def isSpeech(self, frame: np.ndarray) -> bool:
+        rms = float(np.sqrt(np.dot(frame, frame) / len(frame)))
+        if self.noise_floor is None or rms < self.noise_floor:
+            # 더 조용한 프레임이 나오면 바로 내립니다
+            self.noise_floor = rms
+            return False
+        is_speech = rms > max(self.min_rms, self.noise_floor * self.threshold)
+        # 긴 발화가 잡음 바닥으로 흡수되지 않도록 음성 프레임에서는 훨씬 천천히 올립니다
+        rate = self.adaptation / 50 if is_speech else self.adaptation
+        self.noise_floor += rate * (rms - self.noise_floor)
+        return is_speech
+
+
+class StreamingSession:
+    """녹음 하나를 조각 단위로 받아 구간별로 미리 전사하는 세션"""
+
+    def __init__(self, trainer, real_text: str, sample_rate: int, executor: ThreadPoolExecutor) -> None:
+        self.trainer = trainer
+        self.real_text = real_text
+        self.executor = executor
+        self.resampler = audioProcessing.StreamingResampler(sample_rate, SAMPLING_RATE)
+        self.vad = EnergyVAD()
+        self.last_activity = time.monotonic()
+
+        self._lock = threading.Lock()
+        self._received = 0
+        self._max_received = int(STREAMING_MAX_SECONDS * sample_rate)
+        self._audio = np.empty(SAMPLING_RATE * 10, dtype=np.float32)
+        self._length = 0
+        self._frame_length = SAMPLING_RATE * FRAME_MS // 1000
+        self._analysed = 0
+        self._segment_start = 0
+        self._segment_has_speech = False
+        self._silent_frames = 0
+        self._segments = []  # (시작 샘플, 끝 샘플, 전사 Future)
+
+    def addChunk(self, pcm: np.ndarray) -> dict:
+        """
+        PCM 조각을 추가하고 닫힌 구간을 전사 대기열에 넣습니다.
+
+        Returns:
+            받은 길이(초), 닫힌 구간 수, 지금까지 끝난 구간들의 전사 문자열
+        """
+        with self._lock:
+            self.last_activity = time.monotonic()
+            # 버퍼가 끝없이 커지지 않도록 리샘플링 전에 받은 입력 길이로 확인합니다
+            if self._received + len(pcm) > self._max_received:
+                raise StreamingAudioTooLong(f'스트리밍 녹음은 최대 {STREAMING_MAX_SECONDS}초입니다')
+            self._received += len(pcm)
+            self._append(self.resampler.process(pcm))
+            self._analyse()
+            return {'received_s': self._length / SAMPLING_RATE,
+                    'closed_segments': len(self._segments),
+                    'partial_transcript': self.partialTranscript()}
+
+    def partialTranscript(self) -> str:
+        """전사가 끝난 앞쪽 구간들의 전사 문자열"""
+        transcripts = []
+        for _, _, future in self._segments:
+            if not future.done() or future.exception() is not None:
+                break
+            if future.result().transcript.strip():
+                transcripts.append(future.result().transcript.strip())
+        return ' '.join(transcripts)
+
+    def finish(self) -> dict:
+        """
+        남은 오디오를 마지막 구간으로 전사하고 모든 구간을 합쳐 평가합니다.
+
+        Returns:
+            PronunciationTrainer.processAudioForGivenText와 같은 형식의 결과
+        """
+        with self._lock:
+            self._append(self.resampler.flush())
+            self._analyse()
+            if self._length > self._segment_start and (self._segment_has_speech or not self._segments):
+                self._closeSegment(self._length)
+            # 업로드 채점의 디코딩 결과와 같은 (1, samples) float32 녹음
+            recorded_audio = torch.from_numpy(self._audio[:self._length]).unsqueeze(0)
+            segments = list(self._segments)
+
+        trainer = self.trainer
+        if trainer.result_cache is not None and self.real_text is not None:
+            # 같은 녹음을 업로드로 채점한 결과와 캐시를 공유합니다 (키는 정규화 전 녹음으로 만듭니다)
+            key = trainer.result_cache.makeKey(recorded_audio, self.real_text)
+            return trainer.result_cache.getOrCompute(
+                key, lambda: self._scoreRecording(recorded_audio, segments))
+        return self._scoreRecording(recorded_audio, segments)
+
+    def _scoreRecording(self, recorded_audio: torch.Tensor, segments: list) -> dict:
+        """PronunciationTrainer._processAudioForGivenText와 같은 단계로 녹음을 평가합니다 (ASR만 구간별 결과 사용)."""
+        trainer = self.trainer
+        with latencyMetrics.stage_timer('preprocess'):
+            recorded_audio = trainer.preprocessAudio(recorded_audio)
+
+        transcripts = []
+        word_locations = []
+        for segment_start, _, future in segments:
+            transcript, locations = future.result()
+            if transcript.strip():
+                transcripts.append(transcript.strip())
+            for location in locations:
+                location = dict(location)
+                for key in ('start_ts', 'end_ts'):
+                    if location[key] is not None:
+                        location[key] += segment_start
+                word_locations.append(location)
+
+        recording_transcript, word_locations = trainer.getTranscriptAndWordsLocations(
+            recorded_audio.shape[1], mi.ASRResult(' '.join(transcripts), word_locations))
+        with latencyMetrics.stage_timer('ipa_transcript'):
+            recording_ipa = trainer.ipa_converter.convertToPhonem(recording_transcript)
+        return trainer.scoreTranscript(recording_transcript, recording_ipa, word_locations,
+                                       self.real_text, recorded_audio[0].numpy())
+
+    def cancel(self) -> None:
+        """아직 시작하지 않은 구간 전사를 취소합니다."""
+        for _, _, future in self._segments:
+            future.cancel()
+
+    def _append(self, samples: np.ndarray) -> None:
+        if self._length + len(samples) > len(self._audio):
+            grown = np.empty(max(2 * len(self._audio), self._length + len(samples)), dtype=np.float32)
+            grown[:self._length] = self._audio[:self._length]
+            self._audio = grown
+        self._audio[self._length:self._length + len(samples)] = samples
+        self._length += len(samples)
+
+    def _analyse(self) -> None:
+        min_silent_frames = max(MIN_SILENCE_MS // FRAME_MS, 1)
+        max_segment_length = MAX_SEGMENT_S * SAMPLING_RATE
+        while self._analysed + self._frame_length <= self._length:
+            frame = self._audio[self._analysed:self._analysed + self._frame_length]
+            self._analysed += self._frame_length
+            if self.vad.isSpeech(frame):
+                self._segment_has_speech = True
+                self._silent_frames = 0
+            elif self._segment_has_speech:
+                self._silent_frames += 1
+
+            if self._segment_has_speech and self._silent_frames >= min_silent_frames:
+                # 무음의 가운데에서 자릅니다
+                self._closeSegment(self._analysed - self._silent_frames * self._frame_length // 2)
+            elif self._analysed - self._segment_start >= max_segment_length:
+                if self._segment_has_speech:
+                    self._closeSegment(self._analysed)
+                else:
+                    # 음성이 없는 긴 구간은 전사하지 않습니다
+                    self._segment_start = self._analysed
+
+    def _closeSegment(self, end: int) -> None:
+        segment = self._audio[self._segment_start:end].copy()
+        future = self.executor.submit(self._transcribe, segment)
+        self._segments.append((self._segment_start, end, future))
+        self._segment_start = end
+        self._segment_has_speech = False
+        self._silent_frames = 0
+
+    def _transcribe(self, segment: np.ndarray) -> mi.ASRResult:
+        audio = self.trainer.preprocessAudio(torch.from_numpy(segment).unsqueeze(0))
+        return self.trainer.transcribeAudio(audio)
+
+
+# 프로세스 전체의 세션과 구간 전사 스레드 풀
+_sessions = {}
+_sessions_lock = threading.Lock()
+_executor = None
+
+
+def disable_sessions() -> None:
+    """
+    이 프로세스에서 스트리밍 세션을 끕니다. 한 세션의 조각이 세션을 모르는 다른 워커로
+    가면 안 되므로, 요청을 여러 프로세스로 나누는 서버는 워커마다 호출합니다.
+    """
+    global SESSIONS_ENABLED
+    SESSIONS_ENABLED = False
+
+
+def _check_enabled() -> None:
+    if not SESSIONS_ENABLED:
+        raise StreamingUnavailable('이 서버에서는 스트리밍 세션을 사용할 수 없습니다 (업로드 채점을 사용하세요)')
+
+
+def start_session(trainer, real_text: str, sample_rate: int) -> str:
+    """새 세션을 만들고 세션 ID를 반환합니다."""
+    global _executor
+    _check_enabled()
+    expire_idle_sessions()
+    with _sessions_lock:
+        if len(_sessions) >= MAX_SESSIONS:
+            raise StreamingSessionLimit('동시에 열 수 있는 스트리밍 세션 수를 넘었습니다')
+        if _executor is None:
+            _executor = ThreadPoolExecutor(_cfg.get('asr_num_workers', 1),
+                                           thread_name_prefix='streaming-asr')
+        session_id = uuid.uuid4().hex
+        _sessions[session_id] = StreamingSession(trainer, real_text, sample_rate, _executor)
+        return session_id
+
+
+def get_session(session_id: str) -> StreamingSession:
+    _check_enabled()
+    expire_idle_sessions()
+    with _sessions_lock:
+        if session_id not in _sessions:
+            raise StreamingSessionError(session_id)
+        return _sessions[session_id]
+
+
+def finish_session(session_id: str) -> dict:
+    """세션을 닫고 최종 평가 결과를 반환합니다."""
+    _check_enabled()
+    expire_idle_sessions()
+    with _sessions_lock:
+        session = _sessions.pop(session_id, None)
+    if session is None:
+        raise StreamingSessionError(session_id)
+    return session.finish()
+
+
+def expire_idle_sessions() -> int:
+    """SESSION_IDLE_TIMEOUT_S 동안 사용되지 않은 세션을 정리하고 정리한 수를 반환합니다."""
+    now = time.monotonic()
+    with _sessions_lock:
+        expired = [session_id for session_id, session in _sessions.items()
+                   if now - session.last_activity > SESSION_IDLE_TIMEOUT_S]
+        for session_id in expired:
+            _sessions.pop(session_id).cancel()
+    return len(expired)
+
+
+def _parity_check(trainer, file_bytes: bytes, real_text: str, suffix: str = '.wav',
+                  chunk_ms: int = 100) -> list:
+    """
+    같은 녹음을 업로드 채점(processAudioForGivenText)과 스트리밍 세션으로 평가해 다른 필드를 반환합니다.
+    두 경로 모두 결과 캐시 없이 실행합니다.
+
+    Args:
+        trainer: PronunciationTrainer
+        file_bytes: 녹음 파일 (모노)
+        real_text: 참조 문장
+        suffix: 파일 확장자
+        chunk_ms: 스트리밍 조각 길이
+
+    Returns:
+        (필드 이름, 업로드 결과, 스트리밍 결과) 목록 (같으면 빈 목록)
+    """
+    import copy
+    trainer = copy.copy(trainer)
+    trainer.result_cache = None
+
+    recorded_audio = torch.from_numpy(audioProcessing.load_audio_resampled(file_bytes, suffix=suffix)).unsqueeze(0)
+    uploaded = trainer.processAudioForGivenText(recorded_audio, real_text)
+
+    pcm, sample_rate = audioProcessing.load_audio_bytes(file_bytes, suffix=suffix)
+    chunk_length = max(sample_rate * chunk_ms // 1000, 1)
+    with ThreadPoolExecutor(1) as executor:
+        session = StreamingSession(trainer, real_text, sample_rate, executor)
+        for start in range(0, len(pcm), chunk_length):
+            session.addChunk(pcm[start:start + chunk_length])
+        streamed = session.finish()
+
+    differences = []
+    for key in sorted(set(uploaded) | set(streamed)):
+        if str(uploaded.get(key)) != str(streamed.get(key)):
+            differences.append((key, uploaded.get(key), streamed.get(key)))
+    return differences
+
+
+if __name__ == "__main__":
+    import sys
+    import pronunciationTrainer
+
+    if len(sys.argv) < 3:
+        print('사용법: python streamingSession.py <녹음 파일> <참조 문장>')
+        sys.exit(1)
+    file_path, real_text = sys.argv[1], sys.argv[2]
+    with open(file_path, 'rb') as audio_file:
+        file_bytes = audio_file.read()
+    differences = _parity_check(pronunciationTrainer.getTrainer('ko'), file_bytes, real_text,
+                                suffix=file_path[file_path.rfind('.'):])
+    for key, uploaded, streamed in differences:
+        print(f'{key}:\n  업로드   {uploaded}\n  스트리밍 {streamed}')
+    print(f'다른 필드 {len(differences)}개')
@@ -1,9 +1,83 @@
 import string 
 import random 
+import os
+import shutil
+import numpy as np
 
 
 def generateRandomString(str_length: int = 20):
 
     # 소문자 출력
     letters = string.ascii_lowercase
-    return ''.join(random.choice(letters) for i in range(str_length))
\ No newline at end of file
+    return ''.join(random.choice(letters) for i in range(str_length))
+
+def saveStringArray(path_prefix: str, strings) -> None:
+    """
+    문자열 목록을 하나의 UTF-8 바이트 덩어리와 오프셋 배열로 저장합니다.
+
+    Args:
+        path_prefix: 저장 경로 접두사 (<접두사>_blob.npy, <접두사>_offsets.npy가 생성됨)
+        strings: 저장할 문자열 목록
+    """
+    encoded = [text.encode('utf-8') for text in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(data) for data in encoded], out=offsets[1:])
+    blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    np.save(path_prefix + '_blob.npy', blob)
+    np.save(path_prefix + '_offsets.npy', offsets)
+
+
+class MappedStringArray:
+    """
+    saveStringArray로 저장된 문자열 배열을 메모리 매핑으로 읽습니다.
+
+    파일 전체를 읽지 않고 요청된 항목의 바이트만 디코딩하므로 항목 수와 무관하게 O(1)로
+    접근하며, fork된 워커 프로세스들이 같은 페이지 캐시를 읽기 전용으로 공유합니다.
+    """
+
+    def __init__(self, path_prefix: str) -> None:
+        self.blob = np.load(path_prefix + '_blob.npy', mmap_mode='r')
+        self.offsets = np.load(path_prefix + '_offsets.npy', mmap_mode='r')
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx: int) -> str:
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        start, end = int(self.offsets[idx]), int(self.offsets[idx + 1])
+        return self.blob[start:end].tobytes().decode('utf-8')
+
+
+def replaceFolder(temporary_folder: str, folder: str) -> None:
+    """
+    임시 폴더에 모두 쓴 결과물로 기존 폴더를 교체합니다.
+
+    기존 폴더를 먼저 다른 이름으로 옮긴 뒤 임시 폴더를 그 자리로 옮기고, 옮겨 둔 폴더는 마지막에
+    지웁니다. 폴더가 반쯤 지워진 상태는 보이지 않고, 두 이름 바꾸기 사이에만 잠깐 폴더가 없습니다.
+    그 사이 다른 프로세스가 먼저 새 폴더를 옮겨 놓았으면 그 결과를 쓰고 임시 폴더를 지웁니다.
+    (이미 열린 메모리 매핑은 교체 후에도 유효합니다)
+    """
+    old_folder = None
+    if os.path.isdir(folder):
+        old_folder = f'{folder}.old-{os.getpid()}'
+        try:
+            os.rename(folder, old_folder)
+        except OSError:
+            # 다른 프로세스가 먼저 옮겼습니다
+            old_folder = None
+    try:
+        os.rename(temporary_folder, folder)
+    except OSError:
+        shutil.rmtree(temporary_folder, ignore_errors=True)
+        if old_folder is not None and not os.path.isdir(folder):
+            # 다른 프로세스의 결과도 없으면 기존 폴더를 되돌립니다
+            try:
+                os.rename(old_folder, folder)
+                old_folder = None
+            except OSError:
+                pass
+    if old_folder is not None:
+        shutil.rmtree(old_folder, ignore_errors=True)
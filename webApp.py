@@ -9,9 +9,20 @@ import webbrowser
 import os
 from flask_cors import CORS
 import json
+from urllib.parse import unquote
 
 import lambdaSpeechToScore
 import lambdaGetSample
+import admissionControl
+import streamingSession
+import resultCache
+import latencyMetrics
+
+try:
+    import config
+    _asr_num_workers = config.get_config().get('asr_num_workers', 1)
+except ImportError:
+    _asr_num_workers = 1
 
 app = Flask(__name__)
 cors = CORS(app)
@@ -19,6 +30,15 @@ app.config['CORS_HEADERS'] = '*'
 
 rootPath = ''
 
+# 채점 요청 승인 제어: 동시에 전사할 수 있는 요청 수만큼 실행하고 나머지는 대기열에서 기다립니다
+scoring_admission = admissionControl.AdmissionController(concurrency=_asr_num_workers)
+
+
+def rejected_response(rejected: admissionControl.AdmissionRejected):
+    """승인되지 않은 채점 요청에 503과 Retry-After로 응답합니다."""
+    return ({'error': rejected.reason, 'retry_after': rejected.retryAfterHeader}, 503,
+            {'Retry-After': rejected.retryAfterHeader})
+
 
 @app.route(rootPath+'/')
 def main():
@@ -36,7 +56,58 @@ def GetAccuracyFromRecordedAudio():
 
     try:
         event = {'body': json.dumps(request.get_json(force=True))}
-        lambda_correct_output = lambdaSpeechToScore.lambda_handler(event, [])
+        lambda_correct_output = scoring_admission.run(
+            lambdaSpeechToScore.lambda_handler, event, [])
+    except admissionControl.AdmissionRejected as rejected:
+        return rejected_response(rejected)
+    except Exception as e:
+        print('오류: ', str(e))
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Headers': '*',
+                'Access-Control-Allow-Credentials': "true",
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+            },
+            'body': ''
+        }
+
+    return lambda_correct_output
+
+
+# 바이너리 업로드의 Content-Type별 임시 파일 확장자 (soundfile이 읽지 못하는 코덱용)
+AUDIO_SUFFIXES = {'audio/webm': '.webm', 'audio/ogg': '.ogg', 'audio/wav': '.wav',
+                  'audio/x-wav': '.wav', 'audio/wave': '.wav', 'audio/mpeg': '.mp3',
+                  'audio/mp4': '.m4a', 'audio/flac': '.flac'}
+
+
+@app.route(rootPath+'/GetAccuracyFromRecordedAudioBinary', methods=['POST'])
+def GetAccuracyFromRecordedAudioBinary():
+    """
+    오디오를 요청 본문(raw) 또는 multipart 파일로 받아 평가합니다.
+
+    참조 문장은 X-Title 헤더(URL 인코딩) 또는 title 쿼리/폼 파라미터로,
+    언어는 X-Language 헤더 또는 language 파라미터로 전달합니다 (기본값 'ko').
+    base64 인코딩과 JSON 파싱을 거치지 않으므로 오디오 바이트가 디코더까지 그대로 전달됩니다.
+    """
+    try:
+        real_text = unquote(request.headers.get('X-Title', '')) or request.values.get('title', '')
+        language = request.headers.get('X-Language') or request.values.get('language', 'ko')
+
+        if request.files:
+            audio_file = request.files.get('audio') or next(iter(request.files.values()))
+            content_type = audio_file.mimetype
+            file_bytes = audio_file.read()
+        else:
+            content_type = request.mimetype
+            file_bytes = request.get_data(cache=False)
+
+        suffix = AUDIO_SUFFIXES.get(content_type, '.ogg')
+        lambda_correct_output = scoring_admission.run(
+            lambdaSpeechToScore.score_audio_bytes, file_bytes, real_text, language, suffix=suffix)
+    except admissionControl.AdmissionRejected as rejected:
+        return rejected_response(rejected)
     except Exception as e:
         print('오류: ', str(e))
         return {
@@ -53,6 +124,86 @@ def GetAccuracyFromRecordedAudio():
     return lambda_correct_output
 
 
+@app.route(rootPath+'/startStreamingSession', methods=['POST'])
+def startStreamingSession():
+    """
+    스트리밍 채점 세션을 시작합니다.
+
+    본문(JSON): {"title": 참조 문장, "language": "ko", "sampleRate": PCM 샘플링 레이트}
+    """
+    data = request.get_json(force=True)
+    try:
+        return lambdaSpeechToScore.start_stream(
+            data['title'], data.get('language', 'ko'), data.get('sampleRate', 16000))
+    except streamingSession.StreamingSessionLimit as e:
+        return {'error': str(e)}, 503, {'Retry-After': '5'}
+    except streamingSession.StreamingUnavailable as e:
+        return {'error': str(e)}, 501
+
+
+@app.route(rootPath+'/streamAudioChunk', methods=['POST'])
+def streamAudioChunk():
+    """
+    세션에 모노 PCM 조각(리틀 엔디언 float32, format=s16이면 16비트 정수)을 추가합니다.
+    세션 ID는 session 쿼리 파라미터로 전달합니다.
+    """
+    try:
+        return lambdaSpeechToScore.add_stream_chunk(
+            request.args.get('session', ''), request.get_data(cache=False),
+            request.args.get('format', 'f32'))
+    except streamingSession.StreamingSessionError:
+        return {'error': 'unknown_session'}, 404
+    except streamingSession.StreamingAudioTooLong as e:
+        return {'error': str(e)}, 413
+    except streamingSession.StreamingUnavailable as e:
+        return {'error': str(e)}, 501
+
+
+@app.route(rootPath+'/finishStreamingSession', methods=['POST'])
+def finishStreamingSession():
+    """세션을 끝내고 GetAccuracyFromRecordedAudio와 같은 형식의 결과를 반환합니다."""
+    try:
+        return scoring_admission.run(
+            lambdaSpeechToScore.finish_stream, request.args.get('session', ''))
+    except admissionControl.AdmissionRejected as rejected:
+        return rejected_response(rejected)
+    except streamingSession.StreamingSessionError:
+        return {'error': 'unknown_session'}, 404
+    except streamingSession.StreamingUnavailable as e:
+        return {'error': str(e)}, 501
+
+
+@app.route(rootPath+'/getAdmissionMetrics', methods=['GET'])
+def getAdmissionMetrics():
+    return scoring_admission.getMetrics()
+
+
+@app.route(rootPath+'/getResultCacheStats', methods=['GET'])
+def getResultCacheStats():
+    """채점 결과 캐시의 적중률과 보관 중인 바이트 수"""
+    result_cache = resultCache.get_result_cache()
+    return result_cache.getStats() if result_cache is not None else {}
+
+
+@app.route(rootPath+'/metrics', methods=['GET'])
+def metrics():
+    """단계별 지연 시간 히스토그램과 승인 제어 상태 (Prometheus 텍스트 형식)"""
+    return (latencyMetrics.render_prometheus(admission_gauges(scoring_admission.getMetrics())), 200,
+            {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+
+@app.route(rootPath+'/getRequestTraces', methods=['GET'])
+def getRequestTraces():
+    """최근 요청별 단계 추적 (config.py의 ENABLE_REQUEST_TRACES가 켜져 있을 때만 기록됨)"""
+    return {'enabled': latencyMetrics.ENABLE_REQUEST_TRACES, 'traces': latencyMetrics.get_recent_traces()}
+
+
+def admission_gauges(admission_metrics: dict) -> dict:
+    """승인 제어 지표 중 숫자 값을 Prometheus 게이지 이름으로 바꿉니다."""
+    return {'pronunciation_admission_' + name: value for name, value in admission_metrics.items()
+            if isinstance(value, (int, float))}
+
+
 if __name__ == "__main__":
     language = 'ko'
     print(os.system('pwd'))
@@ -1,8 +1,16 @@
 import torch 
 from transformers import pipeline
-from ModelInterfaces import IASRModel
+from ModelInterfaces import IASRModel, ASRResult
 from typing import Union
 import numpy as np 
+import bisect
+import threading
+import time
+import spectralGate
+import latencyMetrics
+
+# 배치 전사에서 한 클립의 최대 길이 (Whisper 입력 창 길이)
+BATCH_CLIP_SECONDS = 30
 
 class WhisperASRModel(IASRModel):
     def __init__(self, model_name="openai/whisper-base"):
@@ -18,15 +26,18 @@ class WhisperASRModel(IASRModel):
         self.sample_rate = 16000
 
     def processAudio(self, audio:Union[np.ndarray, torch.Tensor]):
+        self._transcript, self._word_locations = self.transcribeAudio(audio)
+
+    def transcribeAudio(self, audio:Union[np.ndarray, torch.Tensor]) -> ASRResult:
         # 'audio'는 파일 경로 또는 오디오 샘플의 numpy 배열일 수 있습니다.
         if isinstance(audio, torch.Tensor):
             audio = audio.detach().cpu().numpy()
         result = self.asr(audio[0])
-        self._transcript = result["text"]
-        self._word_locations = [{"word": word_info["text"], 
+        word_locations = [{"word": word_info["text"], 
                      "start_ts": word_info["timestamp"][0] * self.sample_rate if word_info["timestamp"][0] is not None else None,
                      "end_ts": (word_info["timestamp"][1] * self.sample_rate if word_info["timestamp"][1] is not None else (word_info["timestamp"][0] + 1) * self.sample_rate),
                      "tag": "processed"} for word_info in result["chunks"]]
+        return ASRResult(result["text"], word_locations)
 
     def getTranscript(self) -> str:
         return self._transcript
@@ -40,9 +51,13 @@ class FasterWhisperASRModel(IASRModel):
     """
     Faster-Whisper 구현 - 표준 Whisper보다 4-5배 빠릅니다.
     CTranslate2를 사용하여 효율적인 추론을 제공하며, 향상된 노이즈 감지 기능을 포함합니다.
+
+    Silero VAD는 요청마다 한 번만 실행하고(detectSpeech), 그 음성 구간으로 품질 지표,
+    노이즈 게이트, 전사할 구간(clip_timestamps)을 모두 계산합니다.
+    단계별 처리 시간은 getStageTimings()로 확인할 수 있습니다.
     """
     def __init__(self, model_name="small", device="auto", compute_type="default", 
-                 enable_noise_reduction=True, vad_aggressiveness="moderate"):
+                 enable_noise_reduction=True, vad_aggressiveness="moderate", num_workers=1):
         """
         Args:
             model_name: 모델 크기 ("tiny", "base", "small", "medium", "large-v2", "large-v3")
@@ -50,6 +65,7 @@ class FasterWhisperASRModel(IASRModel):
             compute_type: "default", "float16", "int8" (성능/정확도 트레이드오프)
             enable_noise_reduction: 노이즈 감소 활성화 여부 (기본값: True)
             vad_aggressiveness: VAD 민감도 ("low", "moderate", "high", "very_high")
+            num_workers: 여러 스레드에서 transcribeAudio를 호출할 때 동시에 전사할 수 있는 수
         """
         from faster_whisper import WhisperModel
         
@@ -64,8 +80,12 @@ class FasterWhisperASRModel(IASRModel):
         print(f"FasterWhisper 초기화 중: model={model_name}, device={device}, compute_type={compute_type}")
         print(f"  노이즈 감소: {'활성화' if enable_noise_reduction else '비활성화'}")
         print(f"  VAD 민감도: {vad_aggressiveness}")
+        print(f"  동시 전사 작업자: {num_workers}")
         
-        self.model = WhisperModel(model_name, device=device, compute_type=compute_type)
+        self.model = WhisperModel(model_name, device=device, compute_type=compute_type,
+                                  num_workers=num_workers)
+        # transcribeBatch에서 처음 사용할 때 만듭니다
+        self._batched_pipeline = None
         self._transcript = ""
         self._word_locations = []
         self.sample_rate = 16000
@@ -73,6 +93,10 @@ class FasterWhisperASRModel(IASRModel):
         
         # VAD 파라미터 설정
         self.vad_parameters = self._get_vad_parameters(vad_aggressiveness)
+        
+        # 단계별 누적 처리 시간 {단계: [호출 수, 합계(초)]}
+        self._stage_timings = {}
+        self._stage_timings_lock = threading.Lock()
 
     def _get_vad_parameters(self, aggressiveness: str) -> dict:
         """
@@ -112,55 +136,79 @@ class FasterWhisperASRModel(IASRModel):
         }
         return vad_configs.get(aggressiveness, vad_configs["moderate"])
     
-    def _reduce_noise(self, audio: np.ndarray) -> np.ndarray:
+    def detectSpeech(self, audio: np.ndarray) -> list:
         """
-        간단한 노이즈 감소를 적용합니다.
-        스펙트럼 게이팅을 사용하여 배경 노이즈를 줄입니다.
+        Silero VAD로 음성 구간을 찾습니다.
         
         Args:
-            audio: 입력 오디오 배열
+            audio: (samples,) 16 kHz float32 오디오
         
         Returns:
-            노이즈가 감소된 오디오 배열
+            [{"start": 시작 샘플, "end": 끝 샘플}, ...] (구간은 BATCH_CLIP_SECONDS 이하)
         """
-        # 에너지가 낮은 부분 감쇠
-        energy = np.abs(audio)
-        energy_threshold = np.percentile(energy, 20)  # 하위 20% 에너지
+        from faster_whisper.vad import VadOptions, get_speech_timestamps
         
-        # 낮은 에너지 부분 감쇠 (완전히 제거하지 않음)
-        noise_gate = np.where(energy < energy_threshold, 0.1, 1.0)
-        audio_cleaned = audio * noise_gate
+        vad_options = VadOptions(**{**self.vad_parameters, "max_speech_duration_s": BATCH_CLIP_SECONDS})
+        return get_speech_timestamps(audio, vad_options)
+    
+    def _speechMask(self, length: int, speech_timestamps: list) -> np.ndarray:
+        """음성 구간이면 True인 샘플 마스크"""
+        mask = np.zeros(length, dtype=bool)
+        for speech in speech_timestamps:
+            mask[speech["start"]:speech["end"]] = True
+        return mask
+    
+    def _reduce_noise(self, audio: np.ndarray, speech_mask: np.ndarray) -> np.ndarray:
+        """
+        STFT 스펙트럼 게이트로 배경 노이즈를 줄입니다 (spectralGate.py).
+        잡음 스펙트럼은 VAD가 음성으로 판단하지 않은 구간에서 추정합니다. 결과는 ASR 전용 새 버퍼에
+        쓰고 audio는 바꾸지 않습니다 (호출한 쪽은 같은 녹음으로 운율 특징을 계산합니다).
         
-        # 고주파 노이즈 감소 (간단한 평활화)
-        # 너무 공격적이지 않게 설정
-        window_size = 3
-        if len(audio_cleaned) > window_size:
-            kernel = np.ones(window_size) / window_size
-            audio_smoothed = np.convolve(audio_cleaned, kernel, mode='same')
-            # 원본과 혼합하여 음성 왜곡 최소화
-            audio_cleaned = 0.7 * audio_cleaned + 0.3 * audio_smoothed
+        Args:
+            audio: 입력 오디오 배열
+            speech_mask: 음성 구간 마스크 (_speechMask)
         
-        return audio_cleaned.astype(np.float32)
+        Returns:
+            노이즈가 감소된 오디오 배열
+        """
+        return spectralGate.reduce_noise(audio, speech_mask)
     
-    def _check_audio_quality(self, audio: np.ndarray) -> dict:
+    def _check_audio_quality(self, audio: np.ndarray, speech_timestamps: list) -> dict:
         """
         오디오 품질을 확인합니다.
         
         Args:
             audio: 입력 오디오 배열
+            speech_timestamps: 음성 구간 목록 (detectSpeech)
         
         Returns:
             품질 메트릭 딕셔너리
         """
-        # 신호 대 잡음비 추정
-        energy = np.abs(audio)
-        signal_energy = np.mean(energy[energy > np.percentile(energy, 50)])
-        noise_energy = np.mean(energy[energy < np.percentile(energy, 20)])
-        snr_estimate = signal_energy / (noise_energy + 1e-10)
+        # 신호 대 잡음비 추정 (음성 구간과 나머지 구간의 RMS 비)
+        # 구간별 내적으로 계산하므로 음성/잡음 샘플을 따로 복사하지 않습니다
+        speech_samples = 0
+        speech_energy = 0.0
+        noise_energy = 0.0
+        previous_end = 0
+        for speech in speech_timestamps:
+            noise = audio[previous_end:speech["start"]]
+            segment = audio[speech["start"]:speech["end"]]
+            noise_energy += float(np.dot(noise, noise))
+            speech_energy += float(np.dot(segment, segment))
+            speech_samples += len(segment)
+            previous_end = speech["end"]
+        noise = audio[previous_end:]
+        noise_energy += float(np.dot(noise, noise))
+        if speech_samples == 0:
+            snr_estimate = 0.0
+        else:
+            noise_samples = len(audio) - speech_samples
+            speech_power = speech_energy / speech_samples
+            noise_power = noise_energy / noise_samples if noise_samples else 0.0
+            snr_estimate = float(np.sqrt(speech_power / (noise_power + 1e-10)))
         
-        # 무음 비율
-        silence_threshold = np.percentile(energy, 10)
-        silence_ratio = np.sum(energy < silence_threshold) / len(energy)
+        # 무음 비율 (VAD가 음성으로 판단하지 않은 비율)
+        silence_ratio = 1.0 - speech_samples / len(audio)
         
         return {
             "snr_estimate": snr_estimate,
@@ -169,7 +217,118 @@ class FasterWhisperASRModel(IASRModel):
         }
 
     def processAudio(self, audio: Union[np.ndarray, torch.Tensor]):
-        """오디오를 처리하고 단어 수준 타임스탬프로 전사합니다."""
+        """오디오를 처리하고 결과를 getTranscript/getWordLocations로 읽을 수 있게 저장합니다."""
+        self._transcript, self._word_locations = self.transcribeAudio(audio)
+
+    def transcribeAudio(self, audio: Union[np.ndarray, torch.Tensor]) -> ASRResult:
+        """
+        오디오를 단어 수준 타임스탬프로 전사하고 결과를 반환합니다.
+        인스턴스 상태를 바꾸지 않으므로 여러 요청이 하나의 모델을 동시에 사용할 수 있습니다.
+        입력 오디오는 바꾸지 않습니다 (노이즈 감소는 별도 버퍼에 적용).
+        """
+        stage_timings = {}
+        audio, speech_timestamps = self._prepareAudio(audio, stage_timings)
+        if not speech_timestamps:
+            self._recordStageTimings(stage_timings)
+            return ASRResult("", [])
+        
+        # VAD 단계에서 찾은 음성 구간만 전사 (Whisper 내부 VAD는 다시 실행하지 않음)
+        clip_timestamps = [time_in_samples / self.sample_rate
+                           for clip in self._speechClips(speech_timestamps) for time_in_samples in clip]
+        start = time.perf_counter()
+        segments, info = self.model.transcribe(
+            audio,
+            language="ko",
+            task="transcribe",
+            word_timestamps=True,
+            clip_timestamps=clip_timestamps
+        )
+        result = self._collectResult(segments)
+        stage_timings["transcription"] = time.perf_counter() - start
+        
+        self._recordStageTimings(stage_timings)
+        return result
+
+    def transcribeBatch(self, audios: list) -> list:
+        """
+        여러 요청의 오디오를 BatchedInferencePipeline 한 번으로 전사합니다.
+
+        요청마다 VAD로 음성 구간을 찾아 30초 이하의 클립으로 나누고, 모든 오디오를 이어 붙인 뒤
+        클립 경계(clip_timestamps)를 지정해 한 배치로 디코딩합니다. 각 세그먼트는 시작 시각으로
+        원래 요청을 찾아 요청 기준 타임스탬프로 되돌립니다.
+
+        Args:
+            audios: 요청별 16 kHz 오디오 목록
+
+        Returns:
+            요청 순서와 같은 ASRResult 목록
+        """
+        from faster_whisper import BatchedInferencePipeline
+
+        if self._batched_pipeline is None:
+            self._batched_pipeline = BatchedInferencePipeline(model=self.model)
+
+        stage_timings = {}
+        prepared = [self._prepareAudio(audio, stage_timings) for audio in audios]
+        audios = [audio for audio, _ in prepared]
+
+        clip_timestamps = []
+        clip_starts = []
+        clip_owners = []
+        offset = 0
+        for request_idx, (audio, speech_timestamps) in enumerate(prepared):
+            for start, end in self._speechClips(speech_timestamps):
+                clip_timestamps.append({"start": (offset + start) / self.sample_rate,
+                                        "end": (offset + end) / self.sample_rate})
+                clip_starts.append((offset + start) / self.sample_rate)
+                clip_owners.append(request_idx)
+            offset += len(audio)
+
+        segments_per_request = [[] for _ in audios]
+        start = time.perf_counter()
+        if clip_timestamps:
+            segments, info = self._batched_pipeline.transcribe(
+                np.concatenate(audios),
+                language="ko",
+                task="transcribe",
+                word_timestamps=True,
+                clip_timestamps=clip_timestamps,
+                batch_size=len(clip_timestamps)
+            )
+            for segment in segments:
+                clip_idx = max(bisect.bisect_right(clip_starts, segment.start + 1e-3) - 1, 0)
+                segments_per_request[clip_owners[clip_idx]].append(segment)
+
+        offsets = (np.cumsum([0] + [len(audio) for audio in audios[:-1]]) / self.sample_rate).tolist()
+        results = [self._collectResult(segments, offset_in_seconds)
+                   for segments, offset_in_seconds in zip(segments_per_request, offsets)]
+        stage_timings["transcription"] = time.perf_counter() - start
+        self._recordStageTimings(stage_timings)
+        return results
+
+    def _speechClips(self, speech_timestamps: list) -> list:
+        """VAD 음성 구간을 BATCH_CLIP_SECONDS 이하의 (시작, 끝) 샘플 구간으로 묶습니다."""
+        max_samples = BATCH_CLIP_SECONDS * self.sample_rate
+        clips = []
+        for speech in speech_timestamps:
+            if clips and speech["end"] - clips[-1][0] <= max_samples:
+                clips[-1][1] = speech["end"]
+            else:
+                clips.append([speech["start"], speech["end"]])
+        return clips
+
+    def _prepareAudio(self, audio: Union[np.ndarray, torch.Tensor], stage_timings: dict) -> tuple:
+        """
+        오디오를 (samples,) float32로 바꾸고, VAD를 한 번 실행한 뒤 그 결과로 품질 확인과
+        노이즈 감소를 적용합니다.
+        
+        Args:
+            audio: 입력 오디오
+            stage_timings: 단계별 처리 시간(초)을 더할 딕셔너리
+        
+        Returns:
+            (처리된 오디오, 음성 구간 목록)
+        """
         # 텐서를 numpy 배열로 변환
         if isinstance(audio, torch.Tensor):
             audio = audio.detach().cpu().numpy()
@@ -178,29 +337,47 @@ class FasterWhisperASRModel(IASRModel):
         if len(audio.shape) == 2:
             audio = audio[0]
         
-        # float32로 변환 (faster-whisper 요구사항)
-        audio = audio.astype(np.float32)
+        # float32로 변환 (faster-whisper 요구사항). 이미 float32이면 복사하지 않습니다.
+        # VAD와 품질 확인은 읽기만 하고, 노이즈 감소는 새 버퍼에 쓰므로 입력은 그대로 남습니다
+        audio = np.asarray(audio, dtype=np.float32)
+        
+        # 음성 구간 검출 (이후 단계는 모두 이 결과를 사용)
+        start = time.perf_counter()
+        speech_timestamps = self.detectSpeech(audio)
+        speech_mask = self._speechMask(len(audio), speech_timestamps)
+        stage_timings["vad"] = stage_timings.get("vad", 0.0) + time.perf_counter() - start
         
         # 오디오 품질 확인
-        quality_info = self._check_audio_quality(audio)
+        start = time.perf_counter()
+        quality_info = self._check_audio_quality(audio, speech_timestamps)
+        stage_timings["quality"] = stage_timings.get("quality", 0.0) + time.perf_counter() - start
         if not quality_info["is_good_quality"]:
             print(f"⚠️  오디오 품질 경고: SNR={quality_info['snr_estimate']:.2f}, 무음 비율={quality_info['silence_ratio']:.2%}")
         
         # 노이즈 감소 적용
         if self.enable_noise_reduction:
-            audio = self._reduce_noise(audio)
-        
-        # 전사 수행 (단어 수준 타임스탬프 포함, 향상된 VAD 사용)
-        segments, info = self.model.transcribe(
-            audio,
-            language="ko",
-            task="transcribe",
-            word_timestamps=True,
-            vad_filter=True,  # 음성 활동 감지로 정확도 향상
-            vad_parameters=self.vad_parameters
-        )
-        
-        # 결과 수집
+            start = time.perf_counter()
+            audio = self._reduce_noise(audio, speech_mask)
+            stage_timings["noise_reduction"] = stage_timings.get("noise_reduction", 0.0) + time.perf_counter() - start
+        return audio, speech_timestamps
+    
+    def _recordStageTimings(self, stage_timings: dict) -> None:
+        with self._stage_timings_lock:
+            for stage, seconds in stage_timings.items():
+                totals = self._stage_timings.setdefault(stage, [0, 0.0])
+                totals[0] += 1
+                totals[1] += seconds
+        for stage, seconds in stage_timings.items():
+            latencyMetrics.observe(stage, seconds)
+    
+    def getStageTimings(self) -> dict:
+        """단계(vad, quality, noise_reduction, transcription)별 호출 수와 누적/평균 처리 시간"""
+        with self._stage_timings_lock:
+            return {stage: {"count": count, "total_s": total, "mean_ms": total / count * 1e3}
+                    for stage, (count, total) in self._stage_timings.items()}
+
+    def _collectResult(self, segments, offset_in_seconds: float = 0.0) -> ASRResult:
+        """세그먼트에서 전사 문자열과 단어 위치(샘플 단위)를 모읍니다."""
         transcript_parts = []
         word_locations = []
         
@@ -210,8 +387,8 @@ class FasterWhisperASRModel(IASRModel):
                     transcript_parts.append(word.word.strip())
                     word_locations.append({
                         "word": word.word.strip(),
-                        "start_ts": word.start * self.sample_rate,
-                        "end_ts": word.end * self.sample_rate,
+                        "start_ts": (word.start - offset_in_seconds) * self.sample_rate,
+                        "end_ts": (word.end - offset_in_seconds) * self.sample_rate,
                         "tag": "processed"
                     })
             else:
@@ -219,13 +396,12 @@ class FasterWhisperASRModel(IASRModel):
                 transcript_parts.append(segment.text.strip())
                 word_locations.append({
                     "word": segment.text.strip(),
-                    "start_ts": segment.start * self.sample_rate,
-                    "end_ts": segment.end * self.sample_rate,
+                    "start_ts": (segment.start - offset_in_seconds) * self.sample_rate,
+                    "end_ts": (segment.end - offset_in_seconds) * self.sample_rate,
                     "tag": "processed"
                 })
         
-        self._transcript = " ".join(transcript_parts)
-        self._word_locations = word_locations
+        return ASRResult(" ".join(transcript_parts), word_locations)
 
     def getTranscript(self) -> str:
         return self._transcript